@@ -0,0 +1,33 @@
+import time
+
+from benchmarks.engine import random_games
+from server.batch_tic_toc_toe import simulate_random_games
+
+BOARD_OPTIONS = ((3, 3), (7, 4), (15, 5))
+BATCH_SIZES = (256, 4096)
+
+
+def measure_batch(board_size: int, win_length: int, batch_size: int, games: int) -> float:
+    start = time.perf_counter()
+    for _ in simulate_random_games(games, batch_size, board_size, win_length, seed=1):
+        pass
+    return games / (time.perf_counter() - start)
+
+
+def measure_scalar(board_size: int, win_length: int, games: int) -> float:
+    start = time.perf_counter()
+    random_games(games, 1, board_size, win_length)
+    return games / (time.perf_counter() - start)
+
+
+def run(games: int = 20000):
+    print(f"{'board':<8}{'TicTocToe games/s':>20}" + "".join(f"{f'batch {size} games/s':>22}" for size in BATCH_SIZES))
+    for board_size, win_length in BOARD_OPTIONS:
+        scalar_games = max(200, games // board_size ** 2)
+        rates = [measure_batch(board_size, win_length, batch_size, games) for batch_size in BATCH_SIZES]
+        print(f"{f'{board_size}x{board_size}':<8}{measure_scalar(board_size, win_length, scalar_games):>20.0f}"
+              + "".join(f"{rate:>22.0f}" for rate in rates))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from benchmarks.write_queue import open_pair, STATUS_MESSAGE
+from transport.codec import BINARY_CODEC, JSON_CODEC
+from transport.tcp_client import BaseTCPClient, BaseMessage
+from webserver.bridge import Bridge
+
+
+async def relay_game(passthrough: bool, codec, count: int) -> None:
+    game_server, bridge_server_side = await open_pair(BaseTCPClient)
+    bridge_client_side, player = await open_pair(BaseTCPClient)
+    game_server.codec = codec
+    bridge = Bridge(bridge_server_side, bridge_client_side, passthrough=passthrough)
+    bridge_task = asyncio.create_task(bridge.run_full_duplex())
+
+    async def receive_all():
+        for _ in range(count):
+            await player.receive_frame()
+
+    receive_task = asyncio.create_task(receive_all())
+    message = BaseMessage(STATUS_MESSAGE)
+    for _ in range(count):
+        await game_server.send(message)
+    await receive_task
+
+    bridge_task.cancel()
+    for tcp_client in (game_server, bridge_server_side, bridge_client_side, player):
+        tcp_client.close()
+
+
+async def measure_relay(passthrough: bool, codec, games: int, count: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*[relay_game(passthrough, codec, count) for _ in range(games)])
+    elapsed = time.perf_counter() - start
+    return games * count / elapsed
+
+
+async def run(count: int = 5000):
+    print(f"{'mode':<14}{'codec':<8}{'games':>6}{'frames/s':>12}")
+    for games in (1, 20):
+        for codec in (JSON_CODEC, BINARY_CODEC):
+            for passthrough in (False, True):
+                rate = await measure_relay(passthrough, codec, games, count // games * 4 if games > 1 else count)
+                mode = "passthrough" if passthrough else "decode"
+                print(f"{mode:<14}{codec.name:<8}{games:>6}{rate:>12.0f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
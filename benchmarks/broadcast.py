@@ -0,0 +1,127 @@
+import asyncio
+import socket
+import time
+
+from transport.broadcast import BroadcastMessage, broadcast
+from transport.codec import BINARY_CODEC, JSON_CODEC
+from transport.tcp_client import BaseTCPClient, BaseMessage
+
+RECIPIENT_COUNTS = (2, 10, 100, 1000)
+STALL_TIMEOUT = 0.5
+
+
+def status_content(board_size: int = 7) -> dict:
+    return {
+        "type": "show_game_status",
+        "game_status": "running",
+        "game_board": [[(row + col) % 3 for col in range(board_size)] for row in range(board_size)],
+        "current_user": 1,
+        "seq": 12
+    }
+
+
+def marks(index: int) -> dict:
+    return {"your_mark": index % 2 + 1, "opponent_mark": 2 - index % 2}
+
+
+def discard_incoming(peer: socket.socket):
+    try:
+        while peer.recv(65536):
+            pass
+    except BlockingIOError:
+        pass
+
+
+async def open_recipients(count: int, codec) -> tuple[dict[str, BaseTCPClient], list[socket.socket]]:
+    loop = asyncio.get_running_loop()
+    recipients, peers = dict(), []
+    for index in range(count):
+        local, peer = socket.socketpair()
+        peer.setblocking(False)
+        loop.add_reader(peer.fileno(), discard_incoming, peer)
+        tcp_client = BaseTCPClient(sock=local)
+        await tcp_client.attach()
+        tcp_client.codec = codec
+        recipients[f"user{index}"] = tcp_client
+        peers.append(peer)
+    return recipients, peers
+
+
+def close_recipients(recipients: dict[str, BaseTCPClient], peers: list[socket.socket]):
+    loop = asyncio.get_running_loop()
+    for tcp_client in recipients.values():
+        tcp_client.close()
+    for peer in peers:
+        loop.remove_reader(peer.fileno())
+        peer.close()
+
+
+async def send_sequentially(content: dict, recipients: dict[str, BaseTCPClient]):
+    for index, tcp_client in enumerate(recipients.values()):
+        await tcp_client.send(BaseMessage({**content, **marks(index)}))
+
+
+async def send_broadcast(content: dict, recipients: dict[str, BaseTCPClient]):
+    personal_by_username = {username: marks(index) for index, username in enumerate(recipients)}
+    await broadcast(BroadcastMessage(content), recipients, personal_by_username, STALL_TIMEOUT)
+
+
+async def measure_fan_out(count: int, codec) -> dict:
+    recipients, peers = await open_recipients(count, codec)
+    content = status_content()
+    rounds = max(20, 4000 // count)
+    result = dict()
+    for name, send in (("sequential", send_sequentially), ("broadcast", send_broadcast)):
+        await send(content, recipients)
+        await asyncio.sleep(0.05)
+        elapsed = 0.0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await send(content, recipients)
+            elapsed += time.perf_counter() - start
+            await asyncio.sleep(0)
+        result[name] = elapsed / rounds * 1e6
+        await asyncio.sleep(0.05)
+    close_recipients(recipients, peers)
+    return result
+
+
+def delivered(tcp_client: BaseTCPClient) -> int:
+    return tcp_client.write_queue.frames_written + tcp_client.write_queue.depth
+
+
+async def measure_stalled_recipient(count: int, send) -> float | None:
+    recipients, peers = await open_recipients(count, JSON_CODEC)
+    stalled, *healthy = recipients.values()
+    stalled.write_queue.high_water = 0
+    start = time.perf_counter()
+    send_task = asyncio.create_task(send(status_content(), recipients))
+    reached = None
+    while time.perf_counter() - start < 2 * STALL_TIMEOUT:
+        if all(delivered(tcp_client) for tcp_client in healthy):
+            reached = (time.perf_counter() - start) * 1000
+            break
+        await asyncio.sleep(0)
+    send_task.cancel()
+    await asyncio.gather(send_task, return_exceptions=True)
+    close_recipients(recipients, peers)
+    return reached
+
+
+async def run():
+    print(f"{'recipients':<12}{'codec':<8}{'sequential us':>15}{'broadcast us':>14}{'speedup':>9}")
+    for count in RECIPIENT_COUNTS:
+        for codec in (JSON_CODEC, BINARY_CODEC):
+            result = await measure_fan_out(count, codec)
+            print(f"{count:<12}{codec.name:<8}{result['sequential']:>15.1f}{result['broadcast']:>14.1f}"
+                  f"{result['sequential'] / result['broadcast']:>8.1f}x")
+
+    print()
+    print("one stalled recipient among 100: time until every healthy recipient has the update queued")
+    for name, send in (("sequential", send_sequentially), ("broadcast", send_broadcast)):
+        reached = await measure_stalled_recipient(100, send)
+        print(f"{name:<12}{f'{reached:.2f}ms' if reached is not None else f'not reached in {2 * STALL_TIMEOUT}s'}")
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
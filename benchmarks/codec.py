@@ -0,0 +1,44 @@
+import timeit
+
+from transport.codec import CODECS
+from transport.tcp_client import BaseMessage
+
+SAMPLE_MESSAGES = {
+    "place_mark": {"type": "place_mark", "username": "player", "row": 1, "col": 2},
+    "show_game_status": {
+        "type": "show_game_status",
+        "game_status": "running",
+        "game_board": [[1, 0, 2], [0, 1, 0], [2, 0, 0]],
+        "your_mark": 1,
+        "opponent_mark": 2,
+        "current_user": 2
+    },
+    "server_capacity": {"type": "server_capacity", "capacity": 256, "active_games": 17},
+    "chat": {"type": "chat", "username": "player", "text_message": "good game"},
+}
+
+
+def measure_codec(codec, content: dict, number: int) -> dict:
+    message = BaseMessage(content)
+    frame = message.encode(codec)
+    encoded_content = codec.encode(content)
+    encode_seconds = timeit.timeit(lambda: message.encode(codec), number=number)
+    decode_seconds = timeit.timeit(lambda: codec.decode(encoded_content), number=number)
+    return {
+        "encode_ns": encode_seconds / number * 1e9,
+        "decode_ns": decode_seconds / number * 1e9,
+        "wire_bytes": len(frame),
+    }
+
+
+def run(number: int = 50000):
+    print(f"{'message':<20}{'codec':<8}{'encode ns':>12}{'decode ns':>12}{'bytes':>8}")
+    for message_type, content in SAMPLE_MESSAGES.items():
+        for codec_name, codec in CODECS.items():
+            result = measure_codec(codec, content, number)
+            print(f"{message_type:<20}{codec_name:<8}{result['encode_ns']:>12.0f}"
+                  f"{result['decode_ns']:>12.0f}{result['wire_bytes']:>8}")
+
+
+if __name__ == '__main__':
+    run()
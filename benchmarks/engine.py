@@ -0,0 +1,70 @@
+import random
+import time
+import timeit
+
+from server import solver
+from server.bitboard_tic_toc_toe import BitboardTicTocToe
+from server.tic_toc_toe import TicTocToe
+
+ENGINES = {
+    "array": TicTocToe,
+    "bitboard": BitboardTicTocToe,
+}
+
+
+def random_games(count: int, seed: int = 1, board_size: int = 3,
+                 win_length: int = 3) -> list[list[tuple[int, int]]]:
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        reference = TicTocToe("a", "b", board_size, win_length)
+        cells = [(row, col) for row in range(board_size) for col in range(board_size)]
+        rng.shuffle(cells)
+        moves = []
+        for row, col in cells:
+            if reference.has_game_finished():
+                break
+            reference.place_mark("a" if reference.current_user == 1 else "b", row, col)
+            moves.append((row, col))
+        games.append(moves)
+    return games
+
+
+def measure_moves_per_second(engine_class, games: list[list[tuple[int, int]]], *board_options) -> float:
+    users = ("a", "b")
+    moves = 0
+    start = time.perf_counter()
+    for game_moves in games:
+        game = engine_class("a", "b", *board_options)
+        for index, (row, col) in enumerate(game_moves):
+            game.place_mark(users[index & 1], row, col)
+            game.has_game_finished()
+        moves += len(game_moves)
+    return moves / (time.perf_counter() - start)
+
+
+def measure_solver(number: int = 100000) -> dict:
+    start = time.perf_counter()
+    table = solver.SolvedTable.build()
+    build_seconds = time.perf_counter() - start
+    solver._solved_table = table
+    board = [[1, 0, 0], [0, 2, 0], [0, 0, 1]]
+    lookup_seconds = timeit.timeit(lambda: solver.choose_move(board), number=number)
+    return {"build_seconds": build_seconds, "choose_move_ns": lookup_seconds / number * 1e9}
+
+
+def run():
+    games = random_games(20000)
+    for name, engine_class in ENGINES.items():
+        print(f"{name:<10}{'3x3/3':>8}{measure_moves_per_second(engine_class, games):>12.0f} moves/s")
+    for board_size, win_length in ((7, 4), (15, 5)):
+        games = random_games(20000 // board_size, board_size=board_size, win_length=win_length)
+        rate = measure_moves_per_second(TicTocToe, games, board_size, win_length)
+        print(f"{'array':<10}{f'{board_size}x{board_size}/{win_length}':>8}{rate:>12.0f} moves/s")
+    result = measure_solver()
+    print(f"solver table built in {result['build_seconds'] * 1000:.0f} ms, "
+          f"choose_move {result['choose_move_ns']:.0f} ns")
+
+
+if __name__ == '__main__':
+    run()
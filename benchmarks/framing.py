@@ -0,0 +1,56 @@
+import asyncio
+import socket
+import time
+
+from transport.socket_client import SocketTCPClient
+from transport.tcp_client import BaseTCPClient, BaseMessage
+from transport.tcp_server import BaseTCPServer
+
+BACKENDS = {
+    "sock": SocketTCPClient,
+    "protocol": BaseTCPClient,
+}
+
+PAYLOADS = {
+    "place_mark": {"type": "place_mark", "username": "player", "row": 1, "col": 2},
+    "large": {"type": "chat", "username": "player", "text_message": "x" * 32 * 1024},
+}
+
+
+async def measure_receive_throughput(client_class: type[BaseTCPClient], content: dict, count: int) -> float:
+    loop = asyncio.get_running_loop()
+    tcp_server = BaseTCPServer('127.0.0.1', 0, client_class=client_class)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sender.setblocking(False)
+    stream = BaseMessage(content).encode() * count
+    try:
+        accept_task = asyncio.create_task(tcp_server.accept())
+        await loop.sock_connect(sender, tcp_server.sock.getsockname())
+        receiver = await accept_task
+
+        async def receive_all():
+            for _ in range(count):
+                await receiver.receive()
+
+        start = time.perf_counter()
+        receive_task = asyncio.create_task(receive_all())
+        await loop.sock_sendall(sender, stream)
+        await receive_task
+        elapsed = time.perf_counter() - start
+        receiver.close()
+        return count / elapsed
+    finally:
+        sender.close()
+        tcp_server.close()
+
+
+async def run(count: int = 50000):
+    for payload_name, content in PAYLOADS.items():
+        for backend_name, client_class in BACKENDS.items():
+            n = count if payload_name == "place_mark" else count // 50
+            rate = await measure_receive_throughput(client_class, content, n)
+            print(f"{payload_name:<12}{backend_name:<10}{rate:>12.0f} msg/s")
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import asyncio
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+
+from benchmarks.engine import random_games
+from server.game import SinglePlayerGame
+from server.game_log import GameRecordLog, read_game_logs, log_paths
+
+BOARD_OPTIONS = ((3, 3), (7, 4), (15, 5))
+
+
+def played_game(board_size: int, win_length: int, moves: list[tuple[int, int]]) -> SinglePlayerGame:
+    game = SinglePlayerGame("player", board_size, win_length)
+    for row, col in moves:
+        user = "player" if game.game.current_user == game.game.get_game_userid("player") else "computer"
+        game.game.place_mark(user, row, col)
+        game.record_move(user, row, col)
+    return game
+
+
+def measure_record_move(board_size: int, win_length: int, count: int = 20000) -> tuple[float, float]:
+    game = SinglePlayerGame("player", board_size, win_length)
+    start = time.perf_counter()
+    for index in range(count):
+        game.record_move("player", index % board_size, 0)
+    record_ns = (time.perf_counter() - start) / count * 1e9
+    moves = bytearray()
+    start = time.perf_counter()
+    for index in range(count):
+        moves.append(index % board_size)
+    append_ns = (time.perf_counter() - start) / count * 1e9
+    return record_ns, append_ns
+
+
+async def measure_log(games: list[SinglePlayerGame], directory: str) -> tuple[float, float, float]:
+    game_log = GameRecordLog(directory)
+    game_log.start()
+    start = time.perf_counter()
+    for game in games:
+        game_log.append(game)
+    loop_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, game_log.close)
+    write_seconds = time.perf_counter() - start
+    file_bytes = sum(len(open(path, "rb").read()) for path in log_paths(directory))
+    return loop_seconds / len(games) * 1e9, write_seconds, file_bytes
+
+
+def measure_read(directory: str) -> tuple[int, float]:
+    start = time.perf_counter()
+    records = moves = 0
+    for record in read_game_logs(directory):
+        records += 1
+        moves += len(record.moves)
+    return records, time.perf_counter() - start
+
+
+def run(games_per_board: int = 20000):
+    print(f"{'board':<8}{'record_move ns':>16}{'of which log':>14}")
+    for board_size, win_length in BOARD_OPTIONS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            record_ns, append_ns = measure_record_move(board_size, win_length)
+        print(f"{f'{board_size}x{board_size}':<8}{record_ns:>16.0f}{append_ns:>14.0f}")
+
+    games = []
+    for board_size, win_length in BOARD_OPTIONS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            games.extend(played_game(board_size, win_length, moves)
+                         for moves in random_games(games_per_board, 1, board_size, win_length))
+    directory = tempfile.mkdtemp(prefix="game-log-")
+    try:
+        append_ns, write_seconds, file_bytes = asyncio.run(measure_log(games, directory))
+        records, read_seconds = measure_read(directory)
+    finally:
+        shutil.rmtree(directory)
+    print(f"append on the event loop: {append_ns:.0f} ns/game")
+    print(f"write + fsync off the loop: drained {write_seconds * 1000:.1f}ms after the last append, "
+          f"{file_bytes / len(games):.0f} bytes/game")
+    print(f"mmap read: {records} records, {records / read_seconds:.0f} records/s")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,82 @@
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+from benchmarks.write_queue import open_pair
+from server.game_server import GameServer
+from transport.codec import SUPPORTED_CODECS
+from transport.tcp_client import BaseTCPClient, BaseMessage
+
+
+def start_message(username: str, game_id: str | None = None) -> BaseMessage:
+    content = {
+        "type": "start_game",
+        "username": username,
+        "game_type": "multi",
+        "board_size": 3,
+        "win_length": 3,
+        "codecs": SUPPORTED_CODECS
+    }
+    if game_id is not None:
+        content["game_id"] = game_id
+    return BaseMessage(content)
+
+
+async def receive_type(tcp_client: BaseTCPClient, message_type: str) -> dict:
+    while True:
+        message = await tcp_client.receive()
+        if message.content['type'] == message_type:
+            return message.content
+
+
+async def play_opening(server_address: tuple, webserver_side: BaseTCPClient, index: int) -> tuple[float, float]:
+    host = BaseTCPClient()
+    await host.connect(server_address)
+    await host.send(start_message(f"host{index}"))
+    waiting = await receive_type(webserver_side, "multi_game_waiting")
+    await receive_type(host, "server_assigned")
+
+    joiner = BaseTCPClient()
+    await joiner.connect(server_address)
+    joined_at = time.perf_counter()
+    await joiner.send(start_message(f"joiner{index}", waiting['game_id']))
+
+    await receive_type(host, "show_game_status")
+    first_status_at = time.perf_counter()
+    await host.send(BaseMessage({"type": "place_mark", "username": f"host{index}", "row": 0, "col": 0}))
+    while True:
+        status = await receive_type(joiner, "show_game_status")
+        if status['game_board'][0][0] != 0:
+            break
+    first_move_at = time.perf_counter()
+
+    host.close()
+    joiner.close()
+    return first_status_at - joined_at, first_move_at - joined_at
+
+
+async def run(games: int = 50):
+    game_server_master, webserver_side = await open_pair(BaseTCPClient)
+    game_server = GameServer(game_server_master, '127.0.0.1', 0)
+    server_task = asyncio.create_task(game_server.start())
+    server_address = (game_server.tcp_server.host, game_server.tcp_server.port)
+
+    first_status, first_move = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index in range(games):
+            status_latency, move_latency = await asyncio.wait_for(
+                play_opening(server_address, webserver_side, index), 5)
+            first_status.append(status_latency * 1000)
+            first_move.append(move_latency * 1000)
+
+    server_task.cancel()
+    game_server.tcp_server.close()
+    print(f"{'measurement':<26}{'p50 ms':>10}{'max ms':>10}")
+    print(f"{'join -> host first status':<26}{statistics.median(first_status):>10.2f}{max(first_status):>10.2f}")
+    print(f"{'join -> host first move':<26}{statistics.median(first_move):>10.2f}{max(first_move):>10.2f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
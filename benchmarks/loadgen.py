@@ -0,0 +1,438 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from client.game_client import GameClient
+from client.game_stub import GameStub
+from transport.tcp_client import BaseTCPClient, SocketClosedException
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios", "ramp.json")
+HOST = "127.0.0.1"
+
+RECEIVE_TIMEOUT = 30
+RAMP_TICK = 0.25
+STARTUP_TIMEOUT = 30
+CONCURRENT_CONNECTS = 32
+
+DEFAULT_SCENARIO_OPTIONS = {
+    "game_servers": 1,
+    "server_args": ["--ai-pool-size", "0"],
+    "board_size": 3,
+    "win_length": 3,
+    "mix": {"single": 1.0},
+    "chat_probability": 0.0,
+    "think_time_ms": [0, 0],
+    "match_timeout": 10,
+    "reconnect_delay": 0.5,
+    "stages": [{"duration": 10, "clients": 10}]
+}
+
+
+class LoadReport:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {"matchmaking": [], "move_round_trip": [], "reconnect": []}
+        self.counts = collections.Counter()
+        self.errors = collections.Counter()
+        self.stages: list[dict] = []
+        self.peak_clients = 0
+
+    def record(self, name: str, seconds: float):
+        self.samples[name].append(seconds * 1000)
+
+    @staticmethod
+    def summarize(samples: list[float]) -> dict:
+        if not samples:
+            return {"count": 0}
+        ordered = sorted(samples)
+
+        def percentile(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+        return {"count": len(ordered), "p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99),
+                "max": round(ordered[-1], 3)}
+
+    def to_json(self, scenario_path: str, duration: float) -> dict:
+        return {
+            "scenario": os.path.basename(scenario_path),
+            "duration_s": round(duration, 3),
+            "peak_clients": self.peak_clients,
+            "throughput": {
+                "games_per_s": round((self.counts["single_games"] + self.counts["multi_games"]) / duration, 3),
+                "moves_per_s": round(self.counts["moves"] / duration, 3),
+            },
+            "latency_ms": {name: self.summarize(samples) for name, samples in self.samples.items()},
+            "counts": dict(sorted(self.counts.items())),
+            "errors": dict(sorted(self.errors.items())),
+            "stages": self.stages,
+        }
+
+
+class GameView:
+    def __init__(self, snapshot: dict):
+        self.board = [list(cells) for cells in snapshot['game_board']]
+        self.your_mark = snapshot['your_mark']
+        self.seq = snapshot.get('seq', 0)
+        self.current_user = snapshot['current_user']
+        self.finished = snapshot['game_status'] == 'finished'
+
+    def apply_delta(self, delta: dict):
+        self.board[delta['row']][delta['col']] = delta['mark']
+        self.seq = delta['seq']
+        self.current_user = delta['current_user']
+        self.finished = delta['game_status'] == 'finished'
+
+    def empty_cells(self) -> list[tuple[int, int]]:
+        return [(row, col) for row, cells in enumerate(self.board) for col, cell in enumerate(cells) if cell == 0]
+
+
+class SimulatedClient:
+    def __init__(self, index: int, scenario: dict, report: LoadReport, client_address: tuple,
+                 connecting: asyncio.Semaphore):
+        self.username = f"load{index}"
+        self.scenario = scenario
+        self.report = report
+        self.client_address = client_address
+        self.connecting = connecting
+        self.stub: GameStub | None = None
+        self.stopping = False
+        actions = scenario["mix"]
+        self.actions = list(actions)
+        self.weights = [actions[x] for x in self.actions]
+
+    async def connect(self):
+        async with self.connecting:
+            tcp_client = BaseTCPClient()
+            await tcp_client.connect(self.client_address)
+        self.stub = GameStub(GameClient(self.username, tcp_client))
+
+    def disconnect(self):
+        if self.stub is not None:
+            self.stub.game_client.tcp_client.close()
+            self.stub = None
+
+    async def run(self):
+        while not self.stopping:
+            action = random.choices(self.actions, self.weights)[0]
+            try:
+                if self.stub is None:
+                    await self.connect()
+                await getattr(self, f"run_{action}")()
+            except (asyncio.TimeoutError, TimeoutError):
+                self.report.errors[f"{action}_timeout"] += 1
+                self.disconnect()
+            except (SocketClosedException, ConnectionError):
+                self.report.errors[f"{action}_disconnected"] += 1
+                self.disconnect()
+            await self.think()
+        self.disconnect()
+
+    async def think(self):
+        low, high = self.scenario["think_time_ms"]
+        if high > 0:
+            await asyncio.sleep(random.uniform(low, high) / 1000)
+
+    async def receive(self, timeout: float = RECEIVE_TIMEOUT) -> dict:
+        return await asyncio.wait_for(self.stub.game_client.receive(), timeout)
+
+    async def start_game(self, game_type: str):
+        await self.stub.start_game(game_type, self.scenario["board_size"], self.scenario["win_length"])
+
+    async def run_single(self):
+        await self.start_game("single")
+        if await self.play("single", time.perf_counter()):
+            self.report.counts["single_games"] += 1
+
+    async def run_multi(self):
+        await self.start_game("multi")
+        if await self.play("multi", time.perf_counter()):
+            self.report.counts["multi_games"] += 1
+
+    async def run_change_game(self):
+        await self.start_game("multi")
+        assigned = False
+        try:
+            message = await self.receive(random.uniform(0.05, 1))
+            if message['type'] == 'show_game_status':
+                if await self.play("multi", None, message):
+                    self.report.counts["multi_games"] += 1
+                return
+            assigned = message['type'] == 'server_assigned'
+        except asyncio.TimeoutError:
+            pass
+        self.report.counts["change_games"] += 1
+        await self.cancel_waiting(assigned)
+
+    async def cancel_waiting(self, assigned: bool):
+        await self.stub.change_game()
+        if not assigned:
+            return
+        while True:
+            message = await self.receive()
+            if message['type'] == 'game_changed':
+                return
+            if message['type'] == 'show_game_status':
+                self.report.counts["change_game_too_late"] += 1
+                if await self.play("multi", None, message):
+                    self.report.counts["multi_games"] += 1
+                return
+
+    async def run_reconnect(self):
+        await self.start_game("single")
+        if await self.play("single", time.perf_counter(), disconnect_after_moves=2):
+            self.report.counts["single_games"] += 1
+            return
+        resume_token = self.stub.resume_token
+        self.disconnect()
+        await asyncio.sleep(self.scenario["reconnect_delay"])
+        await self.connect()
+        self.stub.resume_token = resume_token
+        start = time.perf_counter()
+        await self.start_game("single")
+        message = await self.receive()
+        while message['type'] != 'show_game_status':
+            message = await self.receive()
+        if message.get('seq', 0) > 0:
+            self.report.record("reconnect", time.perf_counter() - start)
+            self.report.counts["reconnects"] += 1
+        else:
+            self.report.counts["reconnect_new_game"] += 1
+        if await self.play("single", None, message):
+            self.report.counts["single_games"] += 1
+
+    async def play(self, game_type: str, started_at: float | None, first_message: dict | None = None,
+                   disconnect_after_moves: int | None = None) -> bool:
+        view = None
+        assigned = False
+        move_sent_at = None
+        moves = 0
+        match_deadline = time.perf_counter() + self.scenario["match_timeout"]
+        message = first_message
+        while True:
+            if message is None:
+                timeout = RECEIVE_TIMEOUT
+                if view is None and game_type == "multi":
+                    timeout = max(match_deadline - time.perf_counter(), 0.01)
+                try:
+                    message = await self.receive(timeout)
+                except asyncio.TimeoutError:
+                    if view is not None or game_type != "multi":
+                        raise
+                    self.report.counts["matchmaking_timeouts"] += 1
+                    await self.cancel_waiting(assigned)
+                    return False
+
+            message_type = message['type']
+            if message_type == 'show_game_status':
+                if view is None and started_at is not None:
+                    self.report.record("matchmaking", time.perf_counter() - started_at)
+                view = GameView(message)
+            elif message_type == 'game_delta':
+                if view is None or message['seq'] != view.seq + 1:
+                    if view is not None and message['seq'] > view.seq:
+                        self.report.counts["resyncs"] += 1
+                        await self.stub.resync(view.seq)
+                    message = None
+                    continue
+                view.apply_delta(message)
+                if move_sent_at is not None and message['mark'] == view.your_mark:
+                    self.report.record("move_round_trip", time.perf_counter() - move_sent_at)
+                    move_sent_at = None
+            elif message_type == 'chat':
+                self.report.counts["chats_received"] += 1
+                message = None
+                continue
+            elif message_type == 'opponent_escaped':
+                self.report.counts["opponent_escaped"] += 1
+                return False
+            elif message_type == 'server_assigned':
+                assigned = True
+                message = None
+                continue
+            elif message_type == 'session_token':
+                self.stub.resume_token = message['resume_token']
+                message = None
+                continue
+            elif message_type == 'game_changed':
+                self.report.counts["game_changed"] += 1
+                return False
+            elif message_type == 'server_crashed':
+                self.report.errors[message_type] += 1
+                return False
+            else:
+                message = None
+                continue
+            message = None
+
+            if view.finished:
+                self.stub.resume_token = None
+                return True
+            if disconnect_after_moves is not None and moves >= disconnect_after_moves:
+                return False
+            if view.current_user == view.your_mark and move_sent_at is None:
+                await self.think()
+                if game_type == "multi" and random.random() < self.scenario["chat_probability"]:
+                    await self.stub.send_message(f"hello from {self.username}")
+                    self.report.counts["chats_sent"] += 1
+                row, col = random.choice(view.empty_cells())
+                move_sent_at = time.perf_counter()
+                await self.stub.place_mark(row, col)
+                self.report.counts["moves"] += 1
+                moves += 1
+
+
+async def run_load(scenario: dict, client_address: tuple, report: LoadReport):
+    connecting = asyncio.Semaphore(CONCURRENT_CONNECTS)
+    clients: list[tuple[SimulatedClient, asyncio.Task]] = []
+    stopped: list[asyncio.Task] = []
+    next_index = 0
+
+    def adjust(target: int):
+        nonlocal next_index
+        while len(clients) < target:
+            simulated_client = SimulatedClient(next_index, scenario, report, client_address, connecting)
+            next_index += 1
+            clients.append((simulated_client, asyncio.create_task(simulated_client.run())))
+        while len(clients) > target:
+            simulated_client, task = clients.pop()
+            simulated_client.stopping = True
+            stopped.append(task)
+        report.peak_clients = max(report.peak_clients, len(clients))
+
+    previous_target = 0
+    for stage in scenario["stages"]:
+        counts_before = report.counts.copy()
+        errors_before = sum(report.errors.values())
+        stage_start = time.perf_counter()
+        while (elapsed := time.perf_counter() - stage_start) < stage["duration"]:
+            adjust(round(previous_target + (stage["clients"] - previous_target) * elapsed / stage["duration"]))
+            await asyncio.sleep(RAMP_TICK)
+        adjust(stage["clients"])
+        previous_target = stage["clients"]
+        stage_duration = time.perf_counter() - stage_start
+        stage_counts = report.counts - counts_before
+        report.stages.append({
+            "clients": stage["clients"],
+            "duration_s": round(stage_duration, 3),
+            "games_per_s": round((stage_counts["single_games"] + stage_counts["multi_games"]) / stage_duration, 3),
+            "moves_per_s": round(stage_counts["moves"] / stage_duration, 3),
+            "errors": sum(report.errors.values()) - errors_before,
+        })
+        print(f"stage done: {report.stages[-1]}", file=sys.stderr)
+
+    adjust(0)
+    done, pending = await asyncio.wait(stopped, timeout=RECEIVE_TIMEOUT) if stopped else (set(), set())
+    for task in pending:
+        task.cancel()
+        report.errors["unfinished_at_shutdown"] += 1
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def spawn_cluster(scenario: dict) -> tuple[tuple, list[subprocess.Popen]]:
+    gameserver_port, client_port, metrics_port = free_port(), free_port(), free_port()
+    processes = [subprocess.Popen(
+        [sys.executable, "webserver_main.py", "--gameserver-port", str(gameserver_port),
+         "--client-port", str(client_port), "--metrics-port", str(metrics_port)],
+        cwd=REPO_ROOT, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)]
+    wait_for_port(client_port)
+    for _ in range(scenario["game_servers"]):
+        processes.append(subprocess.Popen(
+            [sys.executable, "server_main.py", "--webserver-port", str(gameserver_port), *scenario["server_args"]],
+            cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    print(f"spawned webserver on {client_port} (metrics on {metrics_port}) and "
+          f"{scenario['game_servers']} game servers", file=sys.stderr)
+    return (HOST, client_port), processes
+
+
+def wait_for_port(port: int):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((HOST, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"nothing is listening on {HOST}:{port}")
+
+
+async def wait_until_playable(scenario: dict, client_address: tuple):
+    probe_scenario = {**scenario, "mix": {"single": 1.0}}
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        probe = SimulatedClient(-1, probe_scenario, LoadReport(), client_address, asyncio.Semaphore(1))
+        try:
+            await probe.connect()
+            await asyncio.wait_for(probe.run_single(), 5)
+            return
+        except (asyncio.TimeoutError, SocketClosedException, ConnectionError):
+            await asyncio.sleep(0.5)
+        finally:
+            probe.disconnect()
+    raise TimeoutError("the cluster did not finish a probe game")
+
+
+def stop_cluster(processes: list[subprocess.Popen]):
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def load_scenario(path: str) -> dict:
+    with open(path) as scenario_file:
+        return {**DEFAULT_SCENARIO_OPTIONS, **json.load(scenario_file)}
+
+
+async def run(scenario_path: str, client_address: tuple | None) -> dict:
+    scenario = load_scenario(scenario_path)
+    processes = []
+    if client_address is None:
+        client_address, processes = spawn_cluster(scenario)
+    try:
+        await wait_until_playable(scenario, client_address)
+        await asyncio.sleep(1)
+        report = LoadReport()
+        start = time.perf_counter()
+        await run_load(scenario, client_address, report)
+        return report.to_json(scenario_path, time.perf_counter() - start)
+    finally:
+        stop_cluster(processes)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive simulated players against a webserver and game servers")
+    parser.add_argument("scenario", nargs="?", default=DEFAULT_SCENARIO, help="scenario JSON file")
+    parser.add_argument("--target", default=None,
+                        help="host:port of an already running webserver; spawns a local cluster when omitted")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    target = None
+    if args.target is not None:
+        target_host, target_port = args.target.rsplit(":", 1)
+        target = (target_host, int(target_port))
+    result = asyncio.run(run(args.scenario, target))
+    report_json = json.dumps(result, indent=2)
+    if args.output is None:
+        print(report_json)
+    else:
+        with open(args.output, "w") as output_file:
+            output_file.write(report_json + "\n")
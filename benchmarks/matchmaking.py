@@ -0,0 +1,106 @@
+import asyncio
+import statistics
+import time
+
+from webserver.chatroom import ChatRoom, ChatroomRepository
+
+SERVER_ADDRESS = ("127.0.0.1", 10000)
+BOARD_OPTIONS = (3, 3)
+
+
+class PollingMatchmaker:
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self.free_slots = 0
+        self.wakeups = 0
+
+    async def pop_free_chatroom(self, single_player: bool, board_options: tuple):
+        while True:
+            self.wakeups += 1
+            if self.free_slots > 0:
+                self.free_slots -= 1
+                return SERVER_ADDRESS
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self, slots: int):
+        self.free_slots += slots
+
+
+class EventMatchmaker:
+    def __init__(self):
+        self.repo = ChatroomRepository()
+        self.repo.add_gameserver(SERVER_ADDRESS)
+        self.wakeups = 0
+        self.capacity = 0
+
+    async def pop_free_chatroom(self, single_player: bool, board_options: tuple):
+        chatroom = await self.repo.pop_free_chatroom(single_player, board_options)
+        self.wakeups += 1
+        return chatroom
+
+    def release(self, slots: int):
+        self.capacity += slots
+        self.repo.update_capacity(SERVER_ADDRESS, self.capacity, self.capacity - slots)
+
+
+async def measure_time_to_match(matchmaker, waiters: int, batches: int, batch_interval: float) -> dict:
+    served_order = []
+    slot_release_times = []
+    latencies = []
+
+    async def wait_for_match(index: int):
+        await matchmaker.pop_free_chatroom(True, BOARD_OPTIONS)
+        matched_at = time.perf_counter()
+        latencies.append(matched_at - slot_release_times[len(served_order)])
+        served_order.append(index)
+
+    tasks = []
+    for index in range(waiters):
+        tasks.append(asyncio.create_task(wait_for_match(index)))
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    matchmaker.wakeups = 0
+
+    batch_size = waiters // batches
+    start = time.perf_counter()
+    for _ in range(batches):
+        slot_release_times.extend([time.perf_counter()] * batch_size)
+        matchmaker.release(batch_size)
+        await asyncio.sleep(batch_interval)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "fifo": served_order == sorted(served_order),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "wakeups": matchmaker.wakeups,
+        "elapsed_s": elapsed,
+    }
+
+
+async def measure_multiplayer_pairing(pairs: int) -> float:
+    matchmaker = EventMatchmaker()
+    repo = matchmaker.repo
+    joiners = [asyncio.create_task(repo.pop_free_chatroom(False, BOARD_OPTIONS)) for _ in range(pairs)]
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    for index in range(pairs):
+        repo.add_multiplayer_chatroom(ChatRoom(SERVER_ADDRESS, f"game-{index}", BOARD_OPTIONS))
+    await asyncio.gather(*joiners)
+    return (time.perf_counter() - start) / pairs * 1e6
+
+
+async def run(waiters: int = 5000, batches: int = 5):
+    print(f"{'matchmaker':<12}{'waiters':>8}{'fifo':>6}{'p50 ms':>10}{'p99 ms':>10}{'wakeups':>10}{'elapsed s':>11}")
+    for name, matchmaker in (("polling", PollingMatchmaker(1.0)), ("event", EventMatchmaker())):
+        result = await measure_time_to_match(matchmaker, waiters, batches, 0.7)
+        print(f"{name:<12}{waiters:>8}{str(result['fifo']):>6}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['wakeups']:>10}{result['elapsed_s']:>11.2f}")
+    print(f"multiplayer pairing: {await measure_multiplayer_pairing(waiters):.2f}us per joined game")
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from server.mcts import MCTSPool, is_winning_move
+
+
+async def play_self_game(pool: MCTSPool, board_size: int, win_length: int) -> int:
+    cells = bytearray(board_size * board_size)
+    trees = {1: None, 2: None}
+    player, last_move = 1, None
+    for _ in range(len(cells)):
+        move, trees[player] = await pool.choose_move(bytes(cells), board_size, win_length, player,
+                                                      trees[player], last_move)
+        cells[move] = player
+        if is_winning_move(cells, board_size, win_length, move):
+            return player
+        player, last_move = 3 - player, move
+    return 0
+
+
+async def run(games: int = 4, board_size: int = 7, win_length: int = 4):
+    for pool_size in (1, 2, 4):
+        pool = MCTSPool(pool_size, budget_ms=100)
+        start = time.perf_counter()
+        await asyncio.gather(*[play_self_game(pool, board_size, win_length) for _ in range(games)])
+        elapsed = time.perf_counter() - start
+        print(f"pool={pool_size} games={games} board={board_size}x{board_size}/{win_length} "
+              f"wall={elapsed:.1f}s moves={pool.moves} avg_think={pool.average_think_ms:.1f}ms "
+              f"playouts/s={pool.playouts_per_second:.0f}")
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
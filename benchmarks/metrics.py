@@ -0,0 +1,52 @@
+import time
+
+from benchmarks.write_queue import STATUS_MESSAGE
+from metrics import MetricsRegistry, Timer, record_frame
+from transport.codec import BINARY_CODEC, JSON_CODEC
+from transport.protocol import Frame
+from transport.tcp_client import BaseMessage
+
+
+def frame_of(codec) -> Frame:
+    data = BaseMessage(STATUS_MESSAGE).encode(codec)
+    header_length = int.from_bytes(data[:2], "big")
+    json_header = {"content-length": len(data) - 2 - header_length}
+    if codec is BINARY_CODEC:
+        json_header["content-type"] = codec.name
+    return Frame(json_header, data, 2 + header_length)
+
+
+def measure(name: str, operation, count: int = 100000, repeats: int = 5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(count):
+            operation()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<40}{best / count * 1e9:>10.0f}")
+
+
+def run():
+    registry = MetricsRegistry()
+    counter = registry.counter("benchmark_events_total", "benchmark counter")
+    histogram = registry.histogram("benchmark_latency_seconds", "benchmark histogram")
+    json_frame = frame_of(JSON_CODEC)
+    binary_frame = frame_of(BINARY_CODEC)
+    message = BaseMessage(STATUS_MESSAGE)
+
+    print(f"{'operation':<40}{'ns/event':>10}")
+    measure("counter inc", counter.inc)
+    measure("histogram observe", lambda: histogram.observe(0.003))
+    measure("timer start + stop", lambda: Timer(histogram).stop())
+    measure("record_frame", lambda: record_frame("in", "show_game_status", 120))
+    measure("decoded type + record_frame", lambda: record_frame("in", message.content.get("type"), 120))
+    measure("relayed type + record_frame (json)",
+            lambda: record_frame("in", json_frame.relayed_type, len(json_frame.data)))
+    measure("relayed type + record_frame (binary)",
+            lambda: record_frame("in", binary_frame.relayed_type, len(binary_frame.data)))
+    measure("peek type (json, no longer per frame)", lambda: json_frame.message_type)
+    measure("empty lambda (loop overhead)", lambda: None)
+
+
+if __name__ == '__main__':
+    run()
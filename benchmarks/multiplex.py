@@ -0,0 +1,84 @@
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+from benchmarks.write_queue import open_pair
+from server.game_server import GameServer
+from transport.codec import SUPPORTED_CODECS
+from transport.tcp_client import BaseTCPClient, BaseMessage
+from webserver.connection_pool import GameServerConnectionPool
+
+
+def start_message(username: str) -> BaseMessage:
+    return BaseMessage({
+        "type": "start_game",
+        "username": username,
+        "game_type": "single",
+        "board_size": 3,
+        "win_length": 3,
+        "codecs": SUPPORTED_CODECS
+    })
+
+
+async def start_session(open_client, username: str, starting: asyncio.Semaphore) -> tuple:
+    async with starting:
+        start = time.perf_counter()
+        server_client = await open_client()
+        await server_client.send(start_message(username))
+        while True:
+            message = await server_client.receive()
+            if message.content['type'] == 'show_game_status':
+                return server_client, time.perf_counter() - start
+
+
+async def measure_sessions(server_address: tuple, sessions: int, pooled: bool, concurrent_starts: int) -> dict:
+    pool = GameServerConnectionPool()
+    starting = asyncio.Semaphore(concurrent_starts)
+
+    async def open_direct():
+        tcp_client = BaseTCPClient()
+        await tcp_client.connect(server_address)
+        return tcp_client
+
+    async def open_pooled():
+        return await pool.open_stream(server_address)
+
+    open_client = open_pooled if pooled else open_direct
+    results = await asyncio.gather(*[start_session(open_client, f"player{index}", starting)
+                                     for index in range(sessions)])
+    latencies = sorted(latency * 1000 for _, latency in results)
+    sockets = pool.number_of_connections if pooled else sessions
+    for server_client, _ in results:
+        server_client.close()
+    pool_connections = list(pool.connections_by_server)
+    for server_address in pool_connections:
+        pool.close_server(server_address)
+    await asyncio.sleep(0.1)
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "sockets": sockets,
+    }
+
+
+async def run(sessions: int = 500, concurrent_starts: int = 4):
+    game_server_master, webserver_side = await open_pair(BaseTCPClient)
+    game_server = GameServer(game_server_master, '127.0.0.1', 0, max_sessions=sessions * 2)
+    server_task = asyncio.create_task(game_server.start())
+    server_address = (game_server.tcp_server.host, game_server.tcp_server.port)
+
+    print(f"{'mode':<10}{'sessions':>9}{'start p50 ms':>14}{'start p99 ms':>14}{'sockets':>9}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = [(mode, await measure_sessions(server_address, sessions, mode == "pooled", concurrent_starts))
+                for mode in ("direct", "pooled")]
+    for mode, result in rows:
+        print(f"{mode:<10}{sessions:>9}{result['p50_ms']:>14.2f}{result['p99_ms']:>14.2f}{result['sockets']:>9}")
+
+    server_task.cancel()
+    game_server.tcp_server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
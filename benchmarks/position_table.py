@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+from server import solver
+from server.position_table import PositionTable, build_table
+from server.tic_toc_toe import TicTocToe
+
+PROCESS_COUNTS = (1, 2, 4, 8)
+
+
+def random_positions(board_size: int, win_length: int, count: int, seed: int = 0) -> list[list[list[int]]]:
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = TicTocToe("a", "b", board_size, win_length)
+        cells = [(row, col) for row in range(board_size) for col in range(board_size)]
+        rng.shuffle(cells)
+        for row, col in cells[:rng.randrange(board_size * board_size)]:
+            game.place_mark("a" if game.current_user == 1 else "b", row, col)
+            if game.has_game_finished():
+                break
+        if not game.has_game_finished():
+            positions.append(game.board)
+    return positions
+
+
+def measure_lookup(position_table: PositionTable, board_size: int, win_length: int, number: int = 20000) -> float:
+    positions = random_positions(board_size, win_length, 1000)
+    for board in positions:
+        if position_table.best_move(board, win_length) is None:
+            raise AssertionError(f"{board_size}x{board_size} position missing from the table: {board}")
+    index = iter(range(number))
+    seconds = timeit.timeit(lambda: position_table.best_move(positions[next(index) % 1000], win_length),
+                            number=number)
+    return seconds / number * 1e9
+
+
+def mapped_memory_kb(path: str) -> tuple[int, int]:
+    rss = pss = 0
+    in_mapping = False
+    with open("/proc/self/smaps") as smaps:
+        for line in smaps:
+            fields = line.split()
+            if "-" in fields[0] and len(fields) >= 5:
+                in_mapping = fields[-1] == path
+            elif in_mapping and fields[0] == "Rss:":
+                rss += int(fields[1])
+            elif in_mapping and fields[0] == "Pss:":
+                pss += int(fields[1])
+    return rss, pss
+
+
+def touch_table(path: str, ready, release, results):
+    position_table = PositionTable(path)
+    for section in position_table.sections.values():
+        sum(section.moves)
+        sum(section.keys)
+    ready.wait()
+    results.put(mapped_memory_kb(os.path.realpath(path)))
+    release.wait()
+
+
+def measure_sharing(path: str, processes: int) -> tuple[float, float]:
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(processes + 1)
+    release = context.Event()
+    results = context.Queue()
+    workers = [context.Process(target=touch_table, args=(path, ready, release, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    ready.wait()
+    samples = [results.get() for _ in workers]
+    release.set()
+    for worker in workers:
+        worker.join()
+    return (sum(rss for rss, _ in samples) / processes / 1024, sum(pss for _, pss in samples) / processes / 1024)
+
+
+def run(path: str | None = None):
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="positions-"), "positions.bin")
+        build_table(path, ((3, 3),))
+    position_table = PositionTable(path)
+    print(position_table.describe())
+    solver.get_solved_table()
+    board = [[1, 0, 0], [0, 2, 0], [0, 0, 0]]
+    solver_ns = timeit.timeit(lambda: solver.choose_move(board), number=20000) / 20000 * 1e9
+    print(f"in-process solved 3x3 table: {solver_ns:.0f} ns/lookup")
+    for board_size, win_length in position_table.sections:
+        print(f"{board_size}x{board_size} win {win_length}: "
+              f"{measure_lookup(position_table, board_size, win_length):.0f} ns/lookup")
+
+    if not os.path.exists("/proc/self/smaps"):
+        return
+    print("resident share counts this process too, which keeps the table mapped while workers touch every page")
+    print(f"{'processes':<12}{'mapped MB/process':>20}{'resident share MB/process':>28}")
+    for processes in PROCESS_COUNTS:
+        rss_mb, pss_mb = measure_sharing(path, processes)
+        print(f"{processes:<12}{rss_mb:>20.2f}{pss_mb:>28.2f}")
+
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import struct
+import time
+
+from benchmarks.loadgen import GameView, spawn_cluster, stop_cluster, wait_until_playable, load_scenario, \
+    DEFAULT_SCENARIO, HOST
+from client.game_client import GameClient
+from client.game_stub import GameStub
+from transport.codec import SUPPORTED_CODECS, JSON_CODEC
+from transport.protocol import Frame
+from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException
+from webserver.spectators import SpectatorFeed
+
+AUDIENCE_SIZES = (0, 500, 2000)
+FAN_OUT_SIZES = (100, 1000, 3000)
+STALLED_SHARE = 0.1
+AUDIENCE_NICENESS = 10
+BOARD_SIZE = 15
+CONCURRENT_CONNECTS = 64
+RECEIVE_TIMEOUT = 30
+PROBE_INTERVAL = 0.001
+
+
+def status_frame(seq: int) -> Frame:
+    board = [[(row * BOARD_SIZE + col + seq) % 3 for col in range(BOARD_SIZE)] for row in range(BOARD_SIZE)]
+    snapshot = {"type": "show_game_status", "game_status": "running", "game_board": board, "current_user": 1,
+                "seq": seq}
+    data = BaseMessage(snapshot).encode(JSON_CODEC, 1)
+    header_length, = struct.unpack_from(">H", data)
+    return Frame(json.loads(data[2:2 + header_length]), data, 2 + header_length)
+
+
+async def measure_fan_out(shared: bool, watchers: int, updates: int = 20) -> tuple[float, float]:
+    loop = asyncio.get_running_loop()
+    feed = SpectatorFeed("bench", (HOST, 0))
+    pairs = [socket.socketpair() for _ in range(watchers)]
+    for server_side, _ in pairs:
+        tcp_client = BaseTCPClient(server_side)
+        await tcp_client.attach()
+        feed.add_watcher(tcp_client)
+    if shared:
+        feed.tasks = [loop.create_task(feed._fan_out())]
+    frames = [status_frame(seq) for seq in range(updates)]
+
+    longest_stall = 0.0
+    running = True
+
+    async def watch_loop():
+        nonlocal longest_stall
+        last = time.perf_counter()
+        while running:
+            # a player frame arriving mid fan-out waits at most as long as this probe oversleeps
+            await asyncio.sleep(PROBE_INTERVAL)
+            now = time.perf_counter()
+            longest_stall = max(longest_stall, now - last - PROBE_INTERVAL)
+            last = now
+
+    ticker = loop.create_task(watch_loop())
+    cpu_start = time.process_time()
+    for frame in frames:
+        if shared:
+            feed._publish(frame)
+        else:
+            # the per-watcher path: every spectator gets its own decode, re-encode and write in one pass
+            for tcp_client in feed.watchers:
+                content = BaseMessage.decode(frame.json_header, frame.content)
+                tcp_client.try_send_bytes(content.encode(JSON_CODEC), True)
+        await asyncio.sleep(0.01)
+    cpu_seconds = time.process_time() - cpu_start
+    running = False
+    await ticker
+    feed.close()
+    for server_side, client_side in pairs:
+        server_side.close()
+        client_side.close()
+    return cpu_seconds / (updates * watchers) * 1e9, longest_stall * 1000
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+class Player:
+    def __init__(self, username: str, client_address: tuple, game_id: asyncio.Future, start: asyncio.Event):
+        self.username = username
+        self.client_address = client_address
+        self.game_id = game_id
+        self.start = start
+        self.stub: GameStub | None = None
+        self.assigned = asyncio.Event()
+        self.round_trips: list[float] = []
+        self.finished_at: float | None = None
+
+    async def play(self, rng: random.Random):
+        tcp_client = BaseTCPClient()
+        await tcp_client.connect(self.client_address)
+        self.stub = GameStub(GameClient(self.username, tcp_client))
+        await self.stub.start_game("multi", BOARD_SIZE, BOARD_SIZE)
+        view = None
+        move_sent_at = None
+        try:
+            while view is None or not view.finished:
+                message = await asyncio.wait_for(self.stub.game_client.receive(), RECEIVE_TIMEOUT)
+                if message['type'] == 'server_assigned':
+                    self.assigned.set()
+                    continue
+                if message['type'] == 'session_token':
+                    if not self.game_id.done():
+                        self.game_id.set_result(message['game_id'])
+                    continue
+                if message['type'] == 'show_game_status':
+                    view = GameView(message)
+                elif message['type'] == 'game_delta' and view is not None:
+                    view.apply_delta(message)
+                    if move_sent_at is not None and message['mark'] == view.your_mark:
+                        self.round_trips.append(time.perf_counter() - move_sent_at)
+                        move_sent_at = None
+                else:
+                    continue
+                if not view.finished and view.current_user == view.your_mark and move_sent_at is None:
+                    await self.start.wait()
+                    row, col = rng.choice(view.empty_cells())
+                    move_sent_at = time.perf_counter()
+                    await self.stub.place_mark(row, col)
+            self.finished_at = time.perf_counter()
+        finally:
+            tcp_client.close()
+
+
+class Spectator:
+    def __init__(self, index: int, stalled: bool):
+        self.username = f"watcher{index}"
+        self.stalled = stalled
+        self.tcp_client: BaseTCPClient | None = None
+        self.frames = 0
+        self.first_frame = asyncio.get_running_loop().create_future()
+        self.finished_at: float | None = None
+
+    async def attach(self, client_address: tuple, game_id: str, connecting: asyncio.Semaphore):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.stalled:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.tcp_client = BaseTCPClient(sock)
+        async with connecting:
+            await self.tcp_client.connect(client_address)
+        watch_message = {
+            "type": "watch_game",
+            "username": self.username,
+            "game_id": game_id,
+            "codecs": SUPPORTED_CODECS
+        }
+        await self.tcp_client.send(BaseMessage(watch_message))
+        if self.stalled:
+            self.tcp_client.protocol.transport.pause_reading()
+            self.first_frame.set_result(None)
+
+    async def watch(self, game_over: asyncio.Event):
+        if self.stalled:
+            await game_over.wait()
+            self.tcp_client.protocol.transport.resume_reading()
+        try:
+            while True:
+                # frames are counted undecoded so the audience's own parsing stays cheap
+                frame = await asyncio.wait_for(self.tcp_client.receive_frame(), RECEIVE_TIMEOUT)
+                self.frames += 1
+                if not self.first_frame.done():
+                    self.first_frame.set_result(None)
+                if frame.json_header.get('game-status') == 'finished':
+                    self.finished_at = time.perf_counter()
+                    return
+        except (asyncio.TimeoutError, SocketClosedException):
+            pass
+        finally:
+            self.tcp_client.close()
+
+
+async def watch_from_audience(client_address: tuple, game_id: str, audience: int, connection) -> dict:
+    loop = asyncio.get_running_loop()
+    spectators = [Spectator(index, index < audience * STALLED_SHARE) for index in range(audience)]
+    connecting = asyncio.Semaphore(CONCURRENT_CONNECTS)
+    await asyncio.gather(*[spectator.attach(client_address, game_id, connecting) for spectator in spectators])
+    game_over = asyncio.Event()
+    watching = [asyncio.create_task(spectator.watch(game_over)) for spectator in spectators]
+    await asyncio.wait_for(asyncio.gather(*[spectator.first_frame for spectator in spectators]), RECEIVE_TIMEOUT)
+    connection.send("ready")
+    game_end = await loop.run_in_executor(None, connection.recv)
+    game_over.set()
+    await asyncio.gather(*watching)
+
+    live = [spectator for spectator in spectators if not spectator.stalled]
+    stalled = [spectator for spectator in spectators if spectator.stalled]
+    delivery = [spectator.finished_at - game_end for spectator in live if spectator.finished_at is not None]
+    return {
+        "live_frames": statistics.mean(spectator.frames for spectator in live) if live else 0.0,
+        "final_p99_ms": percentile(delivery, 0.99) * 1000,
+        "stalled_frames": statistics.mean(spectator.frames for spectator in stalled) if stalled else 0.0,
+        "finished": sum(spectator.finished_at is not None for spectator in spectators)
+    }
+
+
+def run_audience(client_address: tuple, game_id: str, audience: int, connection):
+    # on a shared machine the audience yields the CPU to the servers, as it would on its own hosts
+    os.nice(AUDIENCE_NICENESS)
+    connection.send(asyncio.run(watch_from_audience(client_address, game_id, audience, connection)))
+
+
+async def watch_one_game(client_address: tuple, audience: int, seed: int = 0) -> dict:
+    loop = asyncio.get_running_loop()
+    game_id = loop.create_future()
+    start = asyncio.Event()
+    players = [Player(f"player{seed}-{index}", client_address, game_id, start) for index in range(2)]
+    rng = random.Random(seed)
+    playing = [asyncio.create_task(players[0].play(rng))]
+    # matchmaking pairs the second player with the first one's chatroom only once that one is assigned
+    await asyncio.wait_for(players[0].assigned.wait(), RECEIVE_TIMEOUT)
+    playing.append(asyncio.create_task(players[1].play(rng)))
+    await asyncio.wait_for(asyncio.shield(game_id), RECEIVE_TIMEOUT)
+
+    result = {"live_frames": 0.0, "final_p99_ms": 0.0, "stalled_frames": 0.0, "finished": 0}
+    process = None
+    if audience:
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.get_context("spawn").Process(
+            target=run_audience, args=(client_address, game_id.result(), audience, child_connection))
+        process.start()
+        await loop.run_in_executor(None, connection.recv)
+
+    start.set()
+    await asyncio.gather(*playing)
+    if process is not None:
+        connection.send(min(player.finished_at for player in players))
+        result = await loop.run_in_executor(None, connection.recv)
+        process.join()
+
+    round_trips = [sample for player in players for sample in player.round_trips]
+    return {
+        **result,
+        "moves": len(round_trips),
+        "move_p50_ms": percentile(round_trips, 0.5) * 1000,
+        "move_p99_ms": percentile(round_trips, 0.99) * 1000
+    }
+
+
+def run_fan_out():
+    print(f"{'watchers':<10}{'per-watcher ns/watcher':>24}{'shared ns/watcher':>20}"
+          f"{'per-watcher stall ms':>22}{'shared stall ms':>17}")
+    for watchers in FAN_OUT_SIZES:
+        copied_ns, copied_stall = asyncio.run(measure_fan_out(False, watchers))
+        shared_ns, shared_stall = asyncio.run(measure_fan_out(True, watchers))
+        print(f"{watchers:<10}{copied_ns:>24.0f}{shared_ns:>20.0f}{copied_stall:>22.1f}{shared_stall:>17.1f}")
+
+
+async def run(audience_sizes: tuple[int, ...], client_address: tuple | None):
+    scenario = load_scenario(DEFAULT_SCENARIO)
+    processes = []
+    if client_address is None:
+        client_address, processes = spawn_cluster(scenario)
+    try:
+        await wait_until_playable(scenario, client_address)
+        print(f"{'watchers':<10}{'moves':>7}{'move p50 ms':>13}{'move p99 ms':>13}{'frames/live':>13}"
+              f"{'final p99 ms':>14}{'frames/stalled':>16}{'got final':>11}")
+        for seed, audience in enumerate(audience_sizes):
+            result = await watch_one_game(client_address, audience, seed)
+            print(f"{audience:<10}{result['moves']:>7}{result['move_p50_ms']:>13.2f}{result['move_p99_ms']:>13.2f}"
+                  f"{result['live_frames']:>13.1f}{result['final_p99_ms']:>14.1f}"
+                  f"{result['stalled_frames']:>16.1f}{result['finished']:>11}")
+    finally:
+        stop_cluster(processes)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure player move latency while spectators watch the game")
+    parser.add_argument("--watchers", nargs="+", type=int, default=list(AUDIENCE_SIZES),
+                        help="audience sizes to run one game each with")
+    parser.add_argument("--target", default=None,
+                        help="host:port of an already running webserver; spawns a local cluster when omitted")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    target = None
+    if args.target is not None:
+        target_host, target_port = args.target.rsplit(":", 1)
+        target = (target_host, int(target_port))
+    run_fan_out()
+    asyncio.run(run(tuple(args.watchers), target))
@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+from benchmarks import bridge, codec, engine, framing, matchmaking, timer_wheel
+from benchmarks.write_queue import STATUS_MESSAGE
+from server.bitboard_tic_toc_toe import BitboardTicTocToe
+from server.tic_toc_toe import TicTocToe
+from transport.codec import BINARY_CODEC, JSON_CODEC
+from utils import json_encode, json_decode
+from webserver.chatroom import ChatRoom, ChatroomRepository
+
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.10
+
+
+def engine_case(engine_class, board_size: int, win_length: int, games: int):
+    moves = engine.random_games(games, 1, board_size, win_length)
+    board_options = () if engine_class is BitboardTicTocToe else (board_size, win_length)
+    return lambda: 1e9 / engine.measure_moves_per_second(engine_class, moves, *board_options)
+
+
+def encode_case(message_codec, content: dict, number: int = 20000):
+    return lambda: codec.measure_codec(message_codec, content, number)["encode_ns"]
+
+
+def decode_case(message_codec, content: dict, number: int = 20000):
+    return lambda: codec.measure_codec(message_codec, content, number)["decode_ns"]
+
+
+def json_encode_case(number: int = 20000):
+    return lambda: timeit.timeit(lambda: json_encode(STATUS_MESSAGE, 'utf-8'), number=number) / number * 1e9
+
+
+def json_decode_case(number: int = 20000):
+    data = json_encode(STATUS_MESSAGE, 'utf-8')
+    return lambda: timeit.timeit(lambda: json_decode(data, 'utf-8'), number=number) / number * 1e9
+
+
+def receive_case(content: dict, count: int):
+    return lambda: 1e9 / asyncio.run(framing.measure_receive_throughput(framing.BaseTCPClient, content, count))
+
+
+def bridge_case(passthrough: bool, message_codec, count: int = 3000):
+    return lambda: 1e9 / asyncio.run(bridge.measure_relay(passthrough, message_codec, 1, count))
+
+
+def chatroom_repository(servers: int) -> ChatroomRepository:
+    repo = ChatroomRepository()
+    for index in range(servers):
+        server_address = ("127.0.0.1", 10000 + index)
+        repo.add_gameserver(server_address)
+        repo.update_capacity(server_address, 256, index % 200)
+    return repo
+
+
+def pop_free_chatroom_case(servers: int = 1000, number: int = 5000):
+    async def measure() -> float:
+        repo = chatroom_repository(servers)
+        board_options = (3, 3)
+        start = time.perf_counter()
+        for _ in range(number):
+            chatroom = await repo.pop_free_chatroom(True, board_options)
+            repo.release_chatroom(chatroom)
+        return (time.perf_counter() - start) / number * 1e9
+
+    return lambda: asyncio.run(measure())
+
+
+def update_load_case(servers: int = 1000, number: int = 20000):
+    def measure() -> float:
+        repo = chatroom_repository(servers)
+        reports = [{"capacity": 256, "active_games": index % 256, "connected_clients": index % 512,
+                    "loop_lag_ms": index % 7, "ai_pending": index % 3} for index in range(number)]
+        start = time.perf_counter()
+        for index, report in enumerate(reports):
+            repo.update_load(("127.0.0.1", 10000 + index % servers), report)
+        return (time.perf_counter() - start) / number * 1e9
+
+    return measure
+
+
+def waiting_chatroom_case(users: int = 10000):
+    def measure() -> float:
+        repo = chatroom_repository(1)
+        chatrooms = [ChatRoom(("127.0.0.1", 10000), f"game-{index // 2}") for index in range(users)]
+        start = time.perf_counter()
+        for index, chatroom in enumerate(chatrooms):
+            repo.add_waiting_chatroom(f"user{index}", chatroom)
+        for index in range(users):
+            repo.pop_waiting_chatroom(f"user{index}")
+        return (time.perf_counter() - start) / users * 1e9
+
+    return measure
+
+
+def multiplayer_pairing_case(pairs: int = 5000):
+    return lambda: asyncio.run(matchmaking.measure_multiplayer_pairing(pairs)) * 1000
+
+
+def timer_restart_case(pending: int, count: int = 20000):
+    return lambda: asyncio.run(timer_wheel.measure_schedule_cancel(True, pending, count))
+
+
+CASES = {
+    "engine.place_mark.array_3x3": engine_case(TicTocToe, 3, 3, 2000),
+    "engine.place_mark.bitboard_3x3": engine_case(BitboardTicTocToe, 3, 3, 2000),
+    "engine.place_mark.array_7x7": engine_case(TicTocToe, 7, 4, 200),
+    "engine.place_mark.array_15x15": engine_case(TicTocToe, 15, 5, 40),
+    "codec.encode.show_game_status.json": encode_case(JSON_CODEC, STATUS_MESSAGE),
+    "codec.encode.show_game_status.binary": encode_case(BINARY_CODEC, STATUS_MESSAGE),
+    "codec.encode.place_mark.json": encode_case(JSON_CODEC, framing.PAYLOADS["place_mark"]),
+    "codec.encode.place_mark.binary": encode_case(BINARY_CODEC, framing.PAYLOADS["place_mark"]),
+    "codec.decode.show_game_status.json": decode_case(JSON_CODEC, STATUS_MESSAGE),
+    "codec.decode.show_game_status.binary": decode_case(BINARY_CODEC, STATUS_MESSAGE),
+    "utils.json_encode": json_encode_case(),
+    "utils.json_decode": json_decode_case(),
+    "framing.receive.place_mark": receive_case(framing.PAYLOADS["place_mark"], 20000),
+    "framing.receive.large": receive_case(framing.PAYLOADS["large"], 500),
+    "bridge.relay.passthrough.json": bridge_case(True, JSON_CODEC),
+    "bridge.relay.passthrough.binary": bridge_case(True, BINARY_CODEC),
+    "bridge.relay.decode.json": bridge_case(False, JSON_CODEC),
+    "chatroom.pop_free_chatroom.1000_servers": pop_free_chatroom_case(),
+    "chatroom.update_load.1000_servers": update_load_case(),
+    "chatroom.waiting_chatroom.10000_users": waiting_chatroom_case(),
+    "chatroom.multiplayer_pairing.5000_pairs": multiplayer_pairing_case(),
+    "timer_wheel.restart.100000_pending": timer_restart_case(100000),
+}
+
+
+def run_cases(name_filter: str | None, repeats: int) -> dict:
+    results = dict()
+    for name, case in CASES.items():
+        if name_filter is not None and name_filter not in name:
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs = [case() for _ in range(repeats)]
+        results[name] = {
+            "ns_per_op": round(statistics.median(runs), 1),
+            "min_ns_per_op": round(min(runs), 1),
+            "spread": round((max(runs) - min(runs)) / statistics.median(runs), 3),
+        }
+        print(f"{name:<44}{results[name]['ns_per_op']:>14.1f} ns/op  spread {results[name]['spread']:.1%}",
+              file=sys.stderr)
+    return {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": repeats,
+        "cases": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    regressions = []
+    print(f"{'case (best ns/op)':<44}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, result in current["cases"].items():
+        baseline_result = baseline["cases"].get(name)
+        if baseline_result is None:
+            print(f"{name:<44}{'-':>12}{result['min_ns_per_op']:>12.1f}{'new':>9}")
+            continue
+        change = result["min_ns_per_op"] / baseline_result["min_ns_per_op"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  improved"
+        print(f"{name:<44}{baseline_result['min_ns_per_op']:>12.1f}{result['min_ns_per_op']:>12.1f}"
+              f"{change:>+9.1%}{flag}")
+    for name in baseline["cases"].keys() - current["cases"].keys():
+        print(f"{name:<44}{baseline['cases'][name]['min_ns_per_op']:>12.1f}{'-':>12}{'missing':>9}")
+    return regressions
+
+
+def load_results(path: str) -> dict:
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the engine, codec, framing, bridge and "
+                                                 "matchmaking hot paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the suite and write JSON results")
+    run_parser.add_argument("--output", default=None, help="write results here instead of stdout")
+    run_parser.add_argument("--filter", default=None, help="only run cases whose name contains this text")
+    run_parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="runs per case; the median is kept")
+    run_parser.add_argument("--baseline", default=None, help="compare against these stored results after running")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="relative slowdown that counts as a regression")
+    compare_parser = subparsers.add_parser("compare", help="compare two stored results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="relative slowdown that counts as a regression")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
+    if args.command == "compare":
+        current = load_results(args.current)
+        baseline = load_results(args.baseline)
+    else:
+        current = run_cases(args.filter, args.repeats)
+        results_json = json.dumps(current, indent=2)
+        if args.output is None:
+            print(results_json)
+        else:
+            with open(args.output, "w") as output_file:
+                output_file.write(results_json + "\n")
+        if args.baseline is None:
+            return 0
+        baseline = load_results(args.baseline)
+        if args.filter is not None:
+            baseline["cases"] = {name: result for name, result in baseline["cases"].items() if args.filter in name}
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import asyncio
+import random
+import time
+
+from timer_wheel import TimerWheel
+
+PENDING_COUNTS = (1000, 10000, 100000)
+
+
+def noop():
+    pass
+
+
+async def measure_schedule_cancel(use_wheel: bool, pending: int, count: int = 100000, seed: int = 0) -> float:
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(loop=loop)
+    call_later = wheel.call_later if use_wheel else loop.call_later
+    rng = random.Random(seed)
+    timers = [call_later(rng.uniform(1, 600), noop) for _ in range(pending)]
+    await asyncio.sleep(0)
+    elapsed = 0.0
+    for batch in range(count // 1000):
+        start = time.perf_counter()
+        for index in range(batch * 1000, (batch + 1) * 1000):
+            slot = index % pending
+            timers[slot].cancel()
+            timers[slot] = call_later(60, noop)
+        elapsed += time.perf_counter() - start
+        # the loop only purges cancelled heap entries while it runs, as it would between client messages
+        await asyncio.sleep(0)
+    for timer in timers:
+        timer.cancel()
+    wheel.close()
+    return elapsed / (count // 1000 * 1000) * 1e9
+
+
+async def measure_expiry(use_wheel: bool, count: int, spread: float = 0.5) -> tuple[float, float]:
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(tick=0.01, loop=loop)
+    call_later = wheel.call_later if use_wheel else loop.call_later
+    done = loop.create_future()
+    remaining = count
+    latest = 0.0
+
+    def fire(deadline: float):
+        nonlocal remaining, latest
+        latest = max(latest, loop.time() - deadline)
+        remaining -= 1
+        if remaining == 0:
+            done.set_result(None)
+
+    rng = random.Random(1)
+    cpu_start = time.process_time()
+    for _ in range(count):
+        delay = rng.uniform(0, spread)
+        call_later(delay, fire, loop.time() + delay)
+    await done
+    cpu_seconds = time.process_time() - cpu_start
+    wheel.close()
+    return cpu_seconds / count * 1e9, latest * 1000
+
+
+def run():
+    print(f"{'pending timers':<16}{'call_later ns/restart':>24}{'wheel ns/restart':>20}")
+    for pending in PENDING_COUNTS:
+        heap_ns = asyncio.run(measure_schedule_cancel(False, pending))
+        wheel_ns = asyncio.run(measure_schedule_cancel(True, pending))
+        print(f"{pending:<16}{heap_ns:>24.0f}{wheel_ns:>20.0f}")
+
+    print(f"{'expiring timers':<16}{'call_later cpu ns/timer':>24}{'wheel cpu ns/timer':>20}"
+          f"{'call_later late ms':>20}{'wheel late ms':>16}")
+    for count in PENDING_COUNTS:
+        heap_ns, heap_late = asyncio.run(measure_expiry(False, count))
+        wheel_ns, wheel_late = asyncio.run(measure_expiry(True, count))
+        print(f"{count:<16}{heap_ns:>24.0f}{wheel_ns:>20.0f}{heap_late:>20.1f}{wheel_late:>16.1f}")
+
+
+if __name__ == '__main__':
+    run()
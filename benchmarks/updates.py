@@ -0,0 +1,82 @@
+import asyncio
+import contextlib
+import io
+
+from benchmarks.write_queue import open_pair
+from server.game_server import GameServer
+from transport.codec import JSON_CODEC, SUPPORTED_CODECS
+from transport.tcp_client import BaseTCPClient, BaseMessage
+
+BOARD_OPTIONS = ((3, 3), (7, 4), (15, 5))
+
+
+async def play_game(server_address: tuple, board_size: int, win_length: int, updates: str,
+                    codecs: list[str]) -> tuple[int, int]:
+    tcp_client = BaseTCPClient()
+    await tcp_client.connect(server_address)
+    await tcp_client.send(BaseMessage({
+        "type": "start_game",
+        "username": "player",
+        "game_type": "single",
+        "board_size": board_size,
+        "win_length": win_length,
+        "codecs": codecs,
+        "updates": updates
+    }))
+
+    board = None
+    your_mark = 0
+    received_bytes = 0
+    moves = 0
+    while True:
+        frame = await tcp_client.receive_frame()
+        received_bytes += len(frame.data)
+        content = tcp_client._decode_frame(frame.json_header, frame.content).content
+        if content['type'] == 'show_game_status':
+            board = [list(cells) for cells in content['game_board']]
+            your_mark = content['your_mark']
+        elif content['type'] == 'game_delta':
+            board[content['row']][content['col']] = content['mark']
+        else:
+            continue
+        if content['type'] == 'game_delta' or content.get('seq', 0) > 0:
+            moves += 1
+        if content['game_status'] == 'finished':
+            break
+        if content['current_user'] == your_mark:
+            row, col = next((row, col) for row in range(board_size) for col in range(board_size)
+                            if board[row][col] == 0)
+            await tcp_client.send(BaseMessage({"type": "place_mark", "username": "player", "row": row, "col": col}))
+
+    tcp_client.close()
+    return received_bytes, moves
+
+
+async def run(games: int = 20):
+    game_server_master, _ = await open_pair(BaseTCPClient)
+    game_server = GameServer(game_server_master, '127.0.0.1', 0)
+    server_task = asyncio.create_task(game_server.start())
+    server_address = (game_server.tcp_server.host, game_server.tcp_server.port)
+
+    print(f"{'board':<8}{'codec':<8}{'snapshot B/move':>17}{'delta B/move':>14}{'ratio':>8}")
+    for board_size, win_length in BOARD_OPTIONS:
+        for codecs in ([JSON_CODEC.name], SUPPORTED_CODECS):
+            bytes_per_move = dict()
+            for updates in ("snapshot", "delta"):
+                total_bytes, total_moves = 0, 0
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(games):
+                        received_bytes, moves = await asyncio.wait_for(
+                            play_game(server_address, board_size, win_length, updates, codecs), 10)
+                        total_bytes += received_bytes
+                        total_moves += moves
+                bytes_per_move[updates] = total_bytes / total_moves
+            print(f"{f'{board_size}x{board_size}':<8}{codecs[0]:<8}{bytes_per_move['snapshot']:>17.1f}"
+                  f"{bytes_per_move['delta']:>14.1f}{bytes_per_move['snapshot'] / bytes_per_move['delta']:>7.1f}x")
+
+    server_task.cancel()
+    game_server.tcp_server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
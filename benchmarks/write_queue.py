@@ -0,0 +1,100 @@
+import asyncio
+import contextlib
+import os
+import time
+
+from transport.socket_client import SocketTCPClient
+from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException
+from transport.tcp_server import BaseTCPServer
+from transport.write_queue import SlowConsumerPolicy
+
+STATUS_MESSAGE = {
+    "type": "show_game_status",
+    "game_status": "running",
+    "game_board": [[1, 0, 2], [0, 1, 0], [2, 0, 0]],
+    "your_mark": 1,
+    "opponent_mark": 2,
+    "current_user": 2
+}
+
+
+async def open_pair(client_class: type[BaseTCPClient], **client_kwargs):
+    tcp_server = BaseTCPServer('127.0.0.1', 0, client_class=client_class)
+    accept_task = asyncio.create_task(tcp_server.accept())
+    sender = client_class(**client_kwargs)
+    await sender.connect(tcp_server.sock.getsockname())
+    receiver = await accept_task
+    tcp_server.close()
+    return sender, receiver
+
+
+async def measure_burst(client_class: type[BaseTCPClient], count: int, burst: int) -> dict:
+    sender, receiver = await open_pair(client_class)
+
+    async def receive_all():
+        for _ in range(count):
+            await receiver.receive()
+
+    message = BaseMessage(STATUS_MESSAGE)
+    receive_task = asyncio.create_task(receive_all())
+    start = time.perf_counter()
+    for _ in range(count // burst):
+        await asyncio.gather(*[sender.send(message) for _ in range(burst)])
+    await receive_task
+    elapsed = time.perf_counter() - start
+
+    write_queue = sender.write_queue
+    result = {
+        "frames_per_second": count / elapsed,
+        "frames_per_write": write_queue.frames_per_write if write_queue else 1.0,
+        "max_depth": write_queue.max_depth if write_queue else 0,
+    }
+    sender.close()
+    receiver.close()
+    return result
+
+
+async def measure_slow_consumer(policy: SlowConsumerPolicy, count: int) -> dict:
+    sender, receiver = await open_pair(BaseTCPClient, slow_consumer_policy=policy)
+    message = BaseMessage(STATUS_MESSAGE)
+    sent = 0
+    disconnected = False
+    try:
+        for _ in range(count):
+            await asyncio.wait_for(sender.send(message), timeout=0.5)
+            sent += 1
+    except SocketClosedException:
+        disconnected = True
+    except asyncio.TimeoutError:
+        pass
+
+    write_queue = sender.write_queue
+    result = {
+        "sent": sent,
+        "dropped": write_queue.frames_dropped,
+        "max_depth": write_queue.max_depth,
+        "disconnected": disconnected,
+    }
+    sender.close()
+    receiver.close()
+    return result
+
+
+async def run(count: int = 20000):
+    print(f"{'backend':<10}{'burst':>6}{'frames/s':>12}{'frames/write':>14}{'max depth':>11}")
+    for client_class in (SocketTCPClient, BaseTCPClient):
+        for burst in (1, 2, 16):
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                result = await measure_burst(client_class, count, burst)
+            print(f"{client_class.__name__[:9]:<10}{burst:>6}{result['frames_per_second']:>12.0f}"
+                  f"{result['frames_per_write']:>14.1f}{result['max_depth']:>11}")
+
+    print(f"{'slow consumer policy':<22}{'sent':>8}{'dropped':>9}{'max depth':>11}{'disconnected':>14}")
+    for policy in SlowConsumerPolicy:
+        result = await measure_slow_consumer(policy, count * 50)
+        print(f"{policy.value:<22}{result['sent']:>8}{result['dropped']:>9}{result['max_depth']:>11}"
+              f"{str(result['disconnected']):>14}")
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
@@ -1,5 +1,4 @@
 import enum
-import pprint
 import re
 
 from client.exceptions import ExitGameException
@@ -15,9 +14,18 @@ class GameControllerState(enum.Enum):
 
 
 class BaseGameController:
-    def __init__(self, game_stub: GameStub):
+    def __init__(self, game_stub: GameStub, board_size: int = 3, win_length: int = 3):
         self.game_stub: GameStub = game_stub
+        self.board_size = board_size
+        self.win_length = win_length
         self.state = GameControllerState.IDLE
+        self.game_board: list[list[int]] | None = None
+        self.your_mark = 0
+        self.current_user = 0
+        self.game_status = None
+        self.winner = None
+        self.seq = 0
+        self.awaiting_snapshot = False
 
     async def handle_user_input(self):
         line = str.strip(await async_input("Enter your command\n"))
@@ -38,6 +46,11 @@ class BaseGameController:
     async def handle_interprocess_communications(self):
         while True:
             message = await self.game_stub.game_client.receive()
+            if message['type'] == 'game_delta' and (self.game_board is None or message['seq'] != self.seq + 1):
+                if message['seq'] > self.seq and not self.awaiting_snapshot:
+                    self.awaiting_snapshot = True
+                    await self.game_stub.resync(self.seq)
+                continue
             self._handle_message(message)
 
     def _handle_message(self, message):
@@ -51,27 +64,19 @@ class BaseGameController:
             else:
                 self.state = GameControllerState.PLAYING
         elif message_type == 'show_game_status':
-            self.state = GameControllerState.PLAYING
-            game_status = message['game_status']
-            game_board = message['game_board']
-            print("game_status = ", game_status)
-            print("game_board : ")
-            pprint.pprint(game_board, width=13)
-            print(f'your mark = {message["your_mark"]}')
-            op_mark = 1
-            if op_mark == message["your_mark"]:
-                op_mark = 2
-            print(f'opponent mark = {op_mark}')
-            if game_status == 'finished':
-                if message['winner'] == 0:
-                    print("WITHDRAW".center(40, "*"))
-                elif message['winner'] == message['your_mark']:
-                    print("YOU WIN".center(40, "*"))
-                else:
-                    print("YOU LOSE".center(40, "*"))
-                self.state = GameControllerState.IDLE
-            else:
-                print('is your turn= ', message['current_user'] == message['your_mark'])
+            self.game_board = [list(cells) for cells in message['game_board']]
+            self.your_mark = message['your_mark']
+            self.seq = message.get('seq', 0)
+            self.awaiting_snapshot = False
+            self._apply_status(message)
+        elif message_type == 'game_delta':
+            self.game_board[message['row']][message['col']] = message['mark']
+            self.seq = message['seq']
+            self._apply_status(message)
+        elif message_type == 'session_token':
+            if self.game_stub.resume_token is None:
+                print(f"game id: {message['game_id']} (others can watch it from the main menu)")
+            self.game_stub.resume_token = message['resume_token']
         elif message_type == 'server_crashed':
             print("Server crashed. Press Enter to return to Main menu")
             self.state = GameControllerState.IDLE
@@ -82,16 +87,50 @@ class BaseGameController:
         elif message_type == "opponent_escaped":
             print(" Opponent has been disconnected ".center(40, "!"))
             print(" Press Enter to go Main Menu ".center(40, "*"))
+            self.game_stub.resume_token = None
+            self.state = GameControllerState.IDLE
+
+    def _apply_status(self, message):
+        self.state = GameControllerState.PLAYING
+        self.current_user = message['current_user']
+        self.game_status = message['game_status']
+        self.winner = message.get('winner')
+        print("game_status = ", self.game_status)
+        print("game_board : ")
+        self._print_board(self.game_board)
+        print(f'your mark = {self.your_mark}')
+        op_mark = 1
+        if op_mark == self.your_mark:
+            op_mark = 2
+        print(f'opponent mark = {op_mark}')
+        if self.game_status == 'finished':
+            if self.winner == 0:
+                print("WITHDRAW".center(40, "*"))
+            elif self.winner == self.your_mark:
+                print("YOU WIN".center(40, "*"))
+            else:
+                print("YOU LOSE".center(40, "*"))
+            self.game_stub.resume_token = None
             self.state = GameControllerState.IDLE
+        else:
+            print('is your turn= ', self.current_user == self.your_mark)
+
+    @staticmethod
+    def _print_board(game_board: list[list[int]]):
+        cell_width = len(str(len(game_board) - 1)) + 1
+        print(" " * cell_width + "".join(str(col).rjust(cell_width) for col in range(len(game_board[0]))))
+        for row, cells in enumerate(game_board):
+            print(str(row).rjust(cell_width) + "".join(str(cell).rjust(cell_width) for cell in cells))
 
 
 class SinglePlayerGameController(BaseGameController):
-    def __init__(self, game_stub: GameStub):
-        super().__init__(game_stub)
+    def __init__(self, game_stub: GameStub, board_size: int = 3, win_length: int = 3, difficulty: str = "hard"):
+        super().__init__(game_stub, board_size, win_length)
+        self.difficulty = difficulty
 
     async def handle_user_input(self):
         self.state = GameControllerState.WAITING_FOR_SERVER
-        await self.game_stub.start_game("single")
+        await self.game_stub.start_game("single", self.board_size, self.win_length, self.difficulty)
 
         while self.state != GameControllerState.IDLE:
             print(" Single Player Menu ".center(40, "*"))
@@ -102,12 +141,12 @@ class SinglePlayerGameController(BaseGameController):
 
 
 class MultiPlayerGameController(BaseGameController):
-    def __init__(self, game_stub: GameStub):
-        super().__init__(game_stub)
+    def __init__(self, game_stub: GameStub, board_size: int = 3, win_length: int = 3):
+        super().__init__(game_stub, board_size, win_length)
 
     async def handle_user_input(self):
         self.state = GameControllerState.WAITING_FOR_SERVER
-        await self.game_stub.start_game("multi")
+        await self.game_stub.start_game("multi", self.board_size, self.win_length)
 
         while self.state != GameControllerState.IDLE:
             print(" Multi Player Menu ".center(40, "*"))
@@ -123,3 +162,49 @@ class MultiPlayerGameController(BaseGameController):
         if command == '/change':
             await self.game_stub.change_game()
             self.state = GameControllerState.IDLE
+
+
+class SpectatorGameController(BaseGameController):
+    def __init__(self, game_stub: GameStub, game_id: str):
+        super().__init__(game_stub)
+        self.game_id = game_id
+
+    async def handle_user_input(self):
+        self.state = GameControllerState.WAITING_FOR_SERVER
+        await self.game_stub.watch_game(self.game_id)
+
+        while self.state != GameControllerState.IDLE:
+            print(" Spectator Menu ".center(40, "*"))
+            line = str.strip(await async_input("Enter 'stop' to leave the game\n"))
+            if line in {'stop', '/exit'} and self.state != GameControllerState.IDLE:
+                await self.game_stub.stop_watching()
+                self.state = GameControllerState.IDLE
+
+    def _handle_message(self, message):
+        message_type = message['type']
+
+        if message_type == 'show_game_status':
+            self.game_board = [list(cells) for cells in message['game_board']]
+            self.seq = message.get('seq', 0)
+            self.state = GameControllerState.PLAYING
+            print("game_status = ", message['game_status'])
+            self._print_board(self.game_board)
+            if message['game_status'] == 'finished':
+                winner = message.get('winner')
+                print(("WITHDRAW" if winner == 0 else f"PLAYER {winner} WINS").center(40, "*"))
+                print(" Press Enter to go Main Menu ".center(40, "*"))
+                self.state = GameControllerState.IDLE
+            else:
+                print(f"player {message['current_user']} to move")
+        elif message_type == 'game_not_found':
+            print(f" No running game with id {message['game_id']} ".center(40, "!"))
+            print(" Press Enter to go Main Menu ".center(40, "*"))
+            self.state = GameControllerState.IDLE
+        elif message_type == 'game_closed':
+            if self.state != GameControllerState.IDLE:
+                print(" The game was closed before it finished ".center(40, "!"))
+                print(" Press Enter to go Main Menu ".center(40, "*"))
+                self.state = GameControllerState.IDLE
+        elif message_type == 'server_crashed':
+            print("Server crashed. Press Enter to return to Main menu")
+            self.state = GameControllerState.IDLE
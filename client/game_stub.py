@@ -1,9 +1,11 @@
 from client.game_client import GameClient
+from transport.codec import SUPPORTED_CODECS
 
 
 class GameStub:
     def __init__(self, game_client: GameClient):
         self.game_client: GameClient = game_client
+        self.resume_token: str | None = None
 
     async def place_mark(self, row, col):
         message = {
@@ -29,11 +31,18 @@ class GameStub:
 
         await self.game_client.send(message)
 
-    async def start_game(self, game_type="single"):
+    async def start_game(self, game_type="single", board_size=3, win_length=3, difficulty="hard"):
         message = {
             "type": "start_game",
-            "game_type": game_type
+            "game_type": game_type,
+            "board_size": board_size,
+            "win_length": win_length,
+            "difficulty": difficulty,
+            "codecs": SUPPORTED_CODECS,
+            "updates": "delta"
         }
+        if self.resume_token is not None:
+            message["resume_token"] = self.resume_token
 
         await self.game_client.send(message)
 
@@ -43,3 +52,27 @@ class GameStub:
         }
 
         await self.game_client.send(message)
+
+    async def resync(self, seq: int):
+        message = {
+            "type": "resync",
+            "seq": seq
+        }
+
+        await self.game_client.send(message)
+
+    async def watch_game(self, game_id: str):
+        message = {
+            "type": "watch_game",
+            "game_id": game_id,
+            "codecs": SUPPORTED_CODECS
+        }
+
+        await self.game_client.send(message)
+
+    async def stop_watching(self):
+        message = {
+            "type": "stop_watching"
+        }
+
+        await self.game_client.send(message)
@@ -1,9 +1,10 @@
 import asyncio
+import re
 
 import webserver_main
 from client.game_client import GameClient
 from client.game_controller import MultiPlayerGameController, SinglePlayerGameController, \
-    BaseGameController, ExitGameException
+    SpectatorGameController, BaseGameController, ExitGameException
 from client.game_stub import GameStub
 from transport.tcp_client import BaseTCPClient, SocketClosedException
 from utils import async_input, wait_until_first_completed
@@ -17,17 +18,36 @@ async def async_get_username() -> str:
     return await async_input("Welcome!\nEnter you username:\n")
 
 
+async def async_get_board_options() -> tuple[int, int]:
+    line = await async_input("Enter board size and win length (e.g. '15 5'), or press Enter for 3x3:\n")
+    if re.search(r'^\s*\d+\s+\d+\s*$', line) is None:
+        return 3, 3
+    board_size, win_length = map(int, line.split())
+    return board_size, win_length
+
+
+async def async_get_difficulty() -> str:
+    line = str.strip((await async_input("Choose difficulty (easy/medium/hard) [hard]:\n")).lower())
+    if line in {'easy', 'medium', 'hard'}:
+        return line
+    return 'hard'
+
+
 async def async_control_main_menu(game_stub: GameStub) -> BaseGameController | None:
     while True:
         print(" Main Menu ".center(40, "*"))
-        command = await async_input("1.Training\n2.Multiplayer\n3.Exit\n")
+        command = await async_input("1.Training\n2.Multiplayer\n3.Watch a game\n4.Exit\n")
         command_lower = str.strip(command.lower())
         try:
             if command_lower in {'1', 'train', 'training', '1.training'}:
-                return SinglePlayerGameController(game_stub)
+                board_size, win_length = await async_get_board_options()
+                return SinglePlayerGameController(game_stub, board_size, win_length, await async_get_difficulty())
             elif command_lower in {'2', 'multi', 'multiplayer', '2.multiplayer'}:
-                return MultiPlayerGameController(game_stub)
-            elif command_lower in {'3', 'exit', '/exit', '3.exit'}:
+                return MultiPlayerGameController(game_stub, *await async_get_board_options())
+            elif command_lower in {'3', 'watch', '3.watch a game'}:
+                game_id = str.strip(await async_input("Enter the game id to watch:\n"))
+                return SpectatorGameController(game_stub, game_id)
+            elif command_lower in {'4', 'exit', '/exit', '4.exit'}:
                 raise ExitGameException("exit")
         except SocketClosedException:
             print("Disconnected from webserver")
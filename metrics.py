@@ -0,0 +1,228 @@
+import asyncio
+from bisect import bisect_left
+from time import perf_counter
+
+METRIC_PREFIX = "tictoctoe_"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        return [f"{name}{labels} {self.value}"]
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def dec(self, amount: int = 1):
+        self.value -= amount
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        return [f"{name}{labels} {self.value}"]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self, name: str, labels: str) -> list[str]:
+        label_prefix = labels[:-1] + "," if labels else "{"
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{label_prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{label_prefix}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class MetricFamily:
+    def __init__(self, name: str, kind: str, help_text: str, label_names: tuple[str, ...], factory):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.label_names = label_names
+        self.factory = factory
+        self.children: dict[tuple, Counter | Gauge | Histogram] = dict()
+
+    def labels(self, *label_values):
+        child = self.children.get(label_values)
+        if child is None:
+            child = self.factory()
+            self.children[label_values] = child
+        return child
+
+    def format_labels(self, label_values: tuple) -> str:
+        if not label_values:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, label_values)) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families: dict[str, MetricFamily] = dict()
+
+    def counter(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        return self._register(name, "counter", help_text, label_names, Counter)
+
+    def gauge(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        return self._register(name, "gauge", help_text, label_names, Gauge)
+
+    def histogram(self, name: str, help_text: str, label_names: tuple[str, ...] = (),
+                  bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        return self._register(name, "histogram", help_text, label_names, lambda: Histogram(bounds))
+
+    def _register(self, name: str, kind: str, help_text: str, label_names: tuple[str, ...], factory):
+        name = METRIC_PREFIX + name
+        family = self.families.get(name)
+        if family is None:
+            family = MetricFamily(name, kind, help_text, label_names, factory)
+            self.families[name] = family
+        if label_names:
+            return family
+        return family.labels()
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help_text}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for label_values, child in family.children.items():
+                lines.extend(child.samples(family.name, family.format_labels(label_values)))
+        return "\n".join(lines) + "\n"
+
+    def describe(self) -> list[str]:
+        lines = []
+        for family in self.families.values():
+            for label_values, child in family.children.items():
+                name = family.name[len(METRIC_PREFIX):] + family.format_labels(label_values)
+                if isinstance(child, Histogram):
+                    lines.append(f"{name} count={child.count} p50<={child.quantile(0.5) * 1000:g}ms "
+                                 f"p99<={child.quantile(0.99) * 1000:g}ms")
+                else:
+                    lines.append(f"{name} {child.value}")
+        return lines
+
+
+REGISTRY = MetricsRegistry()
+
+FRAMES = REGISTRY.counter("frames_total", "Frames sent or received, by direction and message type",
+                          ("direction", "type"))
+FRAME_BYTES = REGISTRY.counter("frame_bytes_total", "Frame bytes sent or received, by direction and message type",
+                               ("direction", "type"))
+OPEN_CONNECTIONS = REGISTRY.gauge("open_connections", "Open framed TCP connections")
+ACTIVE_GAMES = REGISTRY.gauge("active_games", "Games with an open session on this game server")
+MOVE_ROUND_TRIP = REGISTRY.histogram("move_round_trip_seconds",
+                                     "Time from forwarding a place_mark to the next update from the game server")
+MATCHMAKING_WAIT = REGISTRY.histogram("matchmaking_wait_seconds", "Time a start request waited for a free game")
+RECONNECT_TIME = REGISTRY.histogram("reconnect_seconds", "Time a disconnected player took to reconnect")
+RECONNECTS = REGISTRY.counter("reconnects_total", "Disconnected players by whether they resumed within the window",
+                              ("outcome",))
+SPECTATORS = REGISTRY.gauge("spectators", "Connections watching a game through this webserver")
+SPECTATOR_FRAMES = REGISTRY.counter("spectator_frames_total",
+                                    "Spectator updates queued for a watcher or skipped because it had fallen behind",
+                                    ("outcome",))
+TIMEOUTS = REGISTRY.counter("timeouts_total", "Turn clocks and idle connections that ran out, by kind", ("kind",))
+
+MAX_FRAME_TYPES = 64
+
+frame_counters: dict[str, dict[str, tuple[Counter, Counter]]] = {"in": dict(), "out": dict()}
+
+
+def record_frame(direction: str, message_type: str, size: int):
+    try:
+        frames, frame_bytes = frame_counters[direction][message_type]
+    except (KeyError, TypeError):
+        frames, frame_bytes = _frame_type_counters(direction, message_type)
+    frames.value += 1
+    frame_bytes.value += size
+
+
+def _frame_type_counters(direction: str, message_type) -> tuple[Counter, Counter]:
+    counters_by_type = frame_counters[direction]
+    # decoded types come from the peer, so past a protocol's worth of types the rest share one label
+    if not isinstance(message_type, str) or len(counters_by_type) >= MAX_FRAME_TYPES:
+        message_type = "other"
+    counters = counters_by_type.get(message_type)
+    if counters is None:
+        counters = FRAMES.labels(direction, message_type), FRAME_BYTES.labels(direction, message_type)
+        counters_by_type[message_type] = counters
+    return counters
+
+
+class Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.start = perf_counter()
+
+    def stop(self) -> float:
+        elapsed = perf_counter() - self.start
+        self.histogram.observe(elapsed)
+        return elapsed
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[1] == b"/metrics":
+            status, body = b"200 OK", REGISTRY.render().encode("utf-8")
+        else:
+            status, body = b"404 Not Found", b"not found\n"
+        writer.write(b"HTTP/1.1 %s\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: %d\r\n"
+                     b"Connection: close\r\n\r\n%s" % (status, len(body), body))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.Server:
+    server = await asyncio.start_server(_handle_http, host, port)
+    print(f"serving metrics on http://{host}:{server.sockets[0].getsockname()[1]}/metrics")
+    return server
@@ -0,0 +1,136 @@
+import numpy as np
+
+from server.tic_toc_toe import DEFAULT_BOARD_SIZE, DEFAULT_WIN_LENGTH, DIRECTIONS, validate_board_options
+
+NO_MOVE = 255
+DEFAULT_BATCH_SIZE = 4096
+
+
+def winning_lines(board_size: int, win_length: int) -> np.ndarray:
+    lines = []
+    for row in range(board_size):
+        for col in range(board_size):
+            for row_step, col_step in DIRECTIONS:
+                end_row = row + row_step * (win_length - 1)
+                end_col = col + col_step * (win_length - 1)
+                if 0 <= end_row < board_size and 0 <= end_col < board_size:
+                    lines.append([(row + row_step * step) * board_size + col + col_step * step
+                                  for step in range(win_length)])
+    return np.array(lines, dtype=np.intp)
+
+
+def lines_through_cells(lines: np.ndarray, cell_count: int) -> np.ndarray:
+    line_indices_by_cell = [[] for _ in range(cell_count)]
+    for line_index, line in enumerate(lines):
+        for cell in line:
+            line_indices_by_cell[cell].append(line_index)
+    width = max(len(line_indices) for line_indices in line_indices_by_cell)
+    table = np.full((cell_count, width), len(lines), dtype=np.intp)
+    for cell, line_indices in enumerate(line_indices_by_cell):
+        table[cell, :len(line_indices)] = line_indices
+    return table
+
+
+class BatchTicTocToe:
+    def __init__(self, batch_size: int, board_size: int = DEFAULT_BOARD_SIZE, win_length: int = DEFAULT_WIN_LENGTH):
+        validate_board_options(board_size, win_length)
+        self.batch_size = batch_size
+        self.board_size = board_size
+        self.win_length = win_length
+        self.cell_count = board_size * board_size
+        lines = winning_lines(board_size, win_length)
+        # the extra line points at a padding cell that always stays empty, so padded lookups never win
+        self.lines = np.vstack([lines, np.full((1, win_length), self.cell_count, dtype=np.intp)])
+        self.cell_lines = lines_through_cells(lines, self.cell_count)
+        self.cells = np.zeros((batch_size, self.cell_count + 1), dtype=np.int8)
+        self.current_user = np.ones(batch_size, dtype=np.int8)
+        self.winner = np.zeros(batch_size, dtype=np.int8)
+        self.marks_placed = np.zeros(batch_size, dtype=np.int16)
+        self.games = np.arange(batch_size)
+
+    @property
+    def boards(self) -> np.ndarray:
+        return self.cells[:, :self.cell_count].reshape(self.batch_size, self.board_size, self.board_size)
+
+    def finished(self) -> np.ndarray:
+        return (self.winner != 0) | (self.marks_placed == self.cell_count)
+
+    def place_marks(self, moves) -> np.ndarray:
+        moves = np.asarray(moves, dtype=np.intp)
+        applied = (moves >= 0) & (moves < self.cell_count)
+        moves = np.where(applied, moves, self.cell_count)
+        applied &= self.cells[self.games, moves] == 0
+        applied &= ~self.finished()
+
+        games = self.games[applied]
+        cells = moves[applied]
+        players = self.current_user[applied]
+        self.cells[games, cells] = players
+        self.marks_placed[applied] += 1
+        self.current_user[applied] = 3 - players
+
+        line_cells = self.lines[self.cell_lines[cells]]
+        line_values = self.cells[games[:, None, None], line_cells]
+        won = (line_values == players[:, None, None]).all(axis=2).any(axis=1)
+        self.winner[games[won]] = players[won]
+        return applied
+
+    def detect_winners(self) -> np.ndarray:
+        line_values = self.cells[:, self.lines[:-1]]
+        winners = np.zeros(self.batch_size, dtype=np.int8)
+        for player in (1, 2):
+            winners[(line_values == player).all(axis=2).any(axis=1)] = player
+        return winners
+
+    def random_moves(self, rng: np.random.Generator) -> np.ndarray:
+        scores = rng.random((self.batch_size, self.cell_count))
+        scores[self.cells[:, :self.cell_count] != 0] = -1.0
+        return scores.argmax(axis=1)
+
+
+class SimulatedGames:
+    __slots__ = ("board_size", "win_length", "moves", "move_counts", "winners")
+
+    def __init__(self, board_size: int, win_length: int, moves: np.ndarray, move_counts: np.ndarray,
+                 winners: np.ndarray):
+        self.board_size = board_size
+        self.win_length = win_length
+        self.moves = moves
+        self.move_counts = move_counts
+        self.winners = winners
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+
+def simulate_random_games(total: int, batch_size: int = DEFAULT_BATCH_SIZE, board_size: int = DEFAULT_BOARD_SIZE,
+                          win_length: int = DEFAULT_WIN_LENGTH, seed: int | None = None):
+    rng = np.random.default_rng(seed)
+    remaining = total
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        remaining -= size
+        batch = BatchTicTocToe(size, board_size, win_length)
+        moves = np.full((size, batch.cell_count), NO_MOVE, dtype=np.uint8)
+        for step in range(batch.cell_count):
+            chosen = batch.random_moves(rng)
+            applied = batch.place_marks(chosen)
+            moves[applied, step] = chosen[applied]
+            if batch.finished().all():
+                break
+        yield SimulatedGames(board_size, win_length, moves, batch.marks_placed, batch.winner)
+
+
+def replay_games(moves: np.ndarray, board_size: int = DEFAULT_BOARD_SIZE,
+                 win_length: int = DEFAULT_WIN_LENGTH) -> BatchTicTocToe:
+    batch = BatchTicTocToe(len(moves), board_size, win_length)
+    for step in range(moves.shape[1]):
+        batch.place_marks(moves[:, step])
+    return batch
+
+
+def moves_from_records(records: list, board_size: int) -> np.ndarray:
+    moves = np.full((len(records), board_size * board_size), NO_MOVE, dtype=np.uint8)
+    for index, record in enumerate(records):
+        moves[index, :len(record.moves)] = np.frombuffer(record.moves, dtype=np.uint8)
+    return moves
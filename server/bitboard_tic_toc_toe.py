@@ -0,0 +1,107 @@
+BOARD_SIZE = 3
+FULL_MASK = (1 << BOARD_SIZE * BOARD_SIZE) - 1
+
+
+def _cell_bit(row: int, col: int) -> int:
+    return 1 << (row * BOARD_SIZE + col)
+
+
+def _line_mask(cells) -> int:
+    mask = 0
+    for row, col in cells:
+        mask |= _cell_bit(row, col)
+    return mask
+
+
+LINE_MASKS = tuple(
+    [_line_mask((row, col) for col in range(BOARD_SIZE)) for row in range(BOARD_SIZE)] +
+    [_line_mask((row, col) for row in range(BOARD_SIZE)) for col in range(BOARD_SIZE)] +
+    [_line_mask((i, i) for i in range(BOARD_SIZE)),
+     _line_mask((i, BOARD_SIZE - 1 - i) for i in range(BOARD_SIZE))]
+)
+
+LINE_MASKS_BY_CELL = tuple(
+    tuple(mask for mask in LINE_MASKS if mask & (1 << cell))
+    for cell in range(BOARD_SIZE * BOARD_SIZE)
+)
+
+
+class BitboardTicTocToe:
+    board_size = BOARD_SIZE
+    win_length = BOARD_SIZE
+
+    def __init__(self, user1: str, user2: str):
+        self.user1 = user1
+        self.user2 = user2
+        self.current_user = 1
+        self.marks = [0, 0, 0]
+        self.occupied = 0
+        self.winner = 0
+        self.forfeited = False
+
+    @property
+    def board(self) -> list[list[int]]:
+        player1, player2 = self.marks[1], self.marks[2]
+        board = []
+        for row in range(BOARD_SIZE):
+            board_row = []
+            for col in range(BOARD_SIZE):
+                bit = _cell_bit(row, col)
+                board_row.append(1 if player1 & bit else 2 if player2 & bit else 0)
+            board.append(board_row)
+        return board
+
+    def place_mark(self, user: str, row: int, col: int):
+        game_userid = self.get_game_userid(user)
+
+        if self.has_game_finished():
+            raise Exception()
+
+        if game_userid != self.current_user:
+            raise Exception()
+        self.validate_coordinate(row, col)
+        cell = row * BOARD_SIZE + col
+        marks = self.marks[game_userid] | (1 << cell)
+        self.marks[game_userid] = marks
+        self.occupied |= 1 << cell
+        self.change_current_user()
+        for mask in LINE_MASKS_BY_CELL[cell]:
+            if marks & mask == mask:
+                self.winner = game_userid
+                break
+
+    def get_game_userid(self, user):
+        if self.user1 == user:
+            return 1
+        elif self.user2 == user:
+            return 2
+        else:
+            raise Exception()
+
+    def get_game_opponent_userid(self, user):
+        if self.user1 == user:
+            return 2
+        elif self.user2 == user:
+            return 1
+        else:
+            raise Exception()
+
+    def validate_coordinate(self, row, col):
+        if row < 0 or row >= BOARD_SIZE:
+            raise Exception()
+        if col < 0 or col >= BOARD_SIZE:
+            raise Exception()
+        if self.occupied & _cell_bit(row, col):
+            raise Exception()
+
+    def change_current_user(self):
+        self.current_user = 3 - self.current_user
+
+    def has_game_finished(self):
+        return self.winner != 0 or self.occupied == FULL_MASK
+
+    def forfeit_turn(self):
+        if self.has_game_finished():
+            raise Exception()
+        self.forfeited = True
+        self.winner = 3 - self.current_user
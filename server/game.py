@@ -1,21 +1,108 @@
 import asyncio
+import time
+import uuid
 
-from server.tic_toc_toe import TicTocToe
-from transport.tcp_client import BaseTCPClient, BaseMessage
+from metrics import TIMEOUTS, record_frame
+from server import solver
+from server.bitboard_tic_toc_toe import BitboardTicTocToe
+from server.mcts import MCTSPool, Node
+from server.position_table import PositionTable
+from server.tic_toc_toe import TicTocToe, DEFAULT_BOARD_SIZE, DEFAULT_WIN_LENGTH
+from timer_wheel import TimerWheel, WheelTimer
+from transport.broadcast import BroadcastMessage, broadcast, BROADCAST_TIMEOUT
+from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException
+
+
+def create_tic_toc_toe(user1: str, user2: str, board_size: int = DEFAULT_BOARD_SIZE,
+                       win_length: int = DEFAULT_WIN_LENGTH) -> TicTocToe | BitboardTicTocToe:
+    if board_size == BitboardTicTocToe.board_size and win_length == BitboardTicTocToe.win_length:
+        return BitboardTicTocToe(user1, user2)
+    return TicTocToe(user1, user2, board_size, win_length)
 
 
 class Game:
-    def __init__(self, user1: str, user2: str):
+    def __init__(self, user1: str, user2: str, board_size: int = DEFAULT_BOARD_SIZE,
+                 win_length: int = DEFAULT_WIN_LENGTH):
+        self.game_id = uuid.uuid4().hex
         self.user1 = user1
         self.user2 = user2
-        self.game = TicTocToe(user1, user2)
+        self.board_size = board_size
+        self.win_length = win_length
+        self.game = create_tic_toc_toe(user1, user2, board_size, win_length)
         self.clients_by_username: dict[str:BaseTCPClient] = dict()
         self.has_new_change = True
         self.abort_game = False
+        self.last_move: tuple[int, int] | None = None
+        self.moves = bytearray()
+        self.created_at = time.time()
+        self.seq = 0
+        self.pending_deltas: list[dict] = []
+        self.delta_usernames: set[str] = set()
+        self.snapshot_usernames: set[str] = set()
+        self.spectators: set[BaseTCPClient] = set()
+        self.spectator_seq = -1
+        self.closed = asyncio.Event()
+        self.timers: TimerWheel | None = None
+        self.turn_time: float | None = None
+        self.turn_timer: WheelTimer | None = None
 
-    async def handle_client(self, tcp_client: BaseTCPClient, username: str):
+    async def handle_client(self, tcp_client: BaseTCPClient, username: str, delta_updates: bool = False):
         pass
 
+    def add_client(self, tcp_client: BaseTCPClient, username: str, delta_updates: bool = False):
+        self.clients_by_username[username] = tcp_client
+        self.has_new_change = True
+        self.snapshot_usernames.add(username)
+        if delta_updates:
+            self.delta_usernames.add(username)
+        else:
+            self.delta_usernames.discard(username)
+
+    def record_move(self, username: str, row: int, col: int):
+        game = self.game
+        self.last_move = (row, col)
+        self.moves.append(row * self.board_size + col)
+        self.has_new_change = True
+        self.seq += 1
+        delta = {
+            "type": "game_delta",
+            "seq": self.seq,
+            "row": row,
+            "col": col,
+            "mark": game.get_game_userid(username),
+            "current_user": game.current_user,
+            "game_status": "running"
+        }
+        if game.has_game_finished():
+            delta["game_status"] = "finished"
+            delta["winner"] = game.winner
+        self.pending_deltas.append(delta)
+        self.start_turn_clock()
+
+    def start_turn_clock(self):
+        self.stop_turn_clock()
+        if self.timers is None or not self.turn_time or self.game.has_game_finished():
+            return
+        self.turn_timer = self.timers.call_later(self.turn_time, self.forfeit_turn)
+
+    def stop_turn_clock(self):
+        if self.turn_timer is not None:
+            self.turn_timer.cancel()
+            self.turn_timer = None
+
+    def forfeit_turn(self):
+        self.turn_timer = None
+        game = self.game
+        if game.has_game_finished():
+            return
+        print(f"player {game.current_user} ran out of time in game {self.game_id}")
+        TIMEOUTS.labels("turn").inc()
+        game.forfeit_turn()
+        self.seq += 1
+        self.has_new_change = True
+        self.snapshot_usernames.update(self.clients_by_username)
+        self.loop.create_task(self.send_game_status())
+
     async def _handle_client_message(self, message: BaseMessage, username: str):
         json_content: dict = message.content
         message_type = json_content['type']
@@ -25,7 +112,7 @@ class Game:
             row, col = json_content['row'], json_content['col']
             try:
                 self.game.place_mark(message_username, row, col)
-                self.has_new_change = True
+                self.record_move(message_username, row, col)
             except:
                 pass
         elif message_type == "abort_game":
@@ -33,91 +120,199 @@ class Game:
             # TODO Send message to users
         elif message_type == "reconnect":
             self.has_new_change = True
+        elif message_type == "resync":
+            print(f"{username} reported a sequence gap after {json_content.get('seq')}, sending snapshot {self.seq}")
+            self.snapshot_usernames.add(username)
+            self.has_new_change = True
         elif message_type == "chat":
             print("Start of Chat Message".center(40, "#"))
             print(json_content['text_message'])
-            for key, val in self.clients_by_username.items():
-                if key != username:
-                    await val.send(message)
+            recipients = {key: val for key, val in self.clients_by_username.items() if key != username}
+            await self.broadcast(BroadcastMessage(json_content), recipients)
             print("End of Chat Message".center(40, "#"))
 
     async def send_game_status(self):
         print("sending game status with ", self.has_new_change)
         has_new_change = self.has_new_change
         self.has_new_change = False
+        deltas, self.pending_deltas = self.pending_deltas, []
+        snapshot_usernames, self.snapshot_usernames = self.snapshot_usernames, set()
         game = self.game
+        finished = game.has_game_finished()
 
+        delta_recipients, snapshot_recipients = dict(), dict()
         for username, tcp_client in self.clients_by_username.items():
-            if game.has_game_finished():
-                server_message = {
-                    "type": "show_game_status",
-                    "game_status": "finished",
-                    "game_board": game.board,
+            if username in self.delta_usernames and username not in snapshot_usernames:
+                delta_recipients[username] = tcp_client
+            elif has_new_change or finished or username in snapshot_usernames:
+                snapshot_recipients[username] = tcp_client
+
+        publish = bool(self.spectators) and self.spectator_seq != self.seq
+        status = BroadcastMessage(self.snapshot()) if snapshot_recipients or publish else None
+        if delta_recipients:
+            for delta in deltas:
+                await self.broadcast(BroadcastMessage(delta), delta_recipients)
+        if snapshot_recipients:
+            marks_by_username = {
+                username: {
                     "your_mark": game.get_game_userid(username),
-                    "opponent_mark": game.get_game_opponent_userid(username),
-                    "current_user": game.current_user,
-                    "winner": game.winner
-                }
+                    "opponent_mark": game.get_game_opponent_userid(username)
+                } for username in snapshot_recipients
+            }
+            await self.broadcast(status, snapshot_recipients, marks_by_username)
+        if publish:
+            self.publish_to_spectators(status)
 
-                await tcp_client.send(BaseMessage(server_message))
-                continue
+    async def add_spectator(self, tcp_client: BaseTCPClient):
+        self.spectators.add(tcp_client)
+        await tcp_client.send(BaseMessage(self.snapshot()))
 
-            if has_new_change:
-                server_message = {
-                    "type": "show_game_status",
-                    "game_status": "running",
-                    "game_board": game.board,
-                    "your_mark": game.get_game_userid(username),
-                    "opponent_mark": game.get_game_opponent_userid(username),
-                    "current_user": game.current_user
-                }
+    def remove_spectator(self, tcp_client: BaseTCPClient):
+        self.spectators.discard(tcp_client)
+
+    def publish_to_spectators(self, status: BroadcastMessage):
+        # spectator feeds never hold up the players: a feed that is backed up misses this snapshot and
+        # catches up with the next one, only the final status is worth waiting for
+        self.spectator_seq = self.seq
+        for tcp_client in self.spectators:
+            data = status.encode(tcp_client.codec, None, tcp_client.stream_id)
+            record_frame("out", "show_game_status", len(data))
+            if not tcp_client.try_send_bytes(data, True) and status.finished:
+                self.loop.create_task(self._send_final_status(tcp_client, data))
+
+    async def close_spectators(self):
+        # a game closed without a finished status (escaped, abandoned, cancelled) still has to end every watch
+        closed = BaseMessage({"type": "game_closed", "game_id": self.game_id})
+        sends = []
+        for tcp_client in self.spectators:
+            data = closed.encode(tcp_client.codec, tcp_client.stream_id)
+            record_frame("out", "game_closed", len(data))
+            sends.append(self._send_final_status(tcp_client, data))
+        await asyncio.gather(*sends)
+        self.closed.set()
 
-                base_message = BaseMessage(server_message)
-                await tcp_client.send(base_message)
+    @staticmethod
+    async def _send_final_status(tcp_client: BaseTCPClient, data: bytes):
+        try:
+            async with asyncio.timeout(BROADCAST_TIMEOUT):
+                await tcp_client.send_bytes(data)
+        except (SocketClosedException, TimeoutError):
+            pass
+
+    async def broadcast(self, message: BroadcastMessage, recipients: dict[str, BaseTCPClient],
+                        personal_by_username: dict[str, dict] | None = None):
+        failed = await broadcast(message, recipients, personal_by_username)
+        if failed:
+            print(f"could not deliver {message.content['type']} to {', '.join(failed)} in game {self.game_id}")
+
+    def snapshot(self) -> dict:
+        game = self.game
+        server_message = {
+            "type": "show_game_status",
+            "game_status": "running",
+            "game_board": game.board,
+            "current_user": game.current_user,
+            "seq": self.seq
+        }
+        if game.has_game_finished():
+            server_message["game_status"] = "finished"
+            server_message["winner"] = game.winner
+        return server_message
 
 
 class SinglePlayerGame(Game):
-    def __init__(self, username: str):
-        super(SinglePlayerGame, self).__init__(username, "computer")
+    def __init__(self, username: str, board_size: int = DEFAULT_BOARD_SIZE, win_length: int = DEFAULT_WIN_LENGTH,
+                 difficulty: str = solver.DEFAULT_DIFFICULTY, ai_pool: MCTSPool | None = None,
+                 position_table: PositionTable | None = None, timers: TimerWheel | None = None,
+                 turn_time: float | None = None):
+        super(SinglePlayerGame, self).__init__(username, "computer", board_size, win_length)
+        self.difficulty = difficulty
+        self.ai_pool = ai_pool
+        self.position_table = position_table
+        self.ai_tree: Node | None = None
         self.loop = asyncio.get_event_loop()
+        self.timers = timers
+        self.turn_time = turn_time
+        self.start_turn_clock()
 
-    async def handle_client(self, tcp_client: BaseTCPClient, username: str):
-        self.has_new_change = True
-        self.clients_by_username[username] = tcp_client
+    async def handle_client(self, tcp_client: BaseTCPClient, username: str, delta_updates: bool = False):
+        self.add_client(tcp_client, username, delta_updates)
 
         while True:
             await self.send_game_status()
             if self.game.has_game_finished():
                 break
-            if self.try_place_computer_mark():
+            if await self.try_place_computer_mark():
                 continue
             message = await tcp_client.receive()
             await self._handle_client_message(message, username)
 
-    def try_place_computer_mark(self):
+    async def try_place_computer_mark(self):
         if self.game.get_game_userid("computer") != self.game.current_user:
             return False
-        for i in range(3):
-            for j in range(3):
-                if self.game.board[i][j] == 0:
-                    self.game.place_mark("computer", i, j)
-                    self.has_new_change = True
-                    return True
+        # the computer's thinking time is bounded by the AI budget, not by the players' turn clock
+        self.stop_turn_clock()
+        row, col = await self.choose_computer_move()
+        if self.game.has_game_finished():
+            return True
+        self.game.place_mark("computer", row, col)
+        self.record_move("computer", row, col)
+        return True
+
+    async def choose_computer_move(self) -> tuple[int, int]:
+        board = self.game.board
+        if self.board_size == solver.BOARD_SIZE and self.win_length == solver.BOARD_SIZE:
+            return solver.choose_move(board, self.difficulty, position_table=self.position_table)
+        if self.position_table is not None:
+            move = self.position_table.best_move(board, self.win_length)
+            if move is not None:
+                self.ai_tree = None
+                return move
+        if self.ai_pool is not None:
+            cells = bytes(value for row in board for value in row)
+            opponent_move = None
+            if self.last_move is not None:
+                opponent_move = self.last_move[0] * self.board_size + self.last_move[1]
+            move, self.ai_tree = await self.ai_pool.choose_move(cells, self.board_size, self.win_length,
+                                                                self.game.current_user, self.ai_tree, opponent_move)
+            return divmod(move, self.board_size)
+        for i in range(self.board_size):
+            for j in range(self.board_size):
+                if board[i][j] == 0:
+                    return i, j
 
 
 class MultiPlayerGame(Game):
-    def __init__(self, user1: str):
+    def __init__(self, user1: str, board_size: int = DEFAULT_BOARD_SIZE, win_length: int = DEFAULT_WIN_LENGTH,
+                 timers: TimerWheel | None = None, turn_time: float | None = None):
         self.loop = asyncio.get_event_loop()
+        self.game_id = uuid.uuid4().hex
         self.user1 = user1
         self.user2 = None
+        self.board_size = board_size
+        self.win_length = win_length
         self.game = None
         self.clients_by_username: dict[str:BaseTCPClient] = dict()
         self.has_new_change = True
         self.abort_game = False
+        self.last_move: tuple[int, int] | None = None
+        self.moves = bytearray()
+        self.created_at = time.time()
+        self.seq = 0
+        self.pending_deltas: list[dict] = []
+        self.delta_usernames: set[str] = set()
+        self.snapshot_usernames: set[str] = set()
+        self.spectators: set[BaseTCPClient] = set()
+        self.spectator_seq = -1
+        self.closed = asyncio.Event()
+        self.timers = timers
+        self.turn_time = turn_time
+        self.turn_timer: WheelTimer | None = None
+        self.started: asyncio.Future = self.loop.create_future()
+        self.started_at: float | None = None
 
-    async def handle_client(self, tcp_client: BaseTCPClient, username: str):
-        self.has_new_change = True
-        self.clients_by_username[username] = tcp_client
+    async def handle_client(self, tcp_client: BaseTCPClient, username: str, delta_updates: bool = False):
+        self.add_client(tcp_client, username, delta_updates)
 
         if self.user2 is None:
             self.initialize_game(username)
@@ -131,6 +326,18 @@ class MultiPlayerGame(Game):
 
     def initialize_game(self, user2):
         self.user2 = user2
-        self.game = TicTocToe(self.user1, self.user2)
+        self.game = create_tic_toc_toe(self.user1, self.user2, self.board_size, self.win_length)
         self.has_new_change = True
         self.abort_game = False
+        self.started_at = time.perf_counter()
+        self.start_turn_clock()
+        if not self.started.done():
+            self.started.set_result(True)
+
+    def abort(self):
+        self.abort_game = True
+        if not self.started.done():
+            self.started.set_result(False)
+
+    async def wait_until_started(self) -> bool:
+        return await asyncio.shield(self.started)
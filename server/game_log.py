@@ -0,0 +1,217 @@
+import asyncio
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from server.tic_toc_toe import MAX_BOARD_SIZE
+
+LOG_MAGIC = b"TTTGAMES"
+LOG_VERSION = 1
+LOG_SUFFIX = ".games"
+
+USERNAME_BYTES = 32
+MAX_MOVES = MAX_BOARD_SIZE * MAX_BOARD_SIZE
+
+FILE_HEADER = struct.Struct("<8sHH4x")
+RECORD_FIELDS = struct.Struct(f"<16s{USERNAME_BYTES}s{USERNAME_BYTES}sddBBBBH")
+RECORD = struct.Struct(f"<{RECORD_FIELDS.format[1:]}{MAX_MOVES}s1x")
+MOVES_OFFSET = RECORD_FIELDS.size
+
+RESULT_FINISHED = 0
+RESULT_ABANDONED = 1
+RESULT_FORFEITED = 2
+
+DEFAULT_BATCH_RECORDS = 256
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+def _username_bytes(username: str | None) -> bytes:
+    return (username or "").encode("utf-8")[:USERNAME_BYTES]
+
+
+def _username(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", errors="ignore")
+
+
+class GameRecordLog:
+    def __init__(self, directory: str, name: str = "server", batch_records: int = DEFAULT_BATCH_RECORDS,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, segment_bytes: int = DEFAULT_SEGMENT_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.name = name
+        self.batch_bytes = batch_records * RECORD.size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.buffer = bytearray()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="game-log")
+        self.file = None
+        self.segment_index = 0
+        self.records = 0
+        self.flush_task: asyncio.Task | None = None
+
+    def start(self):
+        self.flush_task = asyncio.create_task(self._flush_periodically())
+
+    def append(self, game) -> None:
+        tic_toc_toe = game.game
+        if tic_toc_toe.forfeited:
+            result = RESULT_FORFEITED
+        elif tic_toc_toe.has_game_finished():
+            result = RESULT_FINISHED
+        else:
+            result = RESULT_ABANDONED
+        self.buffer += RECORD.pack(bytes.fromhex(game.game_id), _username_bytes(game.user1),
+                                   _username_bytes(game.user2), game.created_at, time.time(), game.board_size,
+                                   game.win_length, tic_toc_toe.winner, result, len(game.moves), game.moves)
+        self.records += 1
+        if len(self.buffer) >= self.batch_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data, self.buffer = self.buffer, bytearray()
+        self.executor.submit(self._write, data).add_done_callback(self._report_write_error)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        self.flush()
+        self.executor.submit(self._close_file)
+        self.executor.shutdown(wait=True)
+
+    def _write(self, data: bytearray):
+        if self.file is None or self.file.tell() >= self.segment_bytes:
+            self._open_segment()
+        try:
+            self.file.write(data)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError:
+            self._close_file()
+            raise
+
+    def _open_segment(self):
+        self._close_file()
+        self.segment_index += 1
+        path = os.path.join(self.directory, f"{self.name}-{int(time.time())}-{os.getpid()}-"
+                                            f"{self.segment_index:04d}{LOG_SUFFIX}")
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION, RECORD.size))
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @staticmethod
+    def _report_write_error(future):
+        error = future.exception()
+        if error is not None:
+            print(f"could not write game records: {error}")
+
+
+class GameRecord:
+    __slots__ = ("game_id", "user1", "user2", "started_at", "finished_at", "board_size", "win_length", "winner",
+                 "result", "moves")
+
+    def __init__(self, view: memoryview, offset: int):
+        (game_id, user1, user2, self.started_at, self.finished_at, self.board_size, self.win_length, self.winner,
+         self.result, move_count) = RECORD_FIELDS.unpack_from(view, offset)
+        self.game_id = game_id.hex()
+        self.user1 = _username(user1)
+        self.user2 = _username(user2)
+        moves_start = offset + MOVES_OFFSET
+        self.moves = view[moves_start:moves_start + move_count]
+
+    def coordinates(self) -> list[tuple[int, int]]:
+        return [divmod(cell, self.board_size) for cell in self.moves]
+
+
+class GameLogReader:
+    def __init__(self, path: str):
+        self.path = path
+        self.mmap = None
+        self.view = memoryview(b"")
+        with open(path, "rb") as log_file:
+            if os.fstat(log_file.fileno()).st_size >= FILE_HEADER.size:
+                self.mmap = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self.mmap)
+        if self.mmap is None:
+            self.record_size = RECORD.size
+            return
+        magic, version, self.record_size = FILE_HEADER.unpack_from(self.view, 0)
+        if magic != LOG_MAGIC or version != LOG_VERSION or self.record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {LOG_VERSION} game log")
+
+    def __len__(self) -> int:
+        return max(0, len(self.view) - FILE_HEADER.size) // self.record_size
+
+    def __getitem__(self, index: int) -> GameRecord:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return GameRecord(self.view, FILE_HEADER.size + index * self.record_size)
+
+    def __iter__(self):
+        view = self.view
+        for offset in range(FILE_HEADER.size, FILE_HEADER.size + len(self) * self.record_size, self.record_size):
+            yield GameRecord(view, offset)
+
+    def close(self):
+        self.view.release()
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                pass
+            self.mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def log_paths(directory: str) -> list[str]:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(LOG_SUFFIX))
+
+
+def read_game_logs(directory: str):
+    for path in log_paths(directory):
+        reader = GameLogReader(path)
+        try:
+            yield from reader
+        finally:
+            reader.close()
+
+
+def summarize(directory: str):
+    games = abandoned = forfeited = moves = 0
+    wins = [0, 0, 0]
+    for record in read_game_logs(directory):
+        games += 1
+        moves += len(record.moves)
+        if record.result == RESULT_ABANDONED:
+            abandoned += 1
+        else:
+            wins[record.winner] += 1
+            if record.result == RESULT_FORFEITED:
+                forfeited += 1
+    print(f"{games} games in {len(log_paths(directory))} files: {wins[1]} won by the first player, "
+          f"{wins[2]} by the second ({forfeited} on time), {wins[0]} drawn, {abandoned} abandoned, {moves} moves")
+
+
+if __name__ == '__main__':
+    summarize(sys.argv[1])
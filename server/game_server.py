@@ -1,128 +1,357 @@
 import asyncio
-from asyncio import Task
+import secrets
+import socket
+import time
 
 import utils
+from metrics import ACTIVE_GAMES, RECONNECT_TIME, RECONNECTS, Timer
+from server import solver
 from server.game import SinglePlayerGame, MultiPlayerGame, Game
+from server.game_log import GameRecordLog
+from server.mcts import MCTSPool
+from server.position_table import PositionTable
+from server.tic_toc_toe import DEFAULT_BOARD_SIZE, DEFAULT_WIN_LENGTH, validate_board_options
+from timer_wheel import TimerWheel, resolve_future
+from transport.codec import negotiate_codec
+from transport.multiplex import MultiplexedConnection, is_multiplexed_frame
 from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException
 from transport.tcp_server import BaseTCPServer
 
+DEFAULT_MAX_SESSIONS = 256
+DEFAULT_RECONNECT_WINDOW = 10.0
+DEFAULT_TURN_TIME = 60.0
+HEARTBEAT_INTERVAL = 2
+LOOP_LAG_PROBE_INTERVAL = 0.25
+RESUME_TOKEN_BYTES = 16
+
+
+class PlayerSession:
+    __slots__ = ("game", "username", "resume_token", "resumed", "reconnect_timer")
+
+    def __init__(self, game: Game, username: str):
+        self.game = game
+        self.username = username
+        self.resume_token = secrets.token_urlsafe(RESUME_TOKEN_BYTES)
+        self.resumed: asyncio.Future | None = None
+        self.reconnect_timer: Timer | None = None
+
+    @property
+    def parked(self) -> bool:
+        return self.resumed is not None and not self.resumed.done()
+
 
 class GameServer:
-    def __init__(self, master_client: BaseTCPClient, host, port):
+    def __init__(self, master_client: BaseTCPClient, host, port, ai_pool: MCTSPool | None = None,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS, listen_socket: socket.socket | None = None,
+                 game_log: GameRecordLog | None = None, position_table: PositionTable | None = None,
+                 reconnect_window: float = DEFAULT_RECONNECT_WINDOW, turn_time: float | None = DEFAULT_TURN_TIME):
         self.master_client = master_client
-        self.tcp_server: BaseTCPServer = BaseTCPServer(host, port)
+        self.ai_pool = ai_pool
+        self.position_table = position_table
+        self.game_log = game_log
+        self.max_sessions = max_sessions
+        self.reconnect_window = reconnect_window
+        self.turn_time = turn_time
+        self.tcp_server: BaseTCPServer = BaseTCPServer(host, port, sock=listen_socket)
         self.loop = asyncio.get_event_loop()
-        self.multi_player_game: MultiPlayerGame | None = None
-        self.single_player_game: SinglePlayerGame | None = None
-        self.reconnect_task_by_username: dict[str:Task] = dict()
+        self.timers = TimerWheel(loop=self.loop)
+        self.sessions: dict[str, Game] = dict()
+        self.connected_clients = 0
+        self.max_loop_lag = 0.0
+        self.player_sessions_by_token: dict[str, PlayerSession] = dict()
+        self.player_sessions_by_player: dict[tuple[str, str], PlayerSession] = dict()
 
     async def start(self):
+        self.loop.create_task(self._handle_master_messages())
+        self.loop.create_task(self._probe_loop_lag())
+        self.loop.create_task(self._send_heartbeats())
+        await self.send_capacity()
         while True:
             tcp_client = await self.tcp_server.accept()
-            self.loop.create_task(self._handle_client(tcp_client))
+            self.loop.create_task(self._handle_connection(tcp_client))
 
-    async def _handle_client(self, tcp_client: BaseTCPClient):
-        # TODO: add to connected clients
+    async def _handle_master_messages(self):
         try:
-            start_message: BaseMessage = await tcp_client.receive()
+            while True:
+                message = await self.master_client.receive()
+                if message.content['type'] == 'handshake':
+                    self.master_client.codec = negotiate_codec([message.content['codec']])
+                    print(f"webserver accepted handshake with codec={self.master_client.codec.name}")
+        except SocketClosedException:
+            print("connection to webserver closed")
+
+    async def _handle_connection(self, tcp_client: BaseTCPClient):
+        try:
+            frame = await tcp_client.receive_frame()
+        except SocketClosedException:
+            tcp_client.close()
+            return
+        if is_multiplexed_frame(frame):
+            connection = MultiplexedConnection(
+                tcp_client, on_stream=lambda stream: self.loop.create_task(self._handle_client(stream)))
+            connection.dispatch(frame)
+            connection.start()
+        else:
+            await self._handle_client(tcp_client, BaseMessage.decode(frame.json_header, frame.content))
+
+    async def _handle_client(self, tcp_client: BaseTCPClient, start_message: BaseMessage | None = None):
+        self.connected_clients += 1
+        try:
+            if start_message is None:
+                start_message = await tcp_client.receive()
             start_content = start_message.content
             username = start_content['username']
             message_type = start_content['type']
-
-            reconnect_task: Task = self.reconnect_task_by_username.pop(username, None)
-            if reconnect_task is not None:
-                reconnect_task.cancel()
+            tcp_client.codec = negotiate_codec(start_content.get('codecs'))
 
             if message_type == 'start_game':
-                game: Game = await self.get_game(tcp_client, username, start_content['game_type'])
+                resume_token = start_content.get('resume_token')
+                game: Game | None = self.get_resumable_game(resume_token, username)
+                if game is None:
+                    board_size, win_length = self.get_board_options(start_content)
+                    difficulty = start_content.get('difficulty', solver.DEFAULT_DIFFICULTY)
+                    game = await self.get_game(tcp_client, username, start_content['game_type'], board_size,
+                                               win_length, difficulty, start_content.get('game_id'))
                 if game is not None:
+                    player_session = self.open_player_session(game, username, resume_token)
                     try:
-                        await game.handle_client(tcp_client, username)
+                        await self.send_resume_token(tcp_client, player_session)
+                        await game.handle_client(tcp_client, username, start_content.get('updates') == 'delta')
                     except SocketClosedException:
                         try:
-                            reconnect_task = asyncio.create_task(self._has_client_reconnected(game, username))
-                            self.reconnect_task_by_username[username] = reconnect_task
-                            reconnected: bool = await reconnect_task
+                            reconnected = await self._has_client_reconnected(player_session, tcp_client)
                             if reconnected:
                                 return
-                            for user, client in game.clients_by_username.items():
-                                opponent_disconnected_message = {
-                                    "type": "opponent_escaped",
-                                    "game_status": "finished"
-                                }
-                                await client.send(BaseMessage(opponent_disconnected_message))
-                        except asyncio.exceptions.CancelledError:
-                            return
+                            if not game.game.has_game_finished():
+                                for user, client in game.clients_by_username.items():
+                                    opponent_disconnected_message = {
+                                        "type": "opponent_escaped",
+                                        "game_status": "finished"
+                                    }
+                                    await client.send(BaseMessage(opponent_disconnected_message))
                         except SocketClosedException:
                             pass
 
-                free_message = {
-                    "type": "put_to_free"
-                }
-                await self.master_client.send(BaseMessage(free_message))
-                self.single_player_game = None
-                self.multi_player_game = None
+                    if self.ai_pool is not None and isinstance(game, SinglePlayerGame):
+                        print(self.ai_pool.report())
+                    await self.close_session(game)
+            elif message_type == 'watch_game':
+                await self.handle_spectator(tcp_client, start_content.get('game_id'))
         finally:
+            self.connected_clients -= 1
             tcp_client.close()
-        # TODO: remove from connected clients
 
-    async def _has_client_reconnected(self, game, username) -> bool:
+    async def _has_client_reconnected(self, player_session: PlayerSession, tcp_client: BaseTCPClient) -> bool:
+        game = player_session.game
         if game.game.has_game_finished() or game.abort_game:
             return False
 
         wait_message = {
             "type": "put_to_waiting",
-            "username": username
+            "username": player_session.username,
+            "game_id": game.game_id
         }
         await self.master_client.send(BaseMessage(wait_message))
-        reconnected = await self.wait_for_user_reconnect(game, username, 10)
+        reconnected = await self.wait_for_user_reconnect(player_session, tcp_client, self.reconnect_window)
         return reconnected
 
-    async def get_game(self, tcp_client: BaseTCPClient, username: str, game_type: str) -> Game | None:
-        if game_type == "single":
-            return await self.get_single_player_game(username)
-        return await self.get_multiplayer_game(tcp_client, username)
-
-    async def get_single_player_game(self, username) -> SinglePlayerGame:
-        if self.single_player_game is None:
-            self.single_player_game = SinglePlayerGame(username)
-        return self.single_player_game
-
-    async def get_multiplayer_game(self, tcp_client: BaseTCPClient, username: str) -> MultiPlayerGame | None:
-        if self.multi_player_game is None:
-            self.multi_player_game = MultiPlayerGame(username)
-            self.multi_player_game.clients_by_username[username] = tcp_client
-            tasks = [asyncio.create_task(x) for x in
-                     [self._check_multi_player_game_started(), self._handle_waiting_user_commands(tcp_client)]]
-            try:
-                multi_free_message = {
-                    "type": "put_to_multi_free"
-                }
-                await self.master_client.send(BaseMessage(multi_free_message))
-                server_assigned_message = {
-                    "type": "server_assigned",
-                    "game_type": "multi"
-                }
-                await tcp_client.send(BaseMessage(server_assigned_message))
-                remain_in_game = await utils.wait_until_first_completed(tasks)
-                if remain_in_game:
-                    return self.multi_player_game
-
-                changed_message = {
-                    "type": "game_changed",
-                    "game_status": "finished"
-                }
-                await tcp_client.send(BaseMessage(changed_message))
-            except SocketClosedException:
-                pass
+    def get_resumable_game(self, resume_token: str | None, username: str) -> Game | None:
+        player_session = self.player_sessions_by_token.get(resume_token) if resume_token is not None else None
+        if player_session is None or player_session.username != username or not player_session.parked:
             return None
-        return self.multi_player_game
+        return player_session.game
+
+    def open_player_session(self, game: Game, username: str, resume_token: str | None = None) -> PlayerSession:
+        previous = self.player_sessions_by_player.pop((game.game_id, username), None)
+        if previous is not None:
+            del self.player_sessions_by_token[previous.resume_token]
+            if previous.parked:
+                previous.resumed.set_result(True)
+                RECONNECTS.labels("resumed").inc()
+                resumed_by = "resume token" if resume_token == previous.resume_token else "username"
+                print(f"{username} resumed game {game.game_id} by {resumed_by} "
+                      f"after {previous.reconnect_timer.stop():.2f}s")
+        player_session = PlayerSession(game, username)
+        self.player_sessions_by_token[player_session.resume_token] = player_session
+        self.player_sessions_by_player[(game.game_id, username)] = player_session
+        return player_session
+
+    def close_player_sessions(self, game: Game):
+        for username in (game.user1, game.user2):
+            player_session = self.player_sessions_by_player.pop((game.game_id, username), None)
+            if player_session is not None:
+                del self.player_sessions_by_token[player_session.resume_token]
+
+    @staticmethod
+    async def send_resume_token(tcp_client: BaseTCPClient, player_session: PlayerSession):
+        resume_message = {
+            "type": "session_token",
+            "game_id": player_session.game.game_id,
+            "resume_token": player_session.resume_token
+        }
+        await tcp_client.send(BaseMessage(resume_message))
+
+    async def open_session(self, game: Game):
+        self.sessions[game.game_id] = game
+        ACTIVE_GAMES.set(len(self.sessions))
+        opened_message = {
+            "type": "game_opened",
+            "game_id": game.game_id
+        }
+        await self.master_client.send(BaseMessage(opened_message))
+        await self.send_capacity()
+
+    async def handle_spectator(self, tcp_client: BaseTCPClient, game_id: str | None):
+        game = self.sessions.get(game_id)
+        if game is None or game.game is None:
+            not_found_message = {
+                "type": "game_not_found",
+                "game_id": game_id or ""
+            }
+            await tcp_client.send(BaseMessage(not_found_message))
+            return
+        try:
+            await game.add_spectator(tcp_client)
+            await utils.wait_until_first_completed([asyncio.create_task(self._wait_for_spectator_to_leave(tcp_client)),
+                                                    asyncio.create_task(game.closed.wait())])
+        except SocketClosedException:
+            pass
+        finally:
+            game.remove_spectator(tcp_client)
+
+    @staticmethod
+    async def _wait_for_spectator_to_leave(tcp_client: BaseTCPClient):
+        while True:
+            await tcp_client.receive()
+
+    async def close_session(self, game: Game):
+        if self.sessions.pop(game.game_id, None) is None:
+            return
+        ACTIVE_GAMES.set(len(self.sessions))
+        game.stop_turn_clock()
+        self.close_player_sessions(game)
+        if self.game_log is not None and game.game is not None:
+            self.game_log.append(game)
+        await game.close_spectators()
+        closed_message = {
+            "type": "game_closed",
+            "game_id": game.game_id
+        }
+        await self.master_client.send(BaseMessage(closed_message))
+        await self.send_capacity()
 
-    async def _check_multi_player_game_started(self):
+    async def send_capacity(self):
+        capacity_message = {
+            "type": "server_capacity",
+            "capacity": self.max_sessions,
+            "active_games": len(self.sessions)
+        }
+        await self.master_client.send(BaseMessage(capacity_message))
+
+    def load_report(self) -> dict:
+        return {
+            "active_games": len(self.sessions),
+            "capacity": self.max_sessions,
+            "connected_clients": self.connected_clients,
+            "loop_lag_ms": min(round(self.max_loop_lag * 1000), 0xFFFF),
+            "ai_pending": self.ai_pool.pending if self.ai_pool is not None else 0
+        }
+
+    async def _send_heartbeats(self):
+        try:
+            while True:
+                load_message = {"type": "load_report", **self.load_report()}
+                self.max_loop_lag = 0.0
+                await self.master_client.send(BaseMessage(load_message))
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+        except SocketClosedException:
+            print("stopped heartbeats: connection to webserver closed")
+
+    async def _probe_loop_lag(self):
         while True:
-            if self.multi_player_game.game is not None:
-                return True
-            await asyncio.sleep(1)
+            expected = self.loop.time() + LOOP_LAG_PROBE_INTERVAL
+            await asyncio.sleep(LOOP_LAG_PROBE_INTERVAL)
+            self.max_loop_lag = max(self.max_loop_lag, self.loop.time() - expected)
+
+    @staticmethod
+    def get_board_options(start_content: dict) -> tuple[int, int]:
+        board_size = start_content.get('board_size', DEFAULT_BOARD_SIZE)
+        win_length = start_content.get('win_length', DEFAULT_WIN_LENGTH)
+        try:
+            validate_board_options(board_size, win_length)
+        except ValueError as e:
+            print(f"invalid board options: {e}. falling back to default board.")
+            return DEFAULT_BOARD_SIZE, DEFAULT_WIN_LENGTH
+        return board_size, win_length
+
+    async def get_game(self, tcp_client: BaseTCPClient, username: str, game_type: str,
+                       board_size: int = DEFAULT_BOARD_SIZE, win_length: int = DEFAULT_WIN_LENGTH,
+                       difficulty: str = solver.DEFAULT_DIFFICULTY, game_id: str | None = None) -> Game | None:
+        game = self.sessions.get(game_id) if game_id is not None else None
+        if game is not None:
+            if not self.can_join(game, username):
+                print(f"refused {username} joining game {game.game_id} of {game.user1} and {game.user2}")
+                return None
+            return game
+        if len(self.sessions) >= self.max_sessions:
+            print(f"refused a new game for {username}: all {self.max_sessions} sessions are in use")
+            await tcp_client.send(BaseMessage({"type": "server_full"}))
+            return None
+        if game_type == "single":
+            return await self.get_single_player_game(username, board_size, win_length, difficulty)
+        return await self.get_multiplayer_game(tcp_client, username, board_size, win_length)
+
+    @staticmethod
+    def can_join(game: Game, username: str) -> bool:
+        if isinstance(game, MultiPlayerGame):
+            return username != game.user1 if game.user2 is None else username in (game.user1, game.user2)
+        return username == game.user1
+
+    async def get_single_player_game(self, username, board_size: int = DEFAULT_BOARD_SIZE,
+                                     win_length: int = DEFAULT_WIN_LENGTH,
+                                     difficulty: str = solver.DEFAULT_DIFFICULTY) -> SinglePlayerGame:
+        game = SinglePlayerGame(username, board_size, win_length, difficulty, self.ai_pool, self.position_table,
+                                self.timers, self.turn_time)
+        await self.open_session(game)
+        return game
+
+    async def get_multiplayer_game(self, tcp_client: BaseTCPClient, username: str,
+                                   board_size: int = DEFAULT_BOARD_SIZE,
+                                   win_length: int = DEFAULT_WIN_LENGTH) -> MultiPlayerGame | None:
+        game = MultiPlayerGame(username, board_size, win_length, self.timers, self.turn_time)
+        game.clients_by_username[username] = tcp_client
+        await self.open_session(game)
+        tasks = [asyncio.create_task(x) for x in
+                 [game.wait_until_started(), self._handle_waiting_user_commands(tcp_client)]]
+        try:
+            multi_waiting_message = {
+                "type": "multi_game_waiting",
+                "game_id": game.game_id,
+                "board_size": board_size,
+                "win_length": win_length
+            }
+            await self.master_client.send(BaseMessage(multi_waiting_message))
+            server_assigned_message = {
+                "type": "server_assigned",
+                "game_type": "multi"
+            }
+            await tcp_client.send(BaseMessage(server_assigned_message))
+            remain_in_game = await utils.wait_until_first_completed(tasks)
+            if remain_in_game:
+                print(f"multiplayer game {game.game_id} resumed its host "
+                      f"{(time.perf_counter() - game.started_at) * 1000:.2f}ms after the opponent joined")
+                return game
+
+            changed_message = {
+                "type": "game_changed",
+                "game_status": "finished"
+            }
+            await tcp_client.send(BaseMessage(changed_message))
+        except SocketClosedException:
+            pass
+        game.abort()
+        await self.close_session(game)
+        return None
 
     async def _handle_waiting_user_commands(self, tcp_client: BaseTCPClient):
         while True:
@@ -131,7 +360,22 @@ class GameServer:
             if message_type == "change_game":
                 return False
 
-    async def wait_for_user_reconnect(self, game: Game, username: str, wait_time: int) -> bool:
-        game.clients_by_username.pop(username)
-        await asyncio.sleep(wait_time)
-        return username in game.clients_by_username
+    async def wait_for_user_reconnect(self, player_session: PlayerSession, tcp_client: BaseTCPClient,
+                                      wait_time: float) -> bool:
+        game = player_session.game
+        if game.clients_by_username.get(player_session.username) is tcp_client:
+            game.clients_by_username.pop(player_session.username, None)
+        if self.player_sessions_by_player.get((game.game_id, player_session.username)) is not player_session:
+            # the player already came back on a new connection before this one noticed it was closed
+            return True
+        player_session.resumed = self.loop.create_future()
+        player_session.reconnect_timer = Timer(RECONNECT_TIME)
+        expiry = self.timers.call_later(wait_time, resolve_future, player_session.resumed, False)
+        try:
+            reconnected = await player_session.resumed
+        finally:
+            expiry.cancel()
+            player_session.resumed = None
+        if not reconnected:
+            RECONNECTS.labels("expired").inc()
+        return reconnected
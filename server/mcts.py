@@ -0,0 +1,194 @@
+import asyncio
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+EXPLORATION = 1.4
+
+DEFAULT_BUDGET_MS = 500
+DEFAULT_MAX_ITERATIONS = 20000
+
+
+def is_winning_move(cells, board_size: int, win_length: int, cell: int) -> bool:
+    player = cells[cell]
+    row, col = divmod(cell, board_size)
+    for row_step, col_step in DIRECTIONS:
+        line_length = 1
+        for direction in (1, -1):
+            target_row, target_col = row, col
+            for _ in range(win_length - 1):
+                target_row += row_step * direction
+                target_col += col_step * direction
+                if not (0 <= target_row < board_size and 0 <= target_col < board_size):
+                    break
+                if cells[target_row * board_size + target_col] != player:
+                    break
+                line_length += 1
+        if line_length >= win_length:
+            return True
+    return False
+
+
+class Node:
+    __slots__ = ("player_just_moved", "children", "untried_moves", "visits", "wins", "terminal")
+
+    def __init__(self, player_just_moved: int, untried_moves: list[int], terminal: bool):
+        self.player_just_moved = player_just_moved
+        self.children: dict[int, Node] = {}
+        self.untried_moves = untried_moves
+        self.visits = 0
+        self.wins = 0.0
+        self.terminal = terminal
+
+    def select_child(self) -> tuple[int, "Node"]:
+        log_visits = math.log(self.visits)
+        best_move, best_child, best_score = None, None, -1.0
+        for move, child in self.children.items():
+            score = child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best_move, best_child, best_score = move, child, score
+        return best_move, best_child
+
+
+def _new_node(cells: bytearray, board_size: int, win_length: int, player_just_moved: int, last_move: int | None,
+              rng: random.Random) -> Node:
+    if last_move is not None and is_winning_move(cells, board_size, win_length, last_move):
+        return Node(player_just_moved, [], True)
+    untried_moves = [cell for cell, value in enumerate(cells) if value == 0]
+    rng.shuffle(untried_moves)
+    return Node(player_just_moved, untried_moves, not untried_moves)
+
+
+def _playout(cells: bytearray, board_size: int, win_length: int, player_to_move: int, last_move: int | None,
+             rng: random.Random) -> int:
+    if last_move is not None and is_winning_move(cells, board_size, win_length, last_move):
+        return 3 - player_to_move
+    empty_cells = [cell for cell, value in enumerate(cells) if value == 0]
+    rng.shuffle(empty_cells)
+    for cell in empty_cells:
+        cells[cell] = player_to_move
+        if is_winning_move(cells, board_size, win_length, cell):
+            return player_to_move
+        player_to_move = 3 - player_to_move
+    return 0
+
+
+def search(cells: bytes, board_size: int, win_length: int, player_to_move: int, root: Node | None,
+           budget_ms: int, max_iterations: int, seed: int | None = None) -> tuple[int, Node, int]:
+    rng = random.Random(seed)
+    if root is None:
+        root = _new_node(bytearray(cells), board_size, win_length, 3 - player_to_move, None, rng)
+
+    deadline = time.perf_counter() + budget_ms / 1000
+    iterations = 0
+    while iterations < max_iterations and (iterations & 63 or time.perf_counter() < deadline):
+        iterations += 1
+        state = bytearray(cells)
+        node = root
+        path = [root]
+        last_move = None
+
+        while not node.untried_moves and node.children and not node.terminal:
+            last_move, node = node.select_child()
+            state[last_move] = node.player_just_moved
+            path.append(node)
+
+        if node.untried_moves and not node.terminal:
+            move = node.untried_moves.pop()
+            player = 3 - node.player_just_moved
+            state[move] = player
+            child = _new_node(state, board_size, win_length, player, move, rng)
+            node.children[move] = child
+            node = child
+            last_move = move
+            path.append(node)
+
+        winner = _playout(state, board_size, win_length, 3 - node.player_just_moved, last_move, rng)
+        for visited in path:
+            visited.visits += 1
+            if winner == visited.player_just_moved:
+                visited.wins += 1
+            elif winner == 0:
+                visited.wins += 0.5
+
+    if not root.children:
+        # the budget ran out before the first playout; any legal move beats no move
+        move = root.untried_moves.pop()
+        state = bytearray(cells)
+        state[move] = player_to_move
+        root.children[move] = _new_node(state, board_size, win_length, player_to_move, move, rng)
+    best_move = max(root.children.items(), key=lambda item: item[1].visits)[0]
+    return best_move, root.children[best_move], iterations
+
+
+def find_tactical_move(cells: bytes, board_size: int, win_length: int, player_to_move: int) -> int | None:
+    state = bytearray(cells)
+    for player in (player_to_move, 3 - player_to_move):
+        for cell, value in enumerate(cells):
+            if value != 0:
+                continue
+            state[cell] = player
+            winning = is_winning_move(state, board_size, win_length, cell)
+            state[cell] = 0
+            if winning:
+                return cell
+    return None
+
+
+def think(cells: bytes, board_size: int, win_length: int, player_to_move: int, tree: Node | None,
+          opponent_move: int | None, budget_ms: int, max_iterations: int) -> tuple[int, Node | None, int, float]:
+    start = time.perf_counter()
+    tactical_move = find_tactical_move(cells, board_size, win_length, player_to_move)
+    if tactical_move is not None:
+        return tactical_move, None, 0, time.perf_counter() - start
+
+    root = None
+    if tree is not None and opponent_move is not None:
+        root = tree.children.get(opponent_move)
+    move, subtree, playouts = search(cells, board_size, win_length, player_to_move, root, budget_ms, max_iterations)
+    return move, subtree, playouts, time.perf_counter() - start
+
+
+class MCTSPool:
+    def __init__(self, max_workers: int, budget_ms: int = DEFAULT_BUDGET_MS,
+                 max_iterations: int = DEFAULT_MAX_ITERATIONS):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.max_workers = max_workers
+        self.budget_ms = budget_ms
+        self.max_iterations = max_iterations
+        self.pending = 0
+        self.moves = 0
+        self.total_think_seconds = 0.0
+        self.total_playouts = 0
+
+    @property
+    def average_think_ms(self) -> float:
+        return self.total_think_seconds / self.moves * 1000 if self.moves else 0.0
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.total_playouts / self.total_think_seconds if self.total_think_seconds else 0.0
+
+    async def choose_move(self, cells: bytes, board_size: int, win_length: int, player_to_move: int,
+                          tree: Node | None, opponent_move: int | None) -> tuple[int, Node | None]:
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            move, subtree, playouts, think_seconds = await loop.run_in_executor(
+                self.executor, think, cells, board_size, win_length, player_to_move, tree, opponent_move,
+                self.budget_ms, self.max_iterations)
+        finally:
+            self.pending -= 1
+        self.moves += 1
+        self.total_think_seconds += think_seconds
+        self.total_playouts += playouts
+        return move, subtree
+
+    def report(self) -> str:
+        return (f"AI pool: workers={self.max_workers} moves={self.moves} pending={self.pending} "
+                f"avg_think={self.average_think_ms:.1f}ms playouts/s={self.playouts_per_second:.0f}")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
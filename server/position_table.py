@@ -0,0 +1,222 @@
+import argparse
+import array
+import bisect
+import itertools
+import mmap
+import operator
+import struct
+import sys
+import time
+
+from server.solver import symmetries
+from server.tic_toc_toe import DIRECTIONS
+
+TABLE_MAGIC = b"TTTTABLE"
+TABLE_VERSION = 1
+NO_MOVE = 0xFF
+MAX_TABLE_BOARD_SIZE = 4
+DEFAULT_VARIANTS = ((3, 3), (4, 3), (4, 4))
+
+FILE_HEADER = struct.Struct("<8sHH")
+SECTION_HEADER = struct.Struct("<BBxxII")
+
+
+def winning_lines_by_cell(board_size: int, win_length: int) -> tuple[tuple[tuple[int, ...], ...], ...]:
+    lines_by_cell = [[] for _ in range(board_size * board_size)]
+    for row in range(board_size):
+        for col in range(board_size):
+            for row_step, col_step in DIRECTIONS:
+                end_row = row + row_step * (win_length - 1)
+                end_col = col + col_step * (win_length - 1)
+                if 0 <= end_row < board_size and 0 <= end_col < board_size:
+                    line = tuple((row + row_step * step) * board_size + col + col_step * step
+                                 for step in range(win_length))
+                    for cell in line:
+                        lines_by_cell[cell].append(line)
+    return tuple(tuple(lines) for lines in lines_by_cell)
+
+
+def canonical_transforms(board_size: int) -> tuple:
+    return tuple((operator.itemgetter(*permutation), permutation) for permutation in symmetries(board_size))
+
+
+def canonicalize(cells: tuple, transforms: tuple) -> tuple[tuple, tuple[int, ...]]:
+    return min([(transform(cells), permutation) for transform, permutation in transforms])
+
+
+def position_key(cells: tuple) -> int:
+    key = 0
+    for value in reversed(cells):
+        key = key * 3 + value
+    return key
+
+
+class PositionSolver:
+    def __init__(self, board_size: int, win_length: int):
+        self.board_size = board_size
+        self.win_length = win_length
+        self.cell_count = board_size * board_size
+        self.lines_by_cell = winning_lines_by_cell(board_size, win_length)
+        self.transforms = canonical_transforms(board_size)
+        self.entries: dict[int, tuple[int, int]] = dict()
+
+    def solve(self, cells: tuple) -> int:
+        key = position_key(cells)
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry[1]
+
+        empty_cells = cells.count(0)
+        player = 1 if (self.cell_count - empty_cells) % 2 == 0 else 2
+        best_score, best_move = -self.cell_count - 2, NO_MOVE
+        for cell in range(self.cell_count):
+            if cells[cell] != 0:
+                continue
+            child = cells[:cell] + (player,) + cells[cell + 1:]
+            if self.is_winning_move(child, cell):
+                score = empty_cells
+            elif empty_cells == 1:
+                score = 0
+            else:
+                score = -self.solve(canonicalize(child, self.transforms)[0])
+            if score > best_score:
+                best_score, best_move = score, cell
+        self.entries[key] = (best_move, best_score)
+        return best_score
+
+    def is_winning_move(self, cells: tuple, cell: int) -> bool:
+        player = cells[cell]
+        for line in self.lines_by_cell[cell]:
+            if all(cells[line_cell] == player for line_cell in line):
+                return True
+        return False
+
+
+def build_section(board_size: int, win_length: int) -> bytes:
+    position_solver = PositionSolver(board_size, win_length)
+    position_solver.solve((0,) * position_solver.cell_count)
+    keys = sorted(position_solver.entries)
+    entries = position_solver.entries
+    return (array_bytes("I", keys) + bytes(entries[key][0] for key in keys) +
+            array_bytes("b", [entries[key][1] for key in keys]))
+
+
+def array_bytes(typecode: str, values: list[int]) -> bytes:
+    values = array.array(typecode, values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def build_table(path: str, variants=DEFAULT_VARIANTS):
+    sections = []
+    for board_size, win_length in variants:
+        if board_size > MAX_TABLE_BOARD_SIZE:
+            raise ValueError(f"position tables cover boards up to {MAX_TABLE_BOARD_SIZE}x{MAX_TABLE_BOARD_SIZE}")
+        start = time.perf_counter()
+        section = build_section(board_size, win_length)
+        print(f"solved {board_size}x{board_size} win {win_length}: {len(section) // 6} positions "
+              f"in {time.perf_counter() - start:.1f}s")
+        sections.append((board_size, win_length, section))
+
+    offset = FILE_HEADER.size + SECTION_HEADER.size * len(sections)
+    headers = [FILE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(sections))]
+    bodies = []
+    for board_size, win_length, section in sections:
+        offset += -offset % 8
+        headers.append(SECTION_HEADER.pack(board_size, win_length, len(section) // 6, offset))
+        bodies.append((offset, section))
+        offset += len(section)
+    data = bytearray(b"".join(headers))
+    for offset, section in bodies:
+        data += bytes(offset - len(data)) + section
+    with open(path, "wb") as table_file:
+        table_file.write(data)
+
+
+class TableSection:
+    def __init__(self, view: memoryview, board_size: int, win_length: int, count: int, offset: int):
+        self.board_size = board_size
+        self.win_length = win_length
+        self.count = count
+        self.transforms = canonical_transforms(board_size)
+        keys_end = offset + 4 * count
+        self.keys = view[offset:keys_end].cast("I")
+        if sys.byteorder != "little":
+            self.keys = array.array("I", self.keys)
+            self.keys.byteswap()
+        self.moves = view[keys_end:keys_end + count]
+        self.scores = view[keys_end + count:keys_end + 2 * count].cast("b")
+
+    def lookup(self, board: list[list[int]]) -> tuple[tuple[int, int], int] | None:
+        cells = tuple(itertools.chain.from_iterable(board))
+        canonical, permutation = canonicalize(cells, self.transforms)
+        key = position_key(canonical)
+        index = bisect.bisect_left(self.keys, key)
+        if index == self.count or self.keys[index] != key:
+            return None
+        move = self.moves[index]
+        if move == NO_MOVE:
+            return None
+        return divmod(permutation[move], self.board_size), self.scores[index]
+
+
+class PositionTable:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as table_file:
+            self.mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mmap)
+        magic, version, section_count = FILE_HEADER.unpack_from(view, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError(f"{path} is not a version {TABLE_VERSION} position table")
+        self.sections: dict[tuple[int, int], TableSection] = dict()
+        for index in range(section_count):
+            board_size, win_length, count, offset = SECTION_HEADER.unpack_from(
+                view, FILE_HEADER.size + index * SECTION_HEADER.size)
+            if offset + 6 * count > len(view):
+                raise ValueError(f"{path} is truncated")
+            self.sections[(board_size, win_length)] = TableSection(view, board_size, win_length, count, offset)
+
+    def covers(self, board_size: int, win_length: int) -> bool:
+        return (board_size, win_length) in self.sections
+
+    def lookup(self, board: list[list[int]], win_length: int) -> tuple[tuple[int, int], int] | None:
+        section = self.sections.get((len(board), win_length))
+        if section is None:
+            return None
+        return section.lookup(board)
+
+    def best_move(self, board: list[list[int]], win_length: int) -> tuple[int, int] | None:
+        entry = self.lookup(board, win_length)
+        return entry[0] if entry is not None else None
+
+    def describe(self) -> str:
+        return ", ".join(f"{board_size}x{board_size} win {win_length}: {section.count} positions"
+                         for (board_size, win_length), section in self.sections.items())
+
+
+def parse_variant(text: str) -> tuple[int, int]:
+    board_size, _, win_length = text.partition(":")
+    return int(board_size), int(win_length or board_size)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build or inspect the shared position table")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="solve every reachable position and write the table")
+    build_parser.add_argument("path")
+    build_parser.add_argument("--variants", nargs="+", type=parse_variant,
+                              default=list(DEFAULT_VARIANTS),
+                              help="board_size:win_length pairs to solve")
+    info_parser = subparsers.add_parser("info", help="list the boards a table covers")
+    info_parser.add_argument("path")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == "build":
+        build_table(args.path, args.variants)
+    else:
+        print(PositionTable(args.path).describe())
@@ -0,0 +1,207 @@
+import os
+import random
+import sys
+import time
+
+BOARD_SIZE = 3
+CELL_COUNT = BOARD_SIZE * BOARD_SIZE
+TABLE_SIZE = 3 ** CELL_COUNT
+NO_MOVE = 0x0F
+
+LOSS, DRAW, WIN = 0, 1, 2
+
+LINES = tuple(
+    [tuple(row * BOARD_SIZE + col for col in range(BOARD_SIZE)) for row in range(BOARD_SIZE)] +
+    [tuple(row * BOARD_SIZE + col for row in range(BOARD_SIZE)) for col in range(BOARD_SIZE)] +
+    [tuple(i * BOARD_SIZE + i for i in range(BOARD_SIZE)),
+     tuple(i * BOARD_SIZE + BOARD_SIZE - 1 - i for i in range(BOARD_SIZE))]
+)
+
+POWERS_OF_THREE = tuple(3 ** cell for cell in range(CELL_COUNT))
+
+DIFFICULTY_BLUNDER_RATES = {
+    "easy": 0.5,
+    "medium": 0.2,
+    "hard": 0.0,
+}
+DEFAULT_DIFFICULTY = "hard"
+
+
+def symmetries(board_size: int = BOARD_SIZE) -> tuple[tuple[int, ...], ...]:
+    last = board_size - 1
+    transforms = (
+        lambda r, c: (r, c),
+        lambda r, c: (c, last - r),
+        lambda r, c: (last - r, last - c),
+        lambda r, c: (last - c, r),
+        lambda r, c: (r, last - c),
+        lambda r, c: (last - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (last - c, last - r),
+    )
+    permutations = []
+    for transform in transforms:
+        permutation = [0] * (board_size * board_size)
+        for cell in range(board_size * board_size):
+            row, col = transform(*divmod(cell, board_size))
+            permutation[row * board_size + col] = cell
+        permutations.append(tuple(permutation))
+    return tuple(permutations)
+
+
+SYMMETRIES = symmetries()
+
+
+def position_key(cells) -> int:
+    key = 0
+    for cell, value in enumerate(cells):
+        key += value * POWERS_OF_THREE[cell]
+    return key
+
+
+def board_key(board: list[list[int]]) -> int:
+    return position_key(value for row in board for value in row)
+
+
+def canonicalize(cells: tuple, permutations: tuple[tuple[int, ...], ...] = SYMMETRIES) -> tuple[tuple, tuple[int, ...]]:
+    best_cells, best_permutation = None, None
+    for permutation in permutations:
+        transformed = tuple(cells[source] for source in permutation)
+        if best_cells is None or transformed < best_cells:
+            best_cells, best_permutation = transformed, permutation
+    return best_cells, best_permutation
+
+
+def winner_of(cells: tuple) -> int:
+    for a, b, c in LINES:
+        if cells[a] != 0 and cells[a] == cells[b] == cells[c]:
+            return cells[a]
+    return 0
+
+
+class Solver:
+    def __init__(self):
+        self.exact_scores: dict[tuple, int] = {}
+        self.best_moves: dict[tuple, int] = {}
+
+    def solve(self, cells: tuple) -> tuple[int, int]:
+        canonical, permutation = canonicalize(cells)
+        score = self._negamax(canonical, -CELL_COUNT - 2, CELL_COUNT + 2)
+        canonical_move = self.best_moves.get(canonical, NO_MOVE)
+        move = permutation[canonical_move] if canonical_move != NO_MOVE else NO_MOVE
+        return score, move
+
+    def _negamax(self, cells: tuple, alpha: int, beta: int) -> int:
+        cached = self.exact_scores.get(cells)
+        if cached is not None:
+            return cached
+
+        empty_cells = [cell for cell in range(CELL_COUNT) if cells[cell] == 0]
+        if winner_of(cells) != 0:
+            return -(len(empty_cells) + 1)
+        if not empty_cells:
+            return 0
+
+        player = 1 if len(empty_cells) % 2 == 1 else 2
+        original_alpha = alpha
+        best_score, best_move = -CELL_COUNT - 2, NO_MOVE
+        for cell in empty_cells:
+            child = cells[:cell] + (player,) + cells[cell + 1:]
+            child_canonical, _ = canonicalize(child)
+            score = -self._negamax(child_canonical, -beta, -alpha)
+            if score > best_score:
+                best_score, best_move = score, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if original_alpha < best_score < beta:
+            self.exact_scores[cells] = best_score
+            self.best_moves[cells] = best_move
+        return best_score
+
+
+class SolvedTable:
+    FILE_MAGIC = b"TTT3"
+
+    def __init__(self, entries: bytes):
+        self.entries = entries
+
+    @classmethod
+    def build(cls) -> "SolvedTable":
+        solver = Solver()
+        entries = bytearray([NO_MOVE] * TABLE_SIZE)
+        stack = [(0,) * CELL_COUNT]
+        seen = set()
+        while stack:
+            cells = stack.pop()
+            key = position_key(cells)
+            if key in seen:
+                continue
+            seen.add(key)
+            if winner_of(cells) != 0 or 0 not in cells:
+                continue
+            score, move = solver.solve(cells)
+            outcome = WIN if score > 0 else LOSS if score < 0 else DRAW
+            entries[key] = outcome << 4 | move
+            player = 1 if cells.count(0) % 2 == 1 else 2
+            for cell in range(CELL_COUNT):
+                if cells[cell] == 0:
+                    stack.append(cells[:cell] + (player,) + cells[cell + 1:])
+        return cls(bytes(entries))
+
+    @classmethod
+    def load(cls, path: str) -> "SolvedTable":
+        with open(path, 'rb') as table_file:
+            data = table_file.read()
+        if data[:len(cls.FILE_MAGIC)] != cls.FILE_MAGIC or len(data) != len(cls.FILE_MAGIC) + TABLE_SIZE:
+            raise ValueError(f"{path} is not a solved 3x3 table")
+        return cls(data[len(cls.FILE_MAGIC):])
+
+    def save(self, path: str):
+        with open(path, 'wb') as table_file:
+            table_file.write(self.FILE_MAGIC + self.entries)
+
+    def best_move(self, key: int) -> int:
+        return self.entries[key] & 0x0F
+
+    def outcome(self, key: int) -> int:
+        return self.entries[key] >> 4
+
+
+_solved_table: SolvedTable | None = None
+
+
+def get_solved_table(path: str | None = None) -> SolvedTable:
+    global _solved_table
+    if _solved_table is None:
+        if path is not None and os.path.exists(path):
+            _solved_table = SolvedTable.load(path)
+        else:
+            _solved_table = SolvedTable.build()
+    return _solved_table
+
+
+def choose_move(board: list[list[int]], difficulty: str = DEFAULT_DIFFICULTY,
+                rng: random.Random = random, position_table=None) -> tuple[int, int] | None:
+    blunder_rate = DIFFICULTY_BLUNDER_RATES.get(difficulty, 0.0)
+    if blunder_rate and rng.random() < blunder_rate:
+        empty_cells = [(row, col) for row in range(BOARD_SIZE) for col in range(BOARD_SIZE) if board[row][col] == 0]
+        return rng.choice(empty_cells) if empty_cells else None
+    if position_table is not None:
+        move = position_table.best_move(board, BOARD_SIZE)
+        if move is not None:
+            return move
+    move = get_solved_table().best_move(board_key(board))
+    if move == NO_MOVE:
+        return None
+    return divmod(move, BOARD_SIZE)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    table = SolvedTable.build()
+    print(f"built solved 3x3 table in {time.perf_counter() - start:.3f}s")
+    if len(sys.argv) > 1:
+        table.save(sys.argv[1])
+        print(f"saved to {sys.argv[1]}")
@@ -0,0 +1,135 @@
+import multiprocessing
+import socket
+import time
+from multiprocessing.connection import Connection, wait
+
+from transport.tcp_server import bind_listen_socket
+
+REPORT_INTERVAL = 10.0
+MIN_HEALTHY_UPTIME = 5.0
+MAX_RESTART_DELAY = 30.0
+
+
+class WorkerProcess:
+    def __init__(self, worker_id: int, listen_socket: socket.socket):
+        self.worker_id = worker_id
+        self.listen_socket = listen_socket
+        self.process: multiprocessing.Process | None = None
+        self.connection: Connection | None = None
+        self.started_at = 0.0
+        self.restart_at: float | None = None
+        self.restarts = 0
+        self.crash_streak = 0
+        self.last_report: dict = {}
+
+    @property
+    def port(self) -> int:
+        return self.listen_socket.getsockname()[1]
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    def __init__(self, target, worker_count: int, host: str, base_port: int = 0, worker_args: tuple = (),
+                 report_interval: float = REPORT_INTERVAL):
+        self.target = target
+        self.worker_args = worker_args
+        self.report_interval = report_interval
+        self.workers = []
+        for worker_id in range(worker_count):
+            port = base_port + worker_id if base_port else 0
+            self.workers.append(WorkerProcess(worker_id, bind_listen_socket(host, port)))
+        self.stopping = False
+
+    def run(self):
+        for worker in self.workers:
+            self._spawn(worker)
+        next_report = time.monotonic() + self.report_interval
+        try:
+            while not self.stopping:
+                timeout = max(0.0, min([next_report] + self._pending_restarts()) - time.monotonic())
+                ready = wait(self._waitables(), timeout)
+                for worker in self.workers:
+                    if worker.connection in ready:
+                        self._receive_report(worker)
+                    if worker.process is not None and worker.process.sentinel in ready:
+                        self._handle_exit(worker)
+                now = time.monotonic()
+                for worker in self.workers:
+                    if worker.restart_at is not None and worker.restart_at <= now:
+                        self._spawn(worker)
+                if now >= next_report:
+                    print(self.report())
+                    next_report = now + self.report_interval
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stopping = True
+        for worker in self.workers:
+            if worker.alive:
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(5)
+            worker.listen_socket.close()
+
+    def _spawn(self, worker: WorkerProcess):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        worker.process = multiprocessing.Process(target=self.target, name=f"gameserver-worker-{worker.worker_id}",
+                                                 args=(worker.worker_id, worker.listen_socket, sender,
+                                                       *self.worker_args))
+        worker.process.start()
+        sender.close()
+        worker.connection = receiver
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        print(f"worker {worker.worker_id} started with pid={worker.process.pid} on port {worker.port}")
+
+    def _handle_exit(self, worker: WorkerProcess):
+        worker.process.join()
+        exitcode = worker.process.exitcode
+        worker.process = None
+        worker.connection.close()
+        worker.connection = None
+        worker.last_report = {}
+        if self.stopping:
+            return
+        if time.monotonic() - worker.started_at < MIN_HEALTHY_UPTIME:
+            worker.crash_streak += 1
+        else:
+            worker.crash_streak = 0
+        delay = min(2 ** worker.crash_streak - 1, MAX_RESTART_DELAY)
+        worker.restarts += 1
+        worker.restart_at = time.monotonic() + delay
+        print(f"worker {worker.worker_id} exited with code {exitcode}, restarting in {delay:.0f}s")
+
+    def _receive_report(self, worker: WorkerProcess):
+        try:
+            worker.last_report = worker.connection.recv()
+        except EOFError:
+            pass
+
+    def _waitables(self) -> list:
+        waitables = []
+        for worker in self.workers:
+            if worker.process is not None:
+                waitables.append(worker.process.sentinel)
+                waitables.append(worker.connection)
+        return waitables
+
+    def _pending_restarts(self) -> list[float]:
+        return [worker.restart_at for worker in self.workers if worker.restart_at is not None]
+
+    def report(self) -> str:
+        lines = ["gameserver workers".center(40, '*')]
+        for worker in self.workers:
+            load = worker.last_report
+            state = "up" if worker.alive else "restarting"
+            lines.append(f"worker {worker.worker_id} {state} port={worker.port} restarts={worker.restarts} "
+                         f"games={load.get('active_games', '-')}/{load.get('capacity', '-')} "
+                         f"clients={load.get('connected_clients', '-')} loop_lag={load.get('loop_lag_ms', '-')}ms "
+                         f"ai_pending={load.get('ai_pending', '-')}")
+        return "\n".join(lines)
@@ -1,10 +1,36 @@
+DEFAULT_BOARD_SIZE = 3
+DEFAULT_WIN_LENGTH = 3
+MIN_BOARD_SIZE = 3
+MAX_BOARD_SIZE = 15
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def validate_board_options(board_size: int, win_length: int):
+    if type(board_size) is not int or not MIN_BOARD_SIZE <= board_size <= MAX_BOARD_SIZE:
+        raise ValueError(f"board_size must be between {MIN_BOARD_SIZE} and {MAX_BOARD_SIZE}")
+    if type(win_length) is not int or not MIN_BOARD_SIZE <= win_length <= board_size:
+        raise ValueError(f"win_length must be between {MIN_BOARD_SIZE} and board_size")
+
+
 class TicTocToe:
-    def __init__(self, user1: str, user2: str):
+    def __init__(self, user1: str, user2: str, board_size: int = DEFAULT_BOARD_SIZE,
+                 win_length: int = DEFAULT_WIN_LENGTH):
+        validate_board_options(board_size, win_length)
         self.user1 = user1
         self.user2 = user2
+        self.board_size = board_size
+        self.win_length = win_length
         self.current_user = 1
-        self.board = [[0 for _ in range(3)] for _ in range(3)]
+        self.cells = bytearray(board_size * board_size)
+        self.marks_placed = 0
         self.winner = 0
+        self.forfeited = False
+
+    @property
+    def board(self) -> list[list[int]]:
+        size = self.board_size
+        return [list(self.cells[row * size:(row + 1) * size]) for row in range(size)]
 
     def place_mark(self, user: str, row: int, col: int):
         game_userid = self.get_game_userid(user)
@@ -15,7 +41,8 @@ class TicTocToe:
         if game_userid != self.current_user:
             raise Exception()
         self.validate_coordinate(row, col)
-        self.board[row][col] = self.current_user
+        self.cells[row * self.board_size + col] = self.current_user
+        self.marks_placed += 1
         self.change_current_user()
         self._set_winner_if_exists(row, col)
 
@@ -36,11 +63,11 @@ class TicTocToe:
             raise Exception()
 
     def validate_coordinate(self, row, col):
-        if row < 0 or row > 2:
+        if row < 0 or row >= self.board_size:
             raise Exception()
-        if col < 0 or col > 2:
+        if col < 0 or col >= self.board_size:
             raise Exception()
-        if self.board[row][col] != 0:
+        if self.cells[row * self.board_size + col] != 0:
             raise Exception()
 
     def change_current_user(self):
@@ -50,58 +77,36 @@ class TicTocToe:
             self.current_user = 1
 
     def has_game_finished(self):
-        if self.winner != 0:
-            return True
-        for i in range(3):
-            for j in range(3):
-                if self.board[i][j] == 0:
-                    return False
-        return True
+        return self.winner != 0 or self.marks_placed == len(self.cells)
 
-    def _set_winner_if_exists(self, row, col):
-        probable_winner = self.board[row][col]
+    def forfeit_turn(self):
+        if self.has_game_finished():
+            raise Exception()
+        self.forfeited = True
+        if self.current_user == 1:
+            self.winner = 2
+        else:
+            self.winner = 1
 
-        if self._check_horizontal(row, col) or self._check_vertical(row, col) or self._check_diagonal(row, col):
-            self.winner = probable_winner
+    def _set_winner_if_exists(self, row, col):
+        probable_winner = self.cells[row * self.board_size + col]
 
-    def _check_horizontal(self, row, col):
-        cell_value = self.board[row][col]
-        counter = 0
-        for i in range(-2, 3):
-            target_row = row + i
-            if 0 <= target_row < 3 and self.board[target_row][col] == cell_value:
-                counter += 1
-        return counter == 3
-
-    def _check_vertical(self, row, col):
-        cell_value = self.board[row][col]
-        counter = 0
-        for i in range(-2, 3):
-            target_col = col + i
-            if 0 <= target_col < 3 and self.board[row][target_col] == cell_value:
-                counter += 1
-        return counter == 3
-
-    def _check_diagonal(self, row, col):
-        cell_value = self.board[row][col]
-        counter = 0
-        for i in range(-2, 3):
-            target_row = row + i
-            target_col = col + i
-            if 0 <= target_col < 3 and 0 <= target_row < 3:
-                target_value = self.board[target_row][target_col]
-                if target_value == cell_value:
-                    counter += 1
-        if counter == 3:
-            return True
+        for row_step, col_step in DIRECTIONS:
+            line_length = 1 + self._count_in_direction(row, col, row_step, col_step) + \
+                          self._count_in_direction(row, col, -row_step, -col_step)
+            if line_length >= self.win_length:
+                self.winner = probable_winner
+                return
 
+    def _count_in_direction(self, row, col, row_step, col_step):
+        size = self.board_size
+        cells = self.cells
+        cell_value = cells[row * size + col]
         counter = 0
-        for i in range(-2, 3):
-            target_row = row - i
-            target_col = col + i
-            if 0 <= target_col < 3 and 0 <= target_row < 3:
-                target_value = self.board[target_row][target_col]
-                if target_value == cell_value:
-                    counter += 1
-        if counter == 3:
-            return True
+        for _ in range(self.win_length - 1):
+            row += row_step
+            col += col_step
+            if not (0 <= row < size and 0 <= col < size) or cells[row * size + col] != cell_value:
+                break
+            counter += 1
+        return counter
@@ -1,10 +1,20 @@
+import argparse
 import asyncio
 import logging
-import random
+import os
+import socket
+from multiprocessing.connection import Connection
 
+import metrics
 import webserver_main
-from server.game_server import GameServer
+from server import solver
+from server import mcts
+from server.game_log import GameRecordLog
+from server.game_server import GameServer, DEFAULT_MAX_SESSIONS, DEFAULT_RECONNECT_WINDOW, DEFAULT_TURN_TIME
+from server.position_table import PositionTable
+from server.supervisor import Supervisor
 from server.tic_toc_toe import TicTocToe
+from transport.codec import SUPPORTED_CODECS
 from transport.tcp_client import BaseTCPClient, BaseMessage
 
 logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
@@ -15,34 +25,164 @@ WEBSERVER_PORT = webserver_main.WEBSERVER_GAMESERVER_REPO_PORT
 WEBSERVER_ADDRESS = (WEBSERVER_HOST, WEBSERVER_PORT)
 
 SERVER_HOST = '127.0.0.1'
-SERVER_PORT = random.randint(10000, 50000)
-SERVER_ADDRESS = (SERVER_HOST, SERVER_PORT)
+SERVER_PORT = 0
 
+SOLVED_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solved_3x3.bin")
+POSITION_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "positions.bin")
 
-async def async_handshake(tcp_client: BaseTCPClient):
+DEFAULT_AI_POOL_SIZE = 2
+LOAD_REPORT_INTERVAL = 2
+
+
+async def async_handshake(tcp_client: BaseTCPClient, host: str, port: int, worker_id: int | None = None):
     content = {
         "type": "handshake",
-        "host": SERVER_HOST,
-        "port": SERVER_PORT
+        "host": host,
+        "port": port,
+        "codecs": SUPPORTED_CODECS
     }
+    if worker_id is not None:
+        content["worker_id"] = worker_id
 
     await tcp_client.send(BaseMessage(content))
 
 
-async def run_server():
+def open_position_table(path: str | None) -> PositionTable | None:
+    if path is None or not os.path.exists(path):
+        return None
+    position_table = PositionTable(path)
+    print(f"mapped position table {path}: {position_table.describe()}")
+    return position_table
+
+
+def load_ai_tables(position_table_path: str | None) -> PositionTable | None:
+    position_table = open_position_table(position_table_path)
+    if position_table is None or not position_table.covers(solver.BOARD_SIZE, solver.BOARD_SIZE):
+        solver.get_solved_table(SOLVED_TABLE_PATH)
+    return position_table
+
+
+async def report_load(game_server: GameServer, worker_id: int, report_connection: Connection):
+    while True:
+        report = game_server.load_report()
+        report["worker_id"] = worker_id
+        report_connection.send(report)
+        await asyncio.sleep(LOAD_REPORT_INTERVAL)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tic-toc-toe game server")
+    parser.add_argument("--ai-pool-size", type=int, default=DEFAULT_AI_POOL_SIZE,
+                        help="worker processes for the MCTS opponent on boards larger than 3x3 (0 disables it)")
+    parser.add_argument("--ai-budget-ms", type=int, default=mcts.DEFAULT_BUDGET_MS,
+                        help="thinking time per computer move")
+    parser.add_argument("--ai-max-iterations", type=int, default=mcts.DEFAULT_MAX_ITERATIONS,
+                        help="maximum MCTS playouts per computer move")
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS,
+                        help="number of concurrent games this process accepts and reports as its capacity")
+    parser.add_argument("--port", type=int, default=SERVER_PORT,
+                        help="port to listen on; worker i listens on port + i (0 lets the OS choose)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run a supervisor with this many worker processes (0 runs a single process)")
+    parser.add_argument("--webserver-port", type=int, default=WEBSERVER_PORT,
+                        help="webserver port game servers register with")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics over HTTP on this port; worker i uses port + i")
+    parser.add_argument("--game-log-dir", default=None,
+                        help="append a binary record of every finished game to log files in this directory")
+    parser.add_argument("--position-table", default=POSITION_TABLE_PATH,
+                        help="memory-map this solved position table (build it with python -m server.position_table)")
+    parser.add_argument("--reconnect-window", type=float, default=DEFAULT_RECONNECT_WINDOW,
+                        help="seconds a disconnected player's game is held open for them to resume")
+    parser.add_argument("--turn-time", type=float, default=DEFAULT_TURN_TIME,
+                        help="seconds a player has for each move before forfeiting the game (0 disables the clock)")
+    args = parser.parse_args()
+    if args.ai_max_iterations < 1:
+        parser.error("--ai-max-iterations must be at least 1")
+    return args
+
+
+async def run_server(ai_pool_size: int = DEFAULT_AI_POOL_SIZE, ai_budget_ms: int = mcts.DEFAULT_BUDGET_MS,
+                     ai_max_iterations: int = mcts.DEFAULT_MAX_ITERATIONS, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                     port: int = SERVER_PORT, listen_socket: socket.socket | None = None, worker_id: int | None = None,
+                     report_connection: Connection | None = None, metrics_port: int | None = None,
+                     webserver_address: tuple | None = None, game_log_dir: str | None = None,
+                     position_table_path: str | None = POSITION_TABLE_PATH,
+                     reconnect_window: float = DEFAULT_RECONNECT_WINDOW, turn_time: float = DEFAULT_TURN_TIME):
+    position_table = load_ai_tables(position_table_path)
+    game_log = None
+    if game_log_dir is not None:
+        game_log = GameRecordLog(game_log_dir, "server" if worker_id is None else f"worker{worker_id}")
+        game_log.start()
+    metrics_server = None
+    if metrics_port is not None:
+        metrics_server = await metrics.start_metrics_server(SERVER_HOST, metrics_port)
+    ai_pool = mcts.MCTSPool(ai_pool_size, ai_budget_ms, ai_max_iterations) if ai_pool_size > 0 else None
     master_client = BaseTCPClient()
-    await master_client.connect(WEBSERVER_ADDRESS)
-    await async_handshake(master_client)
-    game_server = GameServer(master_client, SERVER_HOST, SERVER_PORT)
+    await master_client.connect(webserver_address or WEBSERVER_ADDRESS)
+    game_server = GameServer(master_client, SERVER_HOST, port, ai_pool, max_sessions, listen_socket, game_log,
+                             position_table, reconnect_window, turn_time)
+    await async_handshake(master_client, game_server.tcp_server.host, game_server.tcp_server.port, worker_id)
+    report_task = None
+    if report_connection is not None:
+        report_task = asyncio.create_task(report_load(game_server, worker_id, report_connection))
     try:
         await game_server.start()
     finally:
+        if report_task is not None:
+            report_task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
         game_server.tcp_server.close()
+        game_server.timers.close()
         master_client.close()
+        if ai_pool is not None:
+            ai_pool.shutdown()
+        if game_log is not None:
+            game_log.close()
+
+
+def run_worker(worker_id: int, listen_socket: socket.socket, report_connection: Connection, ai_pool_size: int,
+               ai_budget_ms: int, ai_max_iterations: int, max_sessions: int, metrics_port: int | None = None,
+               webserver_address: tuple | None = None, game_log_dir: str | None = None,
+               position_table_path: str | None = POSITION_TABLE_PATH,
+               reconnect_window: float = DEFAULT_RECONNECT_WINDOW, turn_time: float = DEFAULT_TURN_TIME):
+    if metrics_port is not None:
+        metrics_port += worker_id
+    asyncio.run(run_server(ai_pool_size, ai_budget_ms, ai_max_iterations, max_sessions,
+                           listen_socket=listen_socket, worker_id=worker_id, report_connection=report_connection,
+                           metrics_port=metrics_port, webserver_address=webserver_address,
+                           game_log_dir=game_log_dir, position_table_path=position_table_path,
+                           reconnect_window=reconnect_window, turn_time=turn_time))
+
+
+def run_supervisor(workers: int, port: int, ai_pool_size: int, ai_budget_ms: int, ai_max_iterations: int,
+                   max_sessions: int, metrics_port: int | None = None, webserver_address: tuple | None = None,
+                   game_log_dir: str | None = None, position_table_path: str | None = POSITION_TABLE_PATH,
+                   reconnect_window: float = DEFAULT_RECONNECT_WINDOW, turn_time: float = DEFAULT_TURN_TIME):
+    load_ai_tables(position_table_path)
+    supervisor = Supervisor(run_worker, workers, SERVER_HOST, port,
+                            (ai_pool_size, ai_budget_ms, ai_max_iterations, max_sessions, metrics_port,
+                             webserver_address, game_log_dir, position_table_path, reconnect_window,
+                             turn_time))
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        print("supervisor stopped")
 
 
 if __name__ == '__main__':
-    asyncio.run(run_server())
+    args = parse_args()
+    webserver_address = (WEBSERVER_HOST, args.webserver_port)
+    if args.workers > 0:
+        run_supervisor(args.workers, args.port, args.ai_pool_size, args.ai_budget_ms, args.ai_max_iterations,
+                       args.max_sessions, args.metrics_port, webserver_address, args.game_log_dir,
+                       args.position_table, args.reconnect_window, args.turn_time)
+    else:
+        asyncio.run(run_server(args.ai_pool_size, args.ai_budget_ms, args.ai_max_iterations, args.max_sessions,
+                               args.port, metrics_port=args.metrics_port, webserver_address=webserver_address,
+                               game_log_dir=args.game_log_dir, position_table_path=args.position_table,
+                               reconnect_window=args.reconnect_window, turn_time=args.turn_time))
 
 
 def test_tic_toc_toe():
@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from server.batch_tic_toc_toe import NO_MOVE, replay_games, simulate_random_games
+from server.tic_toc_toe import TicTocToe
+
+BOARD_OPTIONS = [(3, 3, 2000), (7, 4, 500), (15, 5, 200)]
+
+
+def play_through_reference(moves, board_size: int, win_length: int) -> TicTocToe:
+    reference = TicTocToe("a", "b", board_size, win_length)
+    for cell in moves:
+        if cell == NO_MOVE:
+            break
+        reference.place_mark("a" if reference.current_user == 1 else "b", *divmod(int(cell), board_size))
+    return reference
+
+
+@pytest.mark.parametrize("board_size, win_length, games", BOARD_OPTIONS)
+def test_simulated_games_agree_with_tic_toc_toe(board_size, win_length, games):
+    checked = 0
+    for chunk in simulate_random_games(games, 128, board_size, win_length, seed=board_size):
+        for index in range(len(chunk)):
+            reference = play_through_reference(chunk.moves[index], board_size, win_length)
+            assert reference.has_game_finished()
+            assert (int(chunk.winners[index]), int(chunk.move_counts[index])) == \
+                (reference.winner, reference.marks_placed)
+        checked += len(chunk)
+    assert checked == games
+
+
+@pytest.mark.parametrize("board_size, win_length, games", BOARD_OPTIONS)
+def test_replayed_games_agree_with_simulated_games(board_size, win_length, games):
+    for chunk in simulate_random_games(games, 128, board_size, win_length, seed=board_size + 1):
+        replayed = replay_games(chunk.moves, board_size, win_length)
+        np.testing.assert_array_equal(replayed.winner, chunk.winners)
+        np.testing.assert_array_equal(replayed.marks_placed, chunk.move_counts)
+        np.testing.assert_array_equal(replayed.detect_winners(), chunk.winners)
+
+
+def test_illegal_and_late_moves_are_skipped():
+    replayed = replay_games(np.array([[0, 0, 3, 1, 4, 2, 5, 8]], dtype=np.uint8), 3, 3)
+    # the second 0 is refused, so the same player moves again; the game is over before 5 and 8
+    reference = play_through_reference([0, 3, 1, 4, 2], 3, 3)
+    assert int(replayed.winner[0]) == reference.winner == 1
+    assert int(replayed.marks_placed[0]) == reference.marks_placed == 5
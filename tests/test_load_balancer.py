@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+
+from webserver import load_balancer
+from webserver.load_balancer import LoadBalancer
+
+SERVER = ("127.0.0.1", 10000)
+
+
+class LoadBalancerTest(unittest.TestCase):
+    def setUp(self):
+        self.balancer = LoadBalancer()
+        self.balancer.add(SERVER)
+        self.balancer.update(SERVER, capacity=2, active_games=0)
+
+    def test_reports_do_not_erase_reservations_in_flight(self):
+        self.assertEqual(self.balancer.reserve(), SERVER)
+        self.assertEqual(self.balancer.reserve(), SERVER)
+        # the server has not opened either game yet, so its own count is still 0
+        self.balancer.update(SERVER, capacity=2, active_games=0)
+        self.assertIsNone(self.balancer.reserve())
+
+    def test_opened_games_turn_reservations_into_active_games(self):
+        self.balancer.reserve()
+        self.balancer.reserve()
+        self.balancer.confirm(SERVER)
+        self.balancer.update(SERVER, capacity=2, active_games=1)
+        self.assertIsNone(self.balancer.reserve())
+        self.balancer.confirm(SERVER)
+        self.balancer.update(SERVER, capacity=2, active_games=1)
+        self.assertEqual(self.balancer.reserve(), SERVER)
+
+    def test_released_reservations_free_their_slot(self):
+        self.balancer.reserve()
+        self.balancer.reserve()
+        self.balancer.release(SERVER)
+        self.assertEqual(self.balancer.reserve(), SERVER)
+
+    def test_reservations_that_never_open_a_game_expire(self):
+        self.balancer.reserve()
+        self.balancer.reserve()
+        later = load_balancer.time.monotonic() + load_balancer.RESERVATION_TIMEOUT + 1
+        with mock.patch.object(load_balancer.time, "monotonic", return_value=later):
+            self.balancer.update(SERVER, capacity=2, active_games=0)
+        self.assertEqual(self.balancer.reserve(), SERVER)
+
+
+if __name__ == '__main__':
+    unittest.main()
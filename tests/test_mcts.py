@@ -0,0 +1,29 @@
+import unittest
+
+from server import mcts
+
+BOARD_SIZE = 7
+WIN_LENGTH = 4
+
+
+class SearchTest(unittest.TestCase):
+    def test_search_without_playouts_returns_a_legal_move(self):
+        cells = bytearray(BOARD_SIZE * BOARD_SIZE)
+        cells[24] = 1
+        for budget_ms, max_iterations in ((1000, 0), (0, 10)):
+            move, subtree, iterations = mcts.search(bytes(cells), BOARD_SIZE, WIN_LENGTH, 2, None, budget_ms,
+                                                    max_iterations, seed=0)
+            self.assertEqual(iterations, 0)
+            self.assertEqual(cells[move], 0)
+            self.assertEqual(subtree.player_just_moved, 2)
+
+    def test_search_returns_the_most_visited_move(self):
+        cells = bytes(BOARD_SIZE * BOARD_SIZE)
+        move, subtree, iterations = mcts.search(cells, BOARD_SIZE, WIN_LENGTH, 1, None, 1000, 200, seed=0)
+        self.assertEqual(iterations, 200)
+        self.assertEqual(cells[move], 0)
+        self.assertGreater(subtree.visits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import random
+import unittest
+
+from server.bitboard_tic_toc_toe import BitboardTicTocToe
+from server.tic_toc_toe import TicTocToe
+from tests import reference_tic_toc_toe
+
+GAMES = 20000
+
+
+def apply(game, user: str, row: int, col: int) -> bool:
+    try:
+        game.place_mark(user, row, col)
+        return True
+    except Exception:
+        return False
+
+
+def state(game) -> tuple:
+    return game.board, game.winner, game.current_user, game.has_game_finished()
+
+
+class DifferentialTest(unittest.TestCase):
+    def assert_agrees_with_reference(self, engine_class, seed: int):
+        # mostly moves by the player on turn to a cell on the board, so games run to a win or a full board;
+        # the rest are random users and coordinates, so out-of-range and out-of-turn moves are exercised too
+        rng = random.Random(seed)
+        for game_index in range(GAMES):
+            reference = reference_tic_toc_toe.TicTocToe("a", "b")
+            candidate = engine_class("a", "b")
+            for _ in range(rng.randint(1, 30)):
+                if rng.random() < 0.75:
+                    user = "a" if reference.current_user == 1 else "b"
+                    row, col = rng.randint(0, 2), rng.randint(0, 2)
+                else:
+                    user = rng.choice(("a", "b"))
+                    row, col = rng.randint(-1, 3), rng.randint(-1, 3)
+                accepted = apply(reference, user, row, col)
+                self.assertEqual(apply(candidate, user, row, col), accepted,
+                                 f"game {game_index}: place_mark({user}, {row}, {col})")
+                self.assertEqual(state(candidate), state(reference), f"game {game_index}")
+
+    def test_tic_toc_toe_agrees_with_reference(self):
+        self.assert_agrees_with_reference(TicTocToe, seed=0)
+
+    def test_bitboard_tic_toc_toe_agrees_with_reference(self):
+        self.assert_agrees_with_reference(BitboardTicTocToe, seed=1)
+
+    def test_unknown_user_is_refused(self):
+        for engine_class in (TicTocToe, BitboardTicTocToe):
+            game = engine_class("a", "b")
+            self.assertFalse(apply(game, "c", 0, 0))
+            self.assertEqual(state(game), state(reference_tic_toc_toe.TicTocToe("a", "b")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+
+from timer_wheel import TimerWheel
+
+
+class FakeHandle:
+    def __init__(self, when: float, callback, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeLoop:
+    def __init__(self):
+        self.now = 0.0
+        self.handles: list[FakeHandle] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def call_at(self, when: float, callback, *args) -> FakeHandle:
+        handle = FakeHandle(when, callback, args)
+        self.handles.append(handle)
+        return handle
+
+    def call_exception_handler(self, context: dict):
+        raise context["exception"]
+
+    @property
+    def armed(self) -> list[FakeHandle]:
+        return [handle for handle in self.handles if not handle.cancelled]
+
+    def run_until(self, deadline: float) -> int:
+        runs = 0
+        while True:
+            due = [handle for handle in self.armed if handle.when <= deadline]
+            if not due:
+                break
+            handle = min(due, key=lambda x: x.when)
+            self.handles.remove(handle)
+            self.now = max(self.now, handle.when)
+            handle.callback(*handle.args)
+            runs += 1
+        self.now = deadline
+        return runs
+
+
+class TimerWheelTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = FakeLoop()
+        self.fired: list[tuple[str, float]] = []
+
+    def record(self, name: str):
+        self.fired.append((name, self.loop.now))
+
+    def test_fires_in_expiry_order_and_never_early(self):
+        wheel = TimerWheel(tick=0.1, slots=8, levels=2, loop=self.loop)
+        delays = {"c": 0.75, "a": 0.15, "d": 3.0, "b": 0.4}
+        for name, delay in delays.items():
+            wheel.call_later(delay, self.record, name)
+        self.loop.run_until(10)
+        self.assertEqual([name for name, _ in self.fired], ["a", "b", "c", "d"])
+        for name, fired_at in self.fired:
+            self.assertGreaterEqual(fired_at, delays[name] - 1e-9)
+            self.assertLess(fired_at, delays[name] + wheel.tick + 1e-9)
+        self.assertEqual(len(wheel), 0)
+
+    def test_cancelled_timers_do_not_fire(self):
+        wheel = TimerWheel(tick=0.1, slots=8, levels=2, loop=self.loop)
+        kept = wheel.call_later(0.5, self.record, "kept")
+        cancelled = wheel.call_later(0.5, self.record, "cancelled")
+        far = wheel.call_later(5, self.record, "far")
+        cancelled.cancel()
+        far.cancel()
+        cancelled.cancel()
+        self.assertEqual(len(wheel), 1)
+        self.loop.run_until(10)
+        self.assertEqual([name for name, _ in self.fired], ["kept"])
+        self.assertFalse(kept.active)
+
+    def test_cancel_from_a_callback_in_the_same_slot(self):
+        wheel = TimerWheel(tick=0.1, slots=8, levels=2, loop=self.loop)
+        timers = {}
+        timers["first"] = wheel.call_later(0.3, lambda: timers["second"].cancel())
+        timers["second"] = wheel.call_later(0.3, self.record, "second")
+        self.loop.run_until(1)
+        self.assertEqual(self.fired, [])
+        self.assertEqual(len(wheel), 0)
+
+    def test_cascades_through_every_level_and_overflow(self):
+        wheel = TimerWheel(tick=0.01, slots=4, levels=3, loop=self.loop)
+        # 4 slots per level: level 0 covers 4 ticks, level 1 16, level 2 64, anything further overflows
+        delays = [0.02, 0.05, 0.13, 0.31, 0.63, 0.64, 1.7, 4.0]
+        for delay in delays:
+            wheel.call_later(delay, self.record, str(delay))
+        self.loop.run_until(5)
+        self.assertEqual([float(name) for name, _ in self.fired], delays)
+        for name, fired_at in self.fired:
+            self.assertGreaterEqual(fired_at, float(name) - 1e-9)
+            self.assertLess(fired_at, float(name) + wheel.tick + 1e-9)
+
+    def test_rearming_from_a_callback_keeps_a_single_tick_chain(self):
+        wheel = TimerWheel(tick=0.01, slots=8, levels=2, loop=self.loop)
+        count = 0
+
+        def rearm():
+            nonlocal count
+            count += 1
+            wheel.call_later(0.01, rearm)
+
+        wheel.call_later(0.01, rearm)
+        for step in range(1, 151):
+            self.loop.run_until(step * 0.01)
+            self.assertLessEqual(len(self.loop.armed), 1)
+        self.assertGreaterEqual(count, 70)
+        self.assertLessEqual(count, 150)
+
+    def test_idle_wheel_stops_ticking_and_restarts_on_time(self):
+        wheel = TimerWheel(tick=0.1, slots=8, levels=2, loop=self.loop)
+        wheel.call_later(0.2, self.record, "first")
+        self.loop.run_until(1)
+        self.assertEqual(self.loop.armed, [])
+        self.loop.run_until(50)
+        wheel.call_later(0.3, self.record, "second")
+        self.loop.run_until(60)
+        name, fired_at = self.fired[-1]
+        self.assertEqual(name, "second")
+        self.assertGreaterEqual(fired_at, 50.3 - 1e-9)
+        self.assertLess(fired_at, 50.3 + wheel.tick + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
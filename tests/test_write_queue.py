@@ -0,0 +1,36 @@
+import asyncio
+import socket
+import unittest
+
+from transport.tcp_client import BaseTCPClient, SocketClosedException
+
+FRAME = b"x" * 64 * 1024
+
+
+class WriteQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.local, self.remote = socket.socketpair()
+        self.remote.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.tcp_client = BaseTCPClient(self.local)
+        await self.tcp_client.attach()
+        self.tcp_client.protocol.transport.set_write_buffer_limits(high=0)
+
+    async def asyncTearDown(self):
+        self.tcp_client.close()
+        self.remote.close()
+
+    async def test_send_blocked_at_high_water_raises_when_the_connection_closes(self):
+        write_queue = self.tcp_client.write_queue
+        # the writer keeps handing frames to the transport until the peer stops reading and it pauses
+        while write_queue.try_put(FRAME):
+            await asyncio.sleep(0)
+        sending = asyncio.create_task(self.tcp_client.send_bytes(FRAME))
+        while not write_queue.producer_waiters:
+            await asyncio.sleep(0.01)
+        self.tcp_client.close()
+        with self.assertRaises(SocketClosedException):
+            await asyncio.wait_for(sending, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
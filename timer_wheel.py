@@ -0,0 +1,134 @@
+import asyncio
+import math
+
+DEFAULT_TICK = 0.1
+DEFAULT_SLOTS = 256
+DEFAULT_LEVELS = 4
+TICK_TOLERANCE = 1e-6
+
+
+def resolve_future(future: asyncio.Future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+class WheelTimer:
+    __slots__ = ("wheel", "expiry", "callback", "args", "bucket")
+
+    def __init__(self, wheel: "TimerWheel", expiry: int, callback, args: tuple):
+        self.wheel = wheel
+        self.expiry = expiry
+        self.callback = callback
+        self.args = args
+        self.bucket: dict | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.bucket is not None
+
+    def when(self) -> float:
+        return self.wheel.origin + self.expiry * self.wheel.tick
+
+    def cancel(self):
+        bucket = self.bucket
+        if bucket is not None:
+            del bucket[self]
+            self.bucket = None
+            self.wheel.pending -= 1
+
+
+class TimerWheel:
+    def __init__(self, tick: float = DEFAULT_TICK, slots: int = DEFAULT_SLOTS, levels: int = DEFAULT_LEVELS,
+                 loop: asyncio.AbstractEventLoop | None = None):
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError(f"slots must be a power of two, got {slots}")
+        self.tick = tick
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.levels = levels
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self.time = self.loop.time
+        self.origin = self.loop.time()
+        self.current = 0
+        self.wheels: list[list[dict[WheelTimer, None]]] = [[dict() for _ in range(slots)] for _ in range(levels)]
+        self.overflow: dict[WheelTimer, None] = dict()
+        self.pending = 0
+        self.handle: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        return self.pending
+
+    def call_later(self, delay: float, callback, *args) -> WheelTimer:
+        elapsed = (self.time() - self.origin) / self.tick
+        if self.pending == 0 and elapsed >= self.current + 1:
+            self.current = int(elapsed)
+        expiry = math.ceil(elapsed + delay / self.tick)
+        if expiry <= self.current:
+            expiry = self.current + 1
+        timer = WheelTimer(self, expiry, callback, args)
+        self._insert(timer)
+        self.pending += 1
+        if self.handle is None:
+            self.handle = self.loop.call_at(self.origin + (self.current + 1) * self.tick, self._advance)
+        return timer
+
+    def _insert(self, timer: WheelTimer):
+        expiry = timer.expiry
+        level = max((expiry ^ self.current).bit_length() - 1, 0) // self.bits
+        if level < self.levels:
+            bucket = self.wheels[level][(expiry >> (self.bits * level)) & self.mask]
+        else:
+            bucket = self.overflow
+        bucket[timer] = None
+        timer.bucket = bucket
+
+    def _cascade(self):
+        current = self.current
+        # a tick on a level boundary redistributes that level's slot, highest level first so timers
+        # moving down two levels land in a lower slot before it is redistributed too
+        top = min(((current & -current).bit_length() - 1) // self.bits, self.levels)
+        for level in range(top, 0, -1):
+            if level == self.levels:
+                bucket, self.overflow = self.overflow, dict()
+            else:
+                slots = self.wheels[level]
+                index = (current >> (self.bits * level)) & self.mask
+                bucket, slots[index] = slots[index], dict()
+            for timer in bucket:
+                self._insert(timer)
+
+    def _advance(self):
+        self.handle = None
+        # called exactly at origin + n * tick, the division can land just below n in floating point
+        target = int((self.loop.time() - self.origin) / self.tick + TICK_TOLERANCE)
+        while self.current < target and self.pending:
+            self.current += 1
+            self._cascade()
+            slots = self.wheels[0]
+            index = self.current & self.mask
+            bucket = slots[index]
+            if not bucket:
+                continue
+            slots[index] = dict()
+            for timer in list(bucket):
+                if timer.bucket is not bucket:
+                    continue
+                timer.bucket = None
+                self.pending -= 1
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    self.loop.call_exception_handler({
+                        "message": f"timer callback {timer.callback!r} failed",
+                        "exception": e
+                    })
+        if not self.pending:
+            self.current = max(self.current, target)
+        elif self.handle is None:
+            # a callback that scheduled a timer has already armed the next tick
+            self.handle = self.loop.call_at(self.origin + (self.current + 1) * self.tick, self._advance)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
@@ -0,0 +1,67 @@
+import asyncio
+
+from metrics import record_frame
+from transport.codec import JSON_CODEC
+from transport.tcp_client import BaseTCPClient, SocketClosedException, DROPPABLE_MESSAGE_TYPES, encode_frame
+
+BROADCAST_TIMEOUT = 5
+
+
+class BroadcastMessage:
+    def __init__(self, content: dict):
+        self.content = content
+        self.droppable = content.get("type") in DROPPABLE_MESSAGE_TYPES
+        self.finished = content.get("game_status") == "finished"
+        self.json_content: bytes | None = None
+        self.encoded_by_view: dict[tuple, tuple[bytes, object]] = dict()
+
+    def encode(self, codec=JSON_CODEC, personal: dict | None = None, stream_id: int | None = None) -> bytes:
+        view = (codec.name, tuple(personal.items()) if personal else ())
+        encoded = self.encoded_by_view.get(view)
+        if encoded is None:
+            encoded = self._encode_content(codec, personal)
+            self.encoded_by_view[view] = encoded
+        encoded_content, used_codec = encoded
+        return encode_frame(encoded_content, used_codec, self.finished, stream_id)
+
+    def _encode_content(self, codec, personal: dict | None) -> tuple[bytes, object]:
+        if codec is not JSON_CODEC:
+            encoded_content = codec.encode({**self.content, **personal} if personal else self.content)
+            if encoded_content is not None:
+                return encoded_content, codec
+        if self.json_content is None:
+            self.json_content = JSON_CODEC.encode(self.content)
+        if not personal:
+            return self.json_content, JSON_CODEC
+        return self.json_content[:-1] + b"," + JSON_CODEC.encode(personal)[1:], JSON_CODEC
+
+
+async def _send_with_timeout(tcp_client: BaseTCPClient, data: bytes, droppable: bool, timeout: float):
+    async with asyncio.timeout(timeout):
+        await tcp_client.send_bytes(data, droppable)
+
+
+async def broadcast(message: BroadcastMessage, recipients: dict[str, BaseTCPClient],
+                    personal_by_username: dict[str, dict] | None = None,
+                    timeout: float = BROADCAST_TIMEOUT) -> list[str]:
+    message_type = message.content.get("type")
+    blocked = []
+    for username, tcp_client in recipients.items():
+        personal = personal_by_username.get(username) if personal_by_username else None
+        data = message.encode(tcp_client.codec, personal, tcp_client.stream_id)
+        record_frame("out", message_type, len(data))
+        if not tcp_client.try_send_bytes(data, message.droppable):
+            blocked.append((username, tcp_client, data))
+    if not blocked:
+        return []
+
+    results = await asyncio.gather(
+        *[_send_with_timeout(tcp_client, data, message.droppable, timeout) for _, tcp_client, data in blocked],
+        return_exceptions=True)
+    failed = []
+    for (username, _, _), result in zip(blocked, results):
+        if isinstance(result, (SocketClosedException, TimeoutError)):
+            failed.append(username)
+        elif isinstance(result, BaseException):
+            raise result
+    return failed
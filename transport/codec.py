@@ -0,0 +1,261 @@
+import struct
+
+from utils import json_encode, json_decode
+
+U8 = struct.Struct(">B")
+U16 = struct.Struct(">H")
+
+
+class JsonCodec:
+    name = "json"
+
+    def encode(self, content) -> bytes | None:
+        return json_encode(content, encoding='utf-8')
+
+    def decode(self, raw_content) -> dict:
+        return json_decode(raw_content, encoding='utf-8')
+
+
+class Field:
+    def __init__(self, name: str, optional: bool = False):
+        self.name = name
+        self.optional = optional
+
+    def accepts(self, value) -> bool:
+        raise NotImplementedError
+
+    def pack(self, value, parts: list):
+        raise NotImplementedError
+
+    def unpack(self, data, offset: int) -> tuple:
+        raise NotImplementedError
+
+
+class UInt8Field(Field):
+    def accepts(self, value) -> bool:
+        return type(value) is int and 0 <= value <= 0xFF
+
+    def pack(self, value, parts: list):
+        parts.append(U8.pack(value))
+
+    def unpack(self, data, offset: int) -> tuple:
+        return data[offset], offset + 1
+
+
+class UInt16Field(Field):
+    def accepts(self, value) -> bool:
+        return type(value) is int and 0 <= value <= 0xFFFF
+
+    def pack(self, value, parts: list):
+        parts.append(U16.pack(value))
+
+    def unpack(self, data, offset: int) -> tuple:
+        return U16.unpack_from(data, offset)[0], offset + U16.size
+
+
+class StringField(Field):
+    def accepts(self, value) -> bool:
+        return type(value) is str and len(value) <= 0x3FFF
+
+    def pack(self, value, parts: list):
+        encoded = value.encode('utf-8')
+        parts.append(U16.pack(len(encoded)))
+        parts.append(encoded)
+
+    def unpack(self, data, offset: int) -> tuple:
+        length, = U16.unpack_from(data, offset)
+        offset += U16.size
+        return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+
+class EnumField(Field):
+    def __init__(self, name: str, values: tuple, optional: bool = False):
+        super().__init__(name, optional)
+        self.values = values
+        self.index_by_value = {value: index for index, value in enumerate(values)}
+
+    def accepts(self, value) -> bool:
+        return value in self.index_by_value
+
+    def pack(self, value, parts: list):
+        parts.append(U8.pack(self.index_by_value[value]))
+
+    def unpack(self, data, offset: int) -> tuple:
+        return self.values[data[offset]], offset + 1
+
+
+class BoardField(Field):
+    def accepts(self, value) -> bool:
+        if type(value) is not list or not 0 < len(value) <= 0xFF:
+            return False
+        size = len(value[0])
+        return all(type(row) is list and len(row) == size for row in value) and size <= 0xFF
+
+    def pack(self, value, parts: list):
+        parts.append(bytes((len(value), len(value[0]))))
+        for row in value:
+            parts.append(bytes(row))
+
+    def unpack(self, data, offset: int) -> tuple:
+        rows, cols = data[offset], data[offset + 1]
+        offset += 2
+        board = []
+        for _ in range(rows):
+            board.append(list(data[offset:offset + cols]))
+            offset += cols
+        return board, offset
+
+
+class MessageSchema:
+    def __init__(self, type_id: int, message_type: str, fields: tuple[Field, ...]):
+        self.type_id = type_id
+        self.message_type = message_type
+        self.fields = fields
+        self.required_keys = frozenset(["type"] + [field.name for field in fields if not field.optional])
+        self.all_keys = frozenset(["type"] + [field.name for field in fields])
+
+
+GAME_STATUS_VALUES = ("running", "finished")
+
+MESSAGE_SCHEMAS = (
+    MessageSchema(1, "place_mark", (StringField("username"), UInt8Field("row"), UInt8Field("col"))),
+    MessageSchema(2, "show_game_status", (
+        EnumField("game_status", GAME_STATUS_VALUES),
+        BoardField("game_board"),
+        UInt8Field("your_mark"),
+        UInt8Field("opponent_mark"),
+        UInt8Field("current_user"),
+        UInt8Field("winner", optional=True),
+        UInt16Field("seq", optional=True),
+    )),
+    MessageSchema(3, "server_capacity", (UInt16Field("capacity"), UInt16Field("active_games"))),
+    MessageSchema(4, "multi_game_waiting", (
+        StringField("game_id"),
+        UInt8Field("board_size"),
+        UInt8Field("win_length"),
+    )),
+    MessageSchema(5, "put_to_waiting", (StringField("username"), StringField("game_id"))),
+    MessageSchema(6, "server_assigned", (StringField("game_type"),)),
+    MessageSchema(7, "chat", (StringField("text_message"), StringField("username", optional=True))),
+    MessageSchema(8, "opponent_escaped", (EnumField("game_status", GAME_STATUS_VALUES),)),
+    MessageSchema(9, "game_changed", (EnumField("game_status", GAME_STATUS_VALUES),)),
+    MessageSchema(10, "change_game", (StringField("username"),)),
+    MessageSchema(11, "game_closed", (StringField("game_id"),)),
+    MessageSchema(12, "load_report", (
+        UInt16Field("active_games"),
+        UInt16Field("capacity"),
+        UInt16Field("connected_clients"),
+        UInt16Field("loop_lag_ms"),
+        UInt16Field("ai_pending"),
+    )),
+    MessageSchema(13, "game_delta", (
+        UInt16Field("seq"),
+        UInt8Field("row"),
+        UInt8Field("col"),
+        UInt8Field("mark"),
+        UInt8Field("current_user"),
+        EnumField("game_status", GAME_STATUS_VALUES),
+        UInt8Field("winner", optional=True),
+    )),
+    MessageSchema(14, "resync", (StringField("username"), UInt16Field("seq"))),
+    MessageSchema(15, "session_token", (StringField("game_id"), StringField("resume_token"))),
+    MessageSchema(16, "game_opened", (StringField("game_id"),)),
+    MessageSchema(17, "game_not_found", (StringField("game_id"),)),
+    MessageSchema(18, "stop_watching", (StringField("username"),)),
+)
+
+
+class BinaryCodec:
+    name = "binary"
+
+    def __init__(self, schemas: tuple[MessageSchema, ...] = MESSAGE_SCHEMAS):
+        self.schema_by_type = {schema.message_type: schema for schema in schemas}
+        self.schema_by_id = {schema.type_id: schema for schema in schemas}
+
+    def encode(self, content) -> bytes | None:
+        if type(content) is not dict:
+            return None
+        schema = self.schema_by_type.get(content.get("type"))
+        if schema is None:
+            return None
+        keys = content.keys()
+        if not schema.required_keys <= keys <= schema.all_keys:
+            return None
+
+        presence = 0
+        parts = [b""]
+        try:
+            for index, field in enumerate(schema.fields):
+                if field.name not in content:
+                    continue
+                value = content[field.name]
+                if not field.accepts(value):
+                    return None
+                presence |= 1 << index
+                field.pack(value, parts)
+        except (ValueError, TypeError, struct.error):
+            return None
+        parts[0] = bytes((schema.type_id, presence))
+        return b"".join(parts)
+
+    def decode(self, raw_content) -> dict:
+        schema = self.schema_by_id[raw_content[0]]
+        presence = raw_content[1]
+        content = {"type": schema.message_type}
+        offset = 2
+        for index, field in enumerate(schema.fields):
+            if presence & (1 << index):
+                content[field.name], offset = field.unpack(raw_content, offset)
+        return content
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+
+CODECS = {codec.name: codec for codec in (BINARY_CODEC, JSON_CODEC)}
+SUPPORTED_CODECS = list(CODECS)
+
+
+def negotiate_codec(offered_codecs: list[str] | None):
+    for codec_name in offered_codecs or []:
+        if codec_name in CODECS:
+            return CODECS[codec_name]
+    return JSON_CODEC
+
+
+JSON_TYPE_PREFIX = b'{"type": "'
+JSON_TYPE_OFFSET = len(JSON_TYPE_PREFIX)
+UNSCHEMATIZED_MESSAGE_TYPES = ("start_game", "watch_game", "handshake", "cancel_game", "abort_game", "reconnect",
+                               "server_crashed", "server_full")
+message_type_names: dict[bytes, str] = {
+    name.encode('utf-8'): name
+    for name in [schema.message_type for schema in MESSAGE_SCHEMAS] + list(UNSCHEMATIZED_MESSAGE_TYPES)
+}
+
+
+binary_message_type_names: dict[int, str] = {schema.type_id: schema.message_type for schema in MESSAGE_SCHEMAS}
+
+
+def relayed_message_type(json_header: dict, data: bytes, offset: int = 0) -> str:
+    # binary frames name their schema in the first content byte; JSON frames that are relayed undecoded are not
+    # scanned for their type, the end that decodes them counts them by type
+    if "content-type" not in json_header:
+        return "relayed"
+    if len(data) <= offset:
+        return "empty"
+    return binary_message_type_names.get(data[offset], "unknown")
+
+
+def peek_message_type(json_header: dict, data: bytes, offset: int = 0) -> str:
+    if len(data) <= offset:
+        return "empty"
+    if "content-type" in json_header:
+        schema = BINARY_CODEC.schema_by_id.get(data[offset])
+        return schema.message_type if schema is not None else "unknown"
+    if not data.startswith(JSON_TYPE_PREFIX, offset):
+        return "unknown"
+    start = offset + JSON_TYPE_OFFSET
+    end = data.find(b'"', start, start + 64)
+    if end < 0:
+        return "unknown"
+    return message_type_names.get(data[start:end], "other")
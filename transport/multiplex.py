@@ -0,0 +1,172 @@
+import asyncio
+import struct
+
+from metrics import record_frame
+from transport.codec import CODECS, JSON_CODEC
+from transport.protocol import Frame, FramedProtocol
+from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException, DROPPABLE_MESSAGE_TYPES
+from utils import json_encode
+
+STREAM_HEADER = "stream"
+STREAM_CLOSE_HEADER = "stream-close"
+MAX_STREAM_FRAMES = FramedProtocol.MAX_QUEUED_FRAMES
+
+
+def is_multiplexed_frame(frame: Frame) -> bool:
+    return STREAM_HEADER in frame.json_header
+
+
+def reframe(frame: Frame, stream_id: int) -> bytes:
+    json_header = dict(frame.json_header)
+    json_header[STREAM_HEADER] = stream_id
+    json_header_bytes = json_encode(json_header, 'utf-8')
+    return struct.pack(">H", len(json_header_bytes)) + json_header_bytes + frame.content
+
+
+def close_frame(stream_id: int) -> bytes:
+    json_header_bytes = b'{"content-length":0,"%s":%d,"%s":true}' % (
+        STREAM_HEADER.encode('utf-8'), stream_id, STREAM_CLOSE_HEADER.encode('utf-8'))
+    return struct.pack(">H", len(json_header_bytes)) + json_header_bytes
+
+
+class StreamClient:
+    def __init__(self, connection: "MultiplexedConnection", stream_id: int):
+        self.connection = connection
+        self.stream_id = stream_id
+        self.codec = JSON_CODEC
+        self.frames: asyncio.Queue[Frame | None] = asyncio.Queue()
+        self.closed = False
+
+    @property
+    def write_queue(self):
+        return self.connection.tcp_client.write_queue
+
+    async def send(self, message: BaseMessage):
+        message_type = message.content.get("type")
+        data = message.encode(self.codec, self.stream_id)
+        record_frame("out", message_type, len(data))
+        await self.send_bytes(data, message_type in DROPPABLE_MESSAGE_TYPES)
+
+    async def send_frame(self, frame: Frame):
+        data = reframe(frame, self.stream_id)
+        record_frame("out", frame.relayed_type, len(data))
+        await self.send_bytes(data)
+
+    async def send_bytes(self, data: bytes, droppable: bool = False):
+        if self.closed:
+            raise SocketClosedException("stream is not open. happened in send")
+        await self.connection.tcp_client.send_bytes(data, droppable)
+
+    def try_send_bytes(self, data: bytes, droppable: bool = False) -> bool:
+        return not self.closed and self.connection.tcp_client.try_send_bytes(data, droppable)
+
+    async def receive(self) -> BaseMessage:
+        frame = await self.read_frame()
+        content_type = frame.json_header.get("content-type")
+        if content_type is not None and self.codec is JSON_CODEC:
+            self.codec = CODECS[content_type]
+        message = BaseMessage.decode(frame.json_header, frame.content)
+        record_frame("in", message.content.get("type"), len(frame.data))
+        return message
+
+    async def receive_frame(self) -> Frame:
+        frame = await self.read_frame()
+        record_frame("in", frame.relayed_type, len(frame.data))
+        return frame
+
+    async def read_frame(self) -> Frame:
+        if self.closed and self.frames.empty():
+            raise SocketClosedException("stream is not open. happened in receive")
+        frame = await self.frames.get()
+        if frame is None:
+            raise SocketClosedException("stream is not open. happened in receive")
+        return frame
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.connection.close_stream(self)
+
+    def remote_closed(self):
+        self.closed = True
+        self.frames.put_nowait(None)
+
+
+class MultiplexedConnection:
+    def __init__(self, tcp_client: BaseTCPClient, on_stream=None):
+        self.tcp_client = tcp_client
+        self.on_stream = on_stream
+        self.loop = asyncio.get_event_loop()
+        self.streams: dict[int, StreamClient] = dict()
+        self.next_stream_id = 1
+        self.highest_remote_stream_id = 0
+        self.reader_task: asyncio.Task | None = None
+        self.closed = False
+
+    def start(self):
+        if self.reader_task is None:
+            self.reader_task = self.loop.create_task(self._read_frames())
+
+    def open_stream(self) -> StreamClient:
+        stream = StreamClient(self, self.next_stream_id)
+        self.next_stream_id += 1
+        self.streams[stream.stream_id] = stream
+        return stream
+
+    def close_stream(self, stream: StreamClient):
+        if self.streams.pop(stream.stream_id, None) is None or self.closed:
+            return
+        self.loop.create_task(self._send_close(stream.stream_id))
+
+    async def _send_close(self, stream_id: int):
+        try:
+            await self.tcp_client.send_bytes(close_frame(stream_id))
+        except SocketClosedException:
+            pass
+
+    def dispatch(self, frame: Frame):
+        stream_id = frame.json_header.get(STREAM_HEADER)
+        stream = self.streams.get(stream_id)
+        if frame.json_header.get(STREAM_CLOSE_HEADER):
+            if stream is not None:
+                del self.streams[stream_id]
+                stream.remote_closed()
+            return
+        if stream is None:
+            if self.on_stream is None or stream_id <= self.highest_remote_stream_id:
+                return
+            self.highest_remote_stream_id = stream_id
+            stream = StreamClient(self, stream_id)
+            self.streams[stream_id] = stream
+            self.on_stream(stream)
+        if stream.frames.qsize() >= MAX_STREAM_FRAMES:
+            # pausing the shared reader would stall every other stream behind this one, so a stream that
+            # stopped reading is closed rather than left to buffer without bound
+            print(f"closing stream {stream_id}: {MAX_STREAM_FRAMES} frames queued and not read")
+            stream.close()
+            stream.frames.put_nowait(None)
+            return
+        stream.frames.put_nowait(frame)
+
+    async def _read_frames(self):
+        try:
+            while True:
+                # frames are counted by the stream that reads them, where a decoded one is typed for free
+                frame = await self.tcp_client.read_frame()
+                if is_multiplexed_frame(frame):
+                    self.dispatch(frame)
+        except SocketClosedException:
+            pass
+        finally:
+            self.closed = True
+            streams, self.streams = self.streams, dict()
+            for stream in streams.values():
+                stream.remote_closed()
+            self.tcp_client.close()
+
+    def close(self):
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+        else:
+            self.tcp_client.close()
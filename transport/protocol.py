@@ -0,0 +1,155 @@
+import asyncio
+import collections
+import struct
+
+from metrics import OPEN_CONNECTIONS
+from transport.codec import peek_message_type, relayed_message_type
+from transport.write_queue import WriteQueue, SlowConsumerPolicy
+from utils import json_decode
+
+JSON_HEADER_LENGTH_STRUCT = struct.Struct(">H")
+
+
+class Frame:
+    __slots__ = ("json_header", "data", "content_offset")
+
+    def __init__(self, json_header: dict, data: bytes, content_offset: int):
+        self.json_header = json_header
+        self.data = data
+        self.content_offset = content_offset
+
+    @property
+    def content(self) -> memoryview:
+        return memoryview(self.data)[self.content_offset:]
+
+    @property
+    def message_type(self) -> str:
+        return peek_message_type(self.json_header, self.data, self.content_offset)
+
+    @property
+    def relayed_type(self) -> str:
+        return relayed_message_type(self.json_header, self.data, self.content_offset)
+
+
+class FramedProtocol(asyncio.BufferedProtocol):
+    INITIAL_BUFFER_SIZE = 64 * 1024
+    MIN_FREE_SPACE = 16 * 1024
+    MAX_QUEUED_FRAMES = 1024
+
+    def __init__(self, slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.BLOCK):
+        self.loop = asyncio.get_event_loop()
+        self.transport: asyncio.Transport | None = None
+        self.write_queue = WriteQueue(self, policy=slow_consumer_policy)
+        self.buffer = bytearray(self.INITIAL_BUFFER_SIZE)
+        self.start = 0
+        self.end = 0
+        self.pending_header: dict | None = None
+        self.pending_content_offset = 0
+        self.frames: collections.deque[Frame] = collections.deque()
+        self.read_waiter: asyncio.Future | None = None
+        self.reading_paused = False
+        self.write_paused = False
+        self.drain_waiters: list[asyncio.Future] = []
+        self.closed = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        OPEN_CONNECTIONS.inc()
+
+    def connection_lost(self, exc):
+        OPEN_CONNECTIONS.dec()
+        self.closed = True
+        self.write_queue.connection_lost()
+        self._wake(self.read_waiter)
+        self._wake_drain_waiters()
+
+    def pause_writing(self):
+        self.write_paused = True
+
+    def resume_writing(self):
+        self.write_paused = False
+        self._wake_drain_waiters()
+
+    def get_buffer(self, sizehint):
+        if len(self.buffer) - self.end < self.MIN_FREE_SPACE:
+            self._make_room()
+        return memoryview(self.buffer)[self.end:]
+
+    def buffer_updated(self, nbytes):
+        self.end += nbytes
+        self._parse_frames()
+
+    def _make_room(self):
+        used = self.end - self.start
+        if self.start > 0:
+            self.buffer[:used] = self.buffer[self.start:self.end]
+            self.start, self.end = 0, used
+        if len(self.buffer) - self.end < self.MIN_FREE_SPACE:
+            self.buffer.extend(bytes(len(self.buffer)))
+
+    def _parse_frames(self):
+        buffer = memoryview(self.buffer)
+        start, end = self.start, self.end
+        parsed = False
+        while end - start >= JSON_HEADER_LENGTH_STRUCT.size:
+            header = self.pending_header
+            if header is None:
+                header_length, = JSON_HEADER_LENGTH_STRUCT.unpack_from(buffer, start)
+                content_start = start + JSON_HEADER_LENGTH_STRUCT.size + header_length
+                if content_start > end:
+                    break
+                header = json_decode(buffer[start + JSON_HEADER_LENGTH_STRUCT.size:content_start], 'utf-8')
+            else:
+                content_start = start + self.pending_content_offset
+            frame_end = content_start + header['content-length']
+            if frame_end > end:
+                self.pending_header = header
+                self.pending_content_offset = content_start - start
+                break
+            self.pending_header = None
+            self.frames.append(Frame(header, buffer[start:frame_end].tobytes(), content_start - start))
+            start = frame_end
+            parsed = True
+
+        if start == end:
+            start = end = 0
+        self.start, self.end = start, end
+
+        if parsed:
+            self._wake(self.read_waiter)
+            if len(self.frames) >= self.MAX_QUEUED_FRAMES and not self.reading_paused:
+                self.reading_paused = True
+                self.transport.pause_reading()
+
+    async def read_frame(self) -> Frame | None:
+        while not self.frames:
+            if self.closed:
+                return None
+            waiter = self.read_waiter = self.loop.create_future()
+            try:
+                await waiter
+            finally:
+                if self.read_waiter is waiter:
+                    self.read_waiter = None
+
+        frame = self.frames.popleft()
+        if self.reading_paused and len(self.frames) < self.MAX_QUEUED_FRAMES // 2:
+            self.reading_paused = False
+            self.transport.resume_reading()
+        return frame
+
+    async def drain(self):
+        while self.write_paused and not self.closed:
+            waiter = self.loop.create_future()
+            self.drain_waiters.append(waiter)
+            await waiter
+
+    def _wake_drain_waiters(self):
+        waiters, self.drain_waiters = self.drain_waiters, []
+        for waiter in waiters:
+            self._wake(waiter)
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future | None):
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
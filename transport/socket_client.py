@@ -0,0 +1,52 @@
+import struct
+
+from transport.protocol import Frame
+from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException
+from utils import json_decode
+
+
+class SocketTCPClient(BaseTCPClient):
+    JSON_HEADER_LENGTH = 2
+
+    async def attach(self):
+        pass
+
+    async def send(self, message: BaseMessage):
+        print(f"trying to send message with content={message.content}")
+        message_bytes = message.encode(self.codec)
+        try:
+            await self.loop.sock_sendall(self.socket, message_bytes)
+        except OSError:
+            raise SocketClosedException("socket is not open. happened in send")
+        print(f"message sent")
+
+    async def send_frame(self, frame: Frame):
+        try:
+            await self.loop.sock_sendall(self.socket, frame.data)
+        except OSError:
+            raise SocketClosedException("socket is not open. happened in send_frame")
+
+    async def read_frame(self) -> Frame:
+        raw_header_length = await self._recv_exactly(SocketTCPClient.JSON_HEADER_LENGTH)
+        header_length = struct.unpack(">H", raw_header_length)[0]
+        raw_header = await self._recv_exactly(header_length)
+        json_header = json_decode(raw_header, 'utf-8')
+        raw_content = await self._recv_exactly(json_header['content-length'])
+        return Frame(json_header, raw_header_length + raw_header + raw_content,
+                     SocketTCPClient.JSON_HEADER_LENGTH + header_length)
+
+    async def _recv_exactly(self, length: int) -> bytes:
+        raw_data = await self.loop.sock_recv(self.socket, length)
+        while len(raw_data) < length:
+            if len(raw_data) == 0:
+                break
+            chunk = await self.loop.sock_recv(self.socket, length - len(raw_data))
+            if len(chunk) == 0:
+                break
+            raw_data += chunk
+        if len(raw_data) < length:
+            raise SocketClosedException("socket is not open. happened in receive")
+        return raw_data
+
+    def close(self):
+        self.socket.close()
@@ -2,7 +2,25 @@ import asyncio
 import socket
 import struct
 
-from utils import json_encode, json_decode
+from metrics import record_frame
+from transport.codec import CODECS, JSON_CODEC
+from transport.protocol import FramedProtocol, Frame
+from transport.write_queue import SlowConsumerPolicy, SlowConsumerException, QueueClosedException
+
+DROPPABLE_MESSAGE_TYPES = {"show_game_status"}
+
+
+def encode_frame(encoded_content: bytes, codec=JSON_CODEC, finished: bool = False, stream_id: int | None = None):
+    json_header_bytes = b'{"content-length":%d' % len(encoded_content)
+    if codec is not JSON_CODEC:
+        json_header_bytes += b',"content-type":"%s"' % codec.name.encode('utf-8')
+    if finished:
+        json_header_bytes += b',"game-status":"finished"'
+    if stream_id is not None:
+        json_header_bytes += b',"stream":%d' % stream_id
+    json_header_bytes += b'}'
+    json_header_length = struct.pack(">H", len(json_header_bytes))
+    return json_header_length + json_header_bytes + encoded_content
 
 
 class BaseMessage:
@@ -10,19 +28,19 @@ class BaseMessage:
         self.json_header: dict = {}
         self.content = content
 
-    def encode(self):
-        encoded_content = self._encode_content()
-
-        json_header = {
-            "content-length": len(encoded_content)
-        }
+    def encode(self, codec=JSON_CODEC, stream_id: int | None = None):
+        encoded_content = codec.encode(self.content)
+        if encoded_content is None:
+            codec = JSON_CODEC
+            encoded_content = codec.encode(self.content)
+        return encode_frame(encoded_content, codec, self.content.get("game_status") == "finished", stream_id)
 
-        json_header_bytes = json_encode(json_header, encoding='utf-8')
-        json_header_length = struct.pack(">H", len(json_header_bytes))
-        return json_header_length + json_header_bytes + encoded_content
-
-    def _encode_content(self) -> bytes:
-        return json_encode(self.content, encoding='utf-8')
+    @classmethod
+    def decode(cls, json_header: dict, raw_content: bytes | memoryview):
+        codec = CODECS[json_header.get("content-type", JSON_CODEC.name)]
+        message = cls(codec.decode(raw_content))
+        message.json_header = json_header
+        return message
 
 
 class SocketClosedException(Exception):
@@ -35,58 +53,84 @@ class SocketClosedException(Exception):
 
 
 class BaseTCPClient:
-    JSON_HEADER_LENGTH = 2
-
-    def __init__(self, sock: socket.socket = None, target_address: tuple = None):
+    def __init__(self, sock: socket.socket = None, target_address: tuple = None,
+                 slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.BLOCK):
         if sock is None:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         else:
             self.socket = sock
         self.target_address: tuple = target_address
         self.loop = asyncio.get_event_loop()
+        self.protocol: FramedProtocol | None = None
+        self.codec = JSON_CODEC
+        self.stream_id = None
+        self.slow_consumer_policy = slow_consumer_policy
+
+    async def attach(self):
+        if self.protocol is None:
+            self.socket.setblocking(False)
+            _, self.protocol = await self.loop.connect_accepted_socket(
+                lambda: FramedProtocol(self.slow_consumer_policy), self.socket)
+
+    @property
+    def write_queue(self):
+        return self.protocol.write_queue if self.protocol is not None else None
 
     async def send(self, message: BaseMessage):
-        print(f"trying to send message with content={message.content}")
-        message_bytes = message.encode()
-        try:
-            await self.loop.sock_sendall(self.socket, message_bytes)
-        except:
+        message_type = message.content.get("type")
+        data = message.encode(self.codec)
+        record_frame("out", message_type, len(data))
+        await self.send_bytes(data, message_type in DROPPABLE_MESSAGE_TYPES)
+
+    async def send_frame(self, frame: Frame):
+        record_frame("out", frame.relayed_type, len(frame.data))
+        await self.send_bytes(frame.data)
+
+    async def send_bytes(self, data: bytes, droppable: bool = False):
+        await self.attach()
+        if self.protocol.closed or self.protocol.transport.is_closing():
             raise SocketClosedException("socket is not open. happened in send")
-        print(f"message sent")
+        try:
+            await self.protocol.write_queue.put(data, droppable)
+        except SlowConsumerException:
+            raise SocketClosedException("slow consumer disconnected. happened in send")
+        except QueueClosedException:
+            raise SocketClosedException("socket closed while the frame waited for room. happened in send")
+
+    def try_send_bytes(self, data: bytes, droppable: bool = False) -> bool:
+        if self.protocol is None or self.protocol.closed or self.protocol.transport.is_closing():
+            return False
+        return self.protocol.write_queue.try_put(data, droppable)
 
     async def receive(self) -> BaseMessage:
-        header_length = await self.read_json_header_length()
-        json_header = await self.read_json_header(header_length)
-        content = await self.read_message_content(json_header)
-        return BaseMessage(content)
-
-    async def read_json_header_length(self) -> int:
-        raw_data = await self.loop.sock_recv(self.socket, BaseTCPClient.JSON_HEADER_LENGTH)
-        if len(raw_data) == 0:
+        frame = await self.read_frame()
+        message = self._decode_frame(frame.json_header, frame.content)
+        record_frame("in", message.content.get("type"), len(frame.data))
+        return message
+
+    async def receive_frame(self) -> Frame:
+        frame = await self.read_frame()
+        record_frame("in", frame.relayed_type, len(frame.data))
+        return frame
+
+    async def read_frame(self) -> Frame:
+        await self.attach()
+        frame = await self.protocol.read_frame()
+        if frame is None:
             raise SocketClosedException("socket is not open. happened in receive")
-        # print("read_json_header_length = ", raw_data)
-        return struct.unpack(">H", raw_data)[0]
-
-    async def read_json_header(self, header_length: int) -> dict:
-        raw_data = await self.loop.sock_recv(self.socket, header_length)
-        # print("read_json_header = ", raw_data)
-        json_header = json_decode(raw_data, 'utf-8')
-        # for request_header in ("byteorder", "content-length", "content-type", "content-encoding",):
-        #     if request_header not in json_header:
-        #         raise ValueError(f"Missing required header '{request_header}'.")
-        return json_header
-
-    async def read_message_content(self, json_header: dict):
-        content_length = json_header['content-length']
-        raw_data = await self.loop.sock_recv(self.socket, content_length)
-        json_content = json_decode(raw_data, encoding='utf-8')
-        # print("read_message_content = ", json_content)
-        return json_content
+        return frame
+
+    def _decode_frame(self, json_header: dict, raw_content: bytes | memoryview) -> BaseMessage:
+        content_type = json_header.get("content-type")
+        if content_type is not None and self.codec is JSON_CODEC:
+            self.codec = CODECS[content_type]
+        return BaseMessage.decode(json_header, raw_content)
 
     async def connect(self, server_address: tuple):
         self.socket.setblocking(False)
         await self.loop.sock_connect(self.socket, server_address)
         self.target_address = server_address
+        await self.attach()
 
     async def connect_with_timeout(self, server_address, timeouts: list[int]):
         try:
@@ -105,4 +149,8 @@ class BaseTCPClient:
                 raise ConnectionRefusedError
 
     def close(self):
-        self.socket.close()
+        if self.protocol is not None:
+            self.protocol.write_queue.close()
+            self.protocol.transport.close()
+        else:
+            self.socket.close()
@@ -4,20 +4,29 @@ import socket
 from transport.tcp_client import BaseTCPClient
 
 
+def bind_listen_socket(host: str, port: int, backlog=5) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
 class BaseTCPServer:
-    def __init__(self, host: str, port: int, backlog=5):
-        self.host = host
-        self.port = port
+    def __init__(self, host: str, port: int, backlog=5, client_class: type[BaseTCPClient] = BaseTCPClient,
+                 sock: socket.socket | None = None):
+        self.client_class = client_class
 
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.bind((host, port))
-        self.sock.listen(backlog)
+        self.sock = sock if sock is not None else bind_listen_socket(host, port, backlog)
+        self.sock.setblocking(False)
+        self.host, self.port = self.sock.getsockname()[:2]
 
         self.loop = asyncio.get_event_loop()
 
     async def accept(self):
         accepted_socket, address = await self.loop.sock_accept(self.sock)
-        return BaseTCPClient(accepted_socket, address)
+        tcp_client = self.client_class(accepted_socket, address)
+        await tcp_client.attach()
+        return tcp_client
 
     def close(self):
         self.sock.close()
@@ -0,0 +1,150 @@
+import asyncio
+import collections
+import enum
+
+
+class SlowConsumerPolicy(enum.Enum):
+    BLOCK = "block"
+    DROP_OLDEST_STATUS = "drop_oldest_status"
+    DISCONNECT = "disconnect"
+
+
+class SlowConsumerException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class QueueClosedException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class WriteQueue:
+    HIGH_WATER = 256 * 1024
+    LOW_WATER = 64 * 1024
+
+    def __init__(self, protocol, high_water: int = HIGH_WATER, low_water: int = LOW_WATER,
+                 policy: SlowConsumerPolicy = SlowConsumerPolicy.BLOCK):
+        self.protocol = protocol
+        self.loop = protocol.loop
+        self.high_water = high_water
+        self.low_water = low_water
+        self.policy = policy
+        self.frames: collections.deque[tuple[bytes, bool]] = collections.deque()
+        self.queued_bytes = 0
+        self.writer_task: asyncio.Task | None = None
+        self.writer_waiter: asyncio.Future | None = None
+        self.producer_waiters: list[asyncio.Future] = []
+        self.closed = False
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.write_calls = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self.frames)
+
+    @property
+    def frames_per_write(self) -> float:
+        return self.frames_written / self.write_calls if self.write_calls else 0.0
+
+    async def put(self, frame: bytes, droppable: bool = False):
+        while self.queued_bytes + len(frame) > self.high_water and not self.closed:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                self.protocol.transport.abort()
+                raise SlowConsumerException("peer is not reading fast enough")
+            if self.policy == SlowConsumerPolicy.DROP_OLDEST_STATUS and self._drop_oldest_droppable():
+                continue
+            waiter = self.loop.create_future()
+            self.producer_waiters.append(waiter)
+            await waiter
+
+        if self.closed:
+            raise QueueClosedException("connection closed before the frame was queued")
+        self._append(frame, droppable)
+
+    async def wait_until_below(self, limit: int):
+        while self.queued_bytes > limit and not self.closed:
+            waiter = self.loop.create_future()
+            self.producer_waiters.append(waiter)
+            await waiter
+
+    def try_put(self, frame: bytes, droppable: bool = False) -> bool:
+        if self.closed or self.queued_bytes + len(frame) > self.high_water:
+            return False
+        self._append(frame, droppable)
+        return True
+
+    def try_write(self, frame: bytes, droppable: bool = False) -> bool:
+        # a producer sending one frame per update gains nothing from the writer task's batching, so when
+        # nothing is queued ahead of it the frame goes straight to the transport
+        if self.frames or self.closed or self.protocol.write_paused:
+            return self.try_put(frame, droppable)
+        self.protocol.transport.write(frame)
+        self.write_calls += 1
+        self.frames_written += 1
+        return True
+
+    def _append(self, frame: bytes, droppable: bool):
+        self.frames.append((frame, droppable))
+        self.queued_bytes += len(frame)
+        self.max_depth = max(self.max_depth, len(self.frames))
+        self._wake_writer()
+
+    def _drop_oldest_droppable(self) -> bool:
+        for index, (frame, droppable) in enumerate(self.frames):
+            if droppable:
+                del self.frames[index]
+                self.queued_bytes -= len(frame)
+                self.frames_dropped += 1
+                return True
+        return False
+
+    def _wake_writer(self):
+        if self.writer_task is None:
+            self.writer_task = self.loop.create_task(self._run_writer())
+        elif self.writer_waiter is not None and not self.writer_waiter.done():
+            self.writer_waiter.set_result(None)
+
+    async def _run_writer(self):
+        while not self.closed:
+            if not self.frames:
+                self.writer_waiter = self.loop.create_future()
+                await self.writer_waiter
+                self.writer_waiter = None
+                continue
+            await self.protocol.drain()
+            self.flush()
+
+    def flush(self):
+        if not self.frames or self.closed:
+            return
+        batch = [frame for frame, _ in self.frames]
+        self.frames.clear()
+        self.queued_bytes = 0
+        self.protocol.transport.writelines(batch)
+        self.write_calls += 1
+        self.frames_written += len(batch)
+        self._wake_producers()
+
+    def _wake_producers(self):
+        if self.queued_bytes > self.low_water:
+            return
+        waiters, self.producer_waiters = self.producer_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def close(self):
+        self.flush()
+        self.connection_lost()
+
+    def connection_lost(self):
+        self.closed = True
+        self.frames.clear()
+        self.queued_bytes = 0
+        self._wake_producers()
+        if self.writer_waiter is not None and not self.writer_waiter.done():
+            self.writer_waiter.set_result(None)
@@ -7,8 +7,8 @@ def json_encode(data, encoding: str) -> bytes:
     return json.dumps(data, ensure_ascii=False).encode(encoding)
 
 
-def json_decode(bin_data: bytes, encoding: str) -> dict:
-    return json.loads(bin_data.decode(encoding))
+def json_decode(bin_data: bytes | memoryview, encoding: str) -> dict:
+    return json.loads(str(bin_data, encoding))
 
 
 async def async_input(prompt: str) -> str:
@@ -2,18 +2,22 @@ import asyncio
 import logging
 
 import utils
+from metrics import MOVE_ROUND_TRIP, Timer
+from transport.protocol import Frame
 from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException
-from webserver.exceptions import ClientConnectionException, ServerConnectionException
+from webserver.exceptions import ClientConnectionException, ServerConnectionException, ServerFullException
 
 logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
 class Bridge:
-    def __init__(self, server: BaseTCPClient, client: BaseTCPClient):
+    def __init__(self, server: BaseTCPClient, client: BaseTCPClient, passthrough: bool = True):
         self.server: BaseTCPClient = server
         self.client: BaseTCPClient = client
+        self.passthrough = passthrough
         self.quit = False
+        self.move_timer: Timer | None = None
 
     async def run_full_duplex(self):
         tasks = [
@@ -27,37 +31,69 @@ class Bridge:
             raise
 
     async def forward_from_server_to_client(self):
-        message: BaseMessage
+        first_item = True
         while True:
             if self.quit:
                 break
 
             try:
-                message = await self.server.receive()
+                item = await self._receive(self.server)
             except SocketClosedException:
                 raise ServerConnectionException("error")
 
+            if first_item:
+                first_item = False
+                # a game server at capacity answers a start with server_full instead of a game
+                if self._message_type(item) == "server_full":
+                    raise ServerFullException("game server is full")
+
+            if self.move_timer is not None:
+                self.move_timer.stop()
+                self.move_timer = None
+
             try:
-                await self.client.send(message)
+                await self._send(self.client, item)
             except SocketClosedException:
                 raise ClientConnectionException("error")
 
-            json_content = message.content
-            if json_content.get('game_status') == 'finished':
+            if self._is_game_finished(item):
                 self.quit = True
 
     async def forward_from_client_to_server(self):
-        message: BaseMessage
         while True:
             if self.quit:
                 break
 
             try:
-                message = await self.client.receive()
+                item = await self._receive(self.client)
             except SocketClosedException:
                 raise ClientConnectionException("error")
 
+            if self._message_type(item) == "place_mark":
+                self.move_timer = Timer(MOVE_ROUND_TRIP)
+
             try:
-                await self.server.send(message)
+                await self._send(self.server, item)
             except SocketClosedException:
                 raise ServerConnectionException("error")
+
+    def _message_type(self, item: Frame | BaseMessage) -> str:
+        if self.passthrough:
+            return item.message_type
+        return item.content.get("type")
+
+    async def _receive(self, tcp_client: BaseTCPClient) -> Frame | BaseMessage:
+        if self.passthrough:
+            return await tcp_client.receive_frame()
+        return await tcp_client.receive()
+
+    async def _send(self, tcp_client: BaseTCPClient, item: Frame | BaseMessage):
+        if self.passthrough:
+            await tcp_client.send_frame(item)
+        else:
+            await tcp_client.send(item)
+
+    def _is_game_finished(self, item: Frame | BaseMessage) -> bool:
+        if self.passthrough:
+            return item.json_header.get('game-status') == 'finished'
+        return item.content.get('game_status') == 'finished'
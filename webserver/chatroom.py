@@ -1,23 +1,41 @@
 import asyncio
+import collections
+import heapq
+import itertools
 import logging
-import uuid
+import time
 
+from metrics import MATCHMAKING_WAIT, Timer
 from transport.tcp_client import BaseTCPClient, BaseMessage
 from webserver.bridge import Bridge
+from webserver.connection_pool import GameServerConnectionPool
+from webserver.load_balancer import LoadBalancer
 from webserver.exceptions import ClientConnectionException
 
 logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+DEFAULT_MATCH_PRIORITY = 0
+
 
 class ChatRoom:
-    def __init__(self, server_address: tuple):
+    def __init__(self, server_address: tuple, game_id: str | None = None, board_options: tuple | None = None):
         self.server_address = server_address
-        self.room_id = str(uuid.uuid1())
+        self.game_id = game_id
+        self.board_options = board_options
 
-    async def add_client(self, client_tcp_client: BaseTCPClient, start_message: BaseMessage = None):
-        server_client = BaseTCPClient()
-        await server_client.connect(self.server_address)
+    async def add_client(self, client_tcp_client: BaseTCPClient, start_message: BaseMessage = None,
+                         connection_pool: GameServerConnectionPool | None = None):
+        # only the webserver decides which running game a client joins
+        content = {key: value for key, value in start_message.content.items() if key != "game_id"}
+        if self.game_id is not None:
+            content["game_id"] = self.game_id
+        start_message = BaseMessage(content)
+        if connection_pool is not None:
+            server_client = await connection_pool.open_stream(self.server_address)
+        else:
+            server_client = BaseTCPClient()
+            await server_client.connect(self.server_address)
         await server_client.send(start_message)
         bridge = Bridge(server_client, client_tcp_client)
         try:
@@ -29,45 +47,190 @@ class ChatRoom:
             server_client.close()
 
 
+class MatchWaiter:
+    __slots__ = ("priority", "sequence", "single_player", "board_options", "future")
+
+    def __init__(self, priority: int, sequence: int, single_player: bool, board_options: tuple,
+                 future: asyncio.Future):
+        self.priority = priority
+        self.sequence = sequence
+        self.single_player = single_player
+        self.board_options = board_options
+        self.future = future
+
+    def __lt__(self, other: "MatchWaiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
 class ChatroomRepository:
-    def __init__(self):
-        self.all_chat_rooms: dict[str:ChatRoom] = dict()
-        self.free_chat_rooms: dict[str:ChatRoom] = dict()
+    def __init__(self, connection_pool: GameServerConnectionPool | None = None):
+        self.connection_pool = connection_pool if connection_pool is not None else GameServerConnectionPool()
+        self.load_balancer = LoadBalancer()
+        self.game_ids_by_server: dict[tuple, set[str]] = dict()
+        self.servers_by_game_id: dict[str, tuple] = dict()
         self.free_multiplayer_chatrooms: dict[str:ChatRoom] = dict()
+        self.free_multiplayer_chatrooms_by_options: dict[tuple, dict[str, ChatRoom]] = dict()
         self.waiting_chatrooms_by_username: dict[str: ChatRoom] = dict()
+        self.waiting_usernames_by_game_id: dict[str, set[str]] = dict()
+        self.match_waiters: list[MatchWaiter] = []
+        self.multiplayer_waiters_by_options: dict[tuple, collections.deque[MatchWaiter]] = dict()
+        self.waiter_sequence = itertools.count()
+
+    def add_gameserver(self, server_address: tuple):
+        self.load_balancer.add(server_address)
+        self.game_ids_by_server[server_address] = set()
+
+    def remove_gameserver(self, server_address: tuple):
+        self.load_balancer.remove(server_address)
+        self.connection_pool.close_server(server_address)
+        for game_id in self.game_ids_by_server.pop(server_address, ()):
+            self.remove_game(game_id)
+
+    def update_capacity(self, server_address: tuple, capacity: int, active_games: int):
+        if self.load_balancer.update(server_address, capacity=capacity, active_games=active_games) is not None:
+            self._dispatch_slots()
+
+    def update_load(self, server_address: tuple, load_report: dict):
+        load = self.load_balancer.update(server_address, capacity=load_report['capacity'],
+                                         active_games=load_report['active_games'],
+                                         connected_clients=load_report['connected_clients'],
+                                         loop_lag_ms=load_report['loop_lag_ms'],
+                                         ai_pending=load_report['ai_pending'],
+                                         last_report_at=time.monotonic(), healthy=True)
+        if load is not None:
+            self._dispatch_slots()
+
+    def mark_unhealthy(self, server_address: tuple):
+        self.load_balancer.update(server_address, healthy=False)
 
-    def add_chatroom(self, chatroom: ChatRoom):
-        self.free_chat_rooms[chatroom.room_id] = chatroom
-        self.all_chat_rooms[chatroom.room_id] = chatroom
+    def mark_full(self, server_address: tuple):
+        # the server refused the game this reservation was for; until it reports again it takes no more
+        load = self.load_balancer.get(server_address)
+        if load is not None:
+            self.load_balancer.update(server_address, active_games=load.capacity)
+            self.load_balancer.release(server_address)
 
-    def remove_chatroom(self, chatroom: ChatRoom):
-        self.all_chat_rooms.pop(chatroom.room_id, None)
-        self.remove_from_free_chatrooms(chatroom)
-        self.remove_from_multiplayer_chatrooms(chatroom)
-        self.remove_from_waiting_chatrooms(chatroom)
+    def add_multiplayer_chatroom(self, chatroom: ChatRoom):
+        self._track_game(chatroom)
+        waiter = self._pop_multiplayer_waiter(chatroom.board_options)
+        if waiter is not None:
+            waiter.future.set_result(chatroom)
+            return
+        self.free_multiplayer_chatrooms[chatroom.game_id] = chatroom
+        self.free_multiplayer_chatrooms_by_options.setdefault(chatroom.board_options, {})[chatroom.game_id] = chatroom
 
-    def remove_from_waiting_chatrooms(self, chatroom):
-        self.waiting_chatrooms_by_username = {k: v for k, v in self.waiting_chatrooms_by_username.items() if
-                                              v != chatroom}
+    def add_waiting_chatroom(self, username: str, chatroom: ChatRoom):
+        self._track_game(chatroom)
+        self._remove_free_multiplayer_chatroom(chatroom.game_id)
+        self.pop_waiting_chatroom(username)
+        self.waiting_chatrooms_by_username[username] = chatroom
+        self.waiting_usernames_by_game_id.setdefault(chatroom.game_id, set()).add(username)
 
-    def remove_from_multiplayer_chatrooms(self, chatroom):
-        self.free_multiplayer_chatrooms.pop(chatroom.room_id, None)
+    def add_running_game(self, game_id: str, server_address: tuple):
+        self.load_balancer.confirm(server_address)
+        game_ids = self.game_ids_by_server.get(server_address)
+        if game_ids is not None:
+            game_ids.add(game_id)
+            self.servers_by_game_id[game_id] = server_address
 
-    def remove_from_free_chatrooms(self, chatroom):
-        self.free_chat_rooms.pop(chatroom.room_id, None)
+    def remove_game(self, game_id: str):
+        self._remove_free_multiplayer_chatroom(game_id)
+        for username in self.waiting_usernames_by_game_id.pop(game_id, ()):
+            self.waiting_chatrooms_by_username.pop(username)
+        # a game whose free room was already taken by a joiner is only found through this mapping
+        server_address = self.servers_by_game_id.pop(game_id, None)
+        if server_address is not None:
+            self.game_ids_by_server.get(server_address, set()).discard(game_id)
 
     def pop_waiting_chatroom(self, username) -> ChatRoom | None:
-        if username in self.waiting_chatrooms_by_username:
-            print("popped from waiting sockets")
-            return self.waiting_chatrooms_by_username.pop(username)
+        chatroom = self.waiting_chatrooms_by_username.pop(username, None)
+        if chatroom is None:
+            return None
+        print("popped from waiting sockets")
+        usernames = self.waiting_usernames_by_game_id.get(chatroom.game_id)
+        if usernames is not None:
+            usernames.discard(username)
+            if not usernames:
+                del self.waiting_usernames_by_game_id[chatroom.game_id]
+        return chatroom
+
+    async def pop_free_chatroom(self, single_player: bool, board_options: tuple,
+                                priority: int = DEFAULT_MATCH_PRIORITY) -> ChatRoom:
+        timer = Timer(MATCHMAKING_WAIT)
+        if not single_player:
+            chatroom = self._pop_free_multiplayer_chatroom(board_options)
+            if chatroom is not None:
+                timer.stop()
+                return chatroom
+
+        waiter = MatchWaiter(priority, next(self.waiter_sequence), single_player, board_options,
+                             asyncio.get_running_loop().create_future())
+        heapq.heappush(self.match_waiters, waiter)
+        if not single_player:
+            waiters = self.multiplayer_waiters_by_options.setdefault(board_options, collections.deque())
+            while waiters and waiters[0].future.done():
+                waiters.popleft()
+            waiters.append(waiter)
+        self._dispatch_slots()
+        try:
+            chatroom = await waiter.future
+            timer.stop()
+            return chatroom
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release_chatroom(waiter.future.result())
+            raise
+
+    def release_chatroom(self, chatroom: ChatRoom):
+        if chatroom.game_id is not None:
+            self.add_multiplayer_chatroom(chatroom)
+        else:
+            self.load_balancer.release(chatroom.server_address)
+            self._dispatch_slots()
+
+    @property
+    def number_of_match_waiters(self) -> int:
+        return sum(1 for waiter in self.match_waiters if not waiter.future.done())
+
+    def _dispatch_slots(self):
+        while self.match_waiters:
+            waiter = self.match_waiters[0]
+            if waiter.future.done():
+                heapq.heappop(self.match_waiters)
+                continue
+            server_address = self.load_balancer.reserve()
+            if server_address is None:
+                return
+            heapq.heappop(self.match_waiters)
+            waiter.future.set_result(ChatRoom(server_address))
+
+    def _pop_multiplayer_waiter(self, board_options: tuple) -> MatchWaiter | None:
+        waiters = self.multiplayer_waiters_by_options.get(board_options)
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.future.done():
+                return waiter
+        self.multiplayer_waiters_by_options.pop(board_options, None)
         return None
 
-    async def pop_free_chatroom(self, single_player: bool) -> ChatRoom:
-        while True:
-            try:
-                if single_player or len(self.free_multiplayer_chatrooms) == 0:
-                    return self.free_chat_rooms.popitem()[1]
-                else:
-                    return self.free_multiplayer_chatrooms.popitem()[1]
-            except KeyError:
-                await asyncio.sleep(1)
+    def _pop_free_multiplayer_chatroom(self, board_options: tuple) -> ChatRoom | None:
+        chatrooms = self.free_multiplayer_chatrooms_by_options.get(board_options)
+        if not chatrooms:
+            return None
+        return self._remove_free_multiplayer_chatroom(next(iter(chatrooms)))
+
+    def _remove_free_multiplayer_chatroom(self, game_id: str) -> ChatRoom | None:
+        chatroom = self.free_multiplayer_chatrooms.pop(game_id, None)
+        if chatroom is None:
+            return None
+        chatrooms = self.free_multiplayer_chatrooms_by_options[chatroom.board_options]
+        del chatrooms[game_id]
+        if not chatrooms:
+            del self.free_multiplayer_chatrooms_by_options[chatroom.board_options]
+        return chatroom
+
+    def _track_game(self, chatroom: ChatRoom):
+        game_ids = self.game_ids_by_server.get(chatroom.server_address)
+        if game_ids is not None:
+            game_ids.add(chatroom.game_id)
+            self.servers_by_game_id[chatroom.game_id] = chatroom.server_address
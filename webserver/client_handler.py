@@ -3,9 +3,15 @@ import enum
 import logging
 
 import utils
+from metrics import TIMEOUTS
+from server.tic_toc_toe import DEFAULT_BOARD_SIZE, DEFAULT_WIN_LENGTH
+from timer_wheel import TimerWheel
+from transport.codec import negotiate_codec
 from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException
 from webserver.chatroom import ChatroomRepository, ChatRoom
-from webserver.exceptions import ClientConnectionException, ServerConnectionException, ChangeGameException
+from webserver.exceptions import ClientConnectionException, ServerConnectionException, ChangeGameException, \
+    ServerFullException
+from webserver.spectators import SpectatorRepository
 
 logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -17,18 +23,24 @@ class ClientHandlerState(enum.Enum):
 
 
 class ClientHandler:
-    def __init__(self, tcp_client: BaseTCPClient, chatroom_repo: ChatroomRepository):
+    def __init__(self, tcp_client: BaseTCPClient, chatroom_repo: ChatroomRepository,
+                 timers: TimerWheel | None = None, idle_timeout: float | None = None,
+                 spectator_repo: SpectatorRepository | None = None):
         self.tcp_client: BaseTCPClient = tcp_client
         self.chatroom_repo: ChatroomRepository = chatroom_repo
+        self.spectator_repo = spectator_repo if spectator_repo is not None else SpectatorRepository(chatroom_repo)
+        self.timers = timers
+        self.idle_timeout = idle_timeout
         self.state = ClientHandlerState.DISCONNECTED
 
     async def handle_client(self, tcp_client: BaseTCPClient):
         self.state = ClientHandlerState.CONNECTED
         while True:
             try:
-                message: BaseMessage = await tcp_client.receive()
+                message: BaseMessage = await self._receive_until_idle(tcp_client)
                 json_content = message.content
                 if json_content['type'] == 'start_game':
+                    tcp_client.codec = negotiate_codec(json_content.get('codecs'))
                     try:
                         is_single_player_game = json_content['game_type'] == "single"
                         await self.handle_game(tcp_client, message, is_single_player_game)
@@ -37,6 +49,9 @@ class ClientHandler:
                         break
                     except SocketClosedException:
                         print("unhandled socketClosedException in handle unmanaged Socket for client")
+                elif json_content['type'] == 'watch_game':
+                    tcp_client.codec = negotiate_codec(json_content.get('codecs'))
+                    await self.spectator_repo.watch(tcp_client, json_content.get('game_id'))
                 else:
                     logger.debug("Unknown message content= ", json_content)
             except SocketClosedException:
@@ -44,30 +59,56 @@ class ClientHandler:
                 break
         self.state = ClientHandlerState.DISCONNECTED
 
+    async def _receive_until_idle(self, tcp_client: BaseTCPClient) -> BaseMessage:
+        if self.timers is None or not self.idle_timeout:
+            return await tcp_client.receive()
+        eviction = self.timers.call_later(self.idle_timeout, self._evict_idle, tcp_client)
+        try:
+            return await tcp_client.receive()
+        finally:
+            eviction.cancel()
+
+    def _evict_idle(self, tcp_client: BaseTCPClient):
+        logger.info(f"closing a client connection that sent nothing for {self.idle_timeout}s")
+        TIMEOUTS.labels("idle").inc()
+        tcp_client.close()
+
     async def handle_game(self, tcp_client: BaseTCPClient, start_message: BaseMessage, is_single_player_game: bool):
         username = start_message.content['username']
-        waiting_chatroom = self.chatroom_repo.pop_waiting_chatroom(username)
-        chatroom: ChatRoom
-        if waiting_chatroom:
-            chatroom = waiting_chatroom
-        else:
+        while True:
+            waiting_chatroom = self.chatroom_repo.pop_waiting_chatroom(username)
+            chatroom: ChatRoom
+            if waiting_chatroom:
+                chatroom = waiting_chatroom
+            else:
+                try:
+                    tasks = [asyncio.create_task(x) for x in
+                             [self.chatroom_repo.pop_free_chatroom(is_single_player_game,
+                                                                   self.get_board_options(start_message)),
+                              self._handle_waiting_user_commands(tcp_client)]]
+                    chatroom = await utils.wait_until_first_completed(tasks)
+                except ChangeGameException:
+                    return
+
             try:
-                tasks = [asyncio.create_task(x) for x in
-                         [self.chatroom_repo.pop_free_chatroom(is_single_player_game),
-                          self._handle_waiting_user_commands(tcp_client)]]
-                chatroom = await utils.wait_until_first_completed(tasks)
-            except ChangeGameException:
+                await chatroom.add_client(tcp_client, start_message, self.chatroom_repo.connection_pool)
+                return
+            except ServerFullException:
+                logger.info(f"gameserver {chatroom.server_address} is full, matching {username} again")
+                self.chatroom_repo.mark_full(chatroom.server_address)
+            except ServerConnectionException:
+                server_crashed_message = {
+                    "type": "server_crashed"
+                }
+                await tcp_client.send(BaseMessage(server_crashed_message))
                 return
+            except ClientConnectionException:
+                raise
 
-        try:
-            await chatroom.add_client(tcp_client, start_message)
-        except ServerConnectionException:
-            server_crashed_message = {
-                "type": "server_crashed"
-            }
-            await tcp_client.send(BaseMessage(server_crashed_message))
-        except ClientConnectionException:
-            raise
+    @staticmethod
+    def get_board_options(start_message: BaseMessage) -> tuple[int, int]:
+        return (start_message.content.get('board_size', DEFAULT_BOARD_SIZE),
+                start_message.content.get('win_length', DEFAULT_WIN_LENGTH))
 
     async def _handle_waiting_user_commands(self, tcp_client: BaseTCPClient):
         while True:
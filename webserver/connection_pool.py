@@ -0,0 +1,53 @@
+import asyncio
+import logging
+
+from transport.multiplex import MultiplexedConnection, StreamClient
+from transport.tcp_client import BaseTCPClient
+
+logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECTIONS_PER_SERVER = 2
+
+
+class GameServerConnectionPool:
+    def __init__(self, connections_per_server: int = DEFAULT_CONNECTIONS_PER_SERVER):
+        self.connections_per_server = connections_per_server
+        self.connections_by_server: dict[tuple, list[MultiplexedConnection]] = dict()
+        self.connect_locks: dict[tuple, asyncio.Lock] = dict()
+
+    async def open_stream(self, server_address: tuple) -> StreamClient:
+        connection = await self._get_connection(server_address)
+        return connection.open_stream()
+
+    async def _get_connection(self, server_address: tuple) -> MultiplexedConnection:
+        connections = [x for x in self.connections_by_server.get(server_address, []) if not x.closed]
+        self.connections_by_server[server_address] = connections
+        if len(connections) >= self.connections_per_server:
+            return min(connections, key=lambda x: len(x.streams))
+
+        lock = self.connect_locks.setdefault(server_address, asyncio.Lock())
+        async with lock:
+            connections = self.connections_by_server[server_address]
+            if len(connections) >= self.connections_per_server:
+                return min(connections, key=lambda x: len(x.streams))
+            tcp_client = BaseTCPClient()
+            await tcp_client.connect(server_address)
+            connection = MultiplexedConnection(tcp_client)
+            connection.start()
+            connections.append(connection)
+            logger.info(f"opened pooled connection {len(connections)} to {server_address}")
+            return connection
+
+    def close_server(self, server_address: tuple):
+        self.connect_locks.pop(server_address, None)
+        for connection in self.connections_by_server.pop(server_address, []):
+            connection.close()
+
+    @property
+    def number_of_connections(self) -> int:
+        return sum(len(x) for x in self.connections_by_server.values())
+
+    @property
+    def number_of_streams(self) -> int:
+        return sum(len(connection.streams) for x in self.connections_by_server.values() for connection in x)
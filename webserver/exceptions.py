@@ -11,3 +11,8 @@ class ClientConnectionException(Exception):
 class ChangeGameException(Exception):
     def __init__(self, message):
         super().__init__(message)
+
+
+class ServerFullException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
@@ -17,9 +17,8 @@ class GameServerHandler:
     def __init__(self, tcp_client: BaseTCPClient, server_address: tuple, chatroom_repo: ChatroomRepository):
         self.tcp_client: BaseTCPClient = tcp_client
         self.server_address: tuple = server_address
-        self.chatroom = ChatRoom(self.server_address)
         self.chatroom_repo = chatroom_repo
-        self.chatroom_repo.add_chatroom(self.chatroom)
+        self.chatroom_repo.add_gameserver(self.server_address)
         self.state = GameServerHandlerState.DISCONNECTED
 
     async def handle_gameserver(self):
@@ -31,24 +30,30 @@ class GameServerHandler:
         except SocketClosedException:
             logger.info("A gameserver disconnected")
         finally:
-            self.chatroom_repo.remove_chatroom(self.chatroom)
+            self.chatroom_repo.remove_gameserver(self.server_address)
             self.state = GameServerHandlerState.DISCONNECTED
 
     async def _handle_gameserver_message(self, message: BaseMessage):
         json_content = message.content
         message_type = json_content['type']
-        if message_type == "put_to_free":
-            self.chatroom_repo.free_chat_rooms[self.chatroom.room_id] = self.chatroom
-            self.chatroom_repo.remove_from_multiplayer_chatrooms(self.chatroom)
-            self.chatroom_repo.remove_from_waiting_chatrooms(self.chatroom)
+        if message_type == "server_capacity":
+            self.chatroom_repo.update_capacity(self.server_address, json_content['capacity'],
+                                               json_content['active_games'])
         elif message_type == "put_to_waiting":
-            username = json_content['username']
-            self.chatroom_repo.waiting_chatrooms_by_username[username] = self.chatroom
-            self.chatroom_repo.remove_from_free_chatrooms(self.chatroom)
-            self.chatroom_repo.remove_from_multiplayer_chatrooms(self.chatroom)
-        elif message_type == "put_to_multi_free":
-            self.chatroom_repo.free_multiplayer_chatrooms[self.chatroom.room_id] = self.chatroom
-            self.chatroom_repo.remove_from_free_chatrooms(self.chatroom)
-            self.chatroom_repo.remove_from_waiting_chatrooms(self.chatroom)
+            chatroom = ChatRoom(self.server_address, json_content['game_id'])
+            self.chatroom_repo.add_waiting_chatroom(json_content['username'], chatroom)
+        elif message_type == "multi_game_waiting":
+            board_options = (json_content['board_size'], json_content['win_length'])
+            chatroom = ChatRoom(self.server_address, json_content['game_id'], board_options)
+            self.chatroom_repo.add_multiplayer_chatroom(chatroom)
+        elif message_type == "game_opened":
+            self.chatroom_repo.add_running_game(json_content['game_id'], self.server_address)
+        elif message_type == "game_closed":
+            self.chatroom_repo.remove_game(json_content['game_id'])
+        elif message_type == "load_report":
+            load = self.chatroom_repo.load_balancer.get(self.server_address)
+            if load is not None and not load.healthy:
+                logger.info(f"gameserver {self.server_address} is healthy again")
+            self.chatroom_repo.update_load(self.server_address, json_content)
         else:
             logger.warning(f"unknown message type in gameserver handler: {message_type}")
@@ -0,0 +1,120 @@
+import collections
+import heapq
+import time
+
+LOOP_LAG_BUDGET_MS = 100
+AI_QUEUE_BUDGET = 8
+RESERVATION_TIMEOUT = 30.0
+
+
+class GameServerLoad:
+    def __init__(self, server_address: tuple):
+        self.server_address = server_address
+        self.capacity = 0
+        self.active_games = 0
+        # slots handed out whose game the server has not reported opened yet, by when they were handed out
+        self.reservations: collections.deque[float] = collections.deque()
+        self.connected_clients = 0
+        self.loop_lag_ms = 0
+        self.ai_pending = 0
+        self.last_report_at = time.monotonic()
+        self.healthy = True
+        self.version = 0
+
+    @property
+    def committed_games(self) -> int:
+        return self.active_games + len(self.reservations)
+
+    @property
+    def free_slots(self) -> int:
+        return max(self.capacity - self.committed_games, 0)
+
+    @property
+    def score(self) -> float:
+        utilization = self.committed_games / self.capacity if self.capacity else 1.0
+        return utilization + self.loop_lag_ms / LOOP_LAG_BUDGET_MS + self.ai_pending / AI_QUEUE_BUDGET
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.free_slots > 0
+
+    def describe(self) -> str:
+        state = "healthy" if self.healthy else "UNHEALTHY"
+        return (f"{self.server_address[0]}:{self.server_address[1]} {state} games={self.active_games}/{self.capacity} "
+                f"reserved={len(self.reservations)} "
+                f"clients={self.connected_clients} loop_lag={self.loop_lag_ms}ms ai_pending={self.ai_pending} "
+                f"last_report={time.monotonic() - self.last_report_at:.1f}s ago")
+
+
+class LoadBalancer:
+    def __init__(self):
+        self.loads: dict[tuple, GameServerLoad] = dict()
+        self.heap: list[tuple[float, int, tuple]] = []
+
+    def add(self, server_address: tuple) -> GameServerLoad:
+        load = GameServerLoad(server_address)
+        self.loads[server_address] = load
+        self._push(load)
+        return load
+
+    def remove(self, server_address: tuple):
+        self.loads.pop(server_address, None)
+
+    def get(self, server_address: tuple) -> GameServerLoad | None:
+        return self.loads.get(server_address)
+
+    def update(self, server_address: tuple, **fields) -> GameServerLoad | None:
+        load = self.loads.get(server_address)
+        if load is None:
+            return None
+        for name, value in fields.items():
+            setattr(load, name, value)
+        # a start that never reached the server would otherwise hold its slot for good
+        expired_before = time.monotonic() - RESERVATION_TIMEOUT
+        while load.reservations and load.reservations[0] < expired_before:
+            load.reservations.popleft()
+        self._push(load)
+        return load
+
+    def reserve(self) -> tuple | None:
+        skipped = []
+        reserved = None
+        while self.heap:
+            score, version, server_address = heapq.heappop(self.heap)
+            load = self.loads.get(server_address)
+            if load is None or load.version != version:
+                continue
+            if not load.available:
+                skipped.append((score, version, server_address))
+                continue
+            load.reservations.append(time.monotonic())
+            self._push(load)
+            reserved = server_address
+            break
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return reserved
+
+    def release(self, server_address: tuple):
+        load = self.loads.get(server_address)
+        if load is not None and load.reservations:
+            load.reservations.pop()
+            self._push(load)
+
+    def confirm(self, server_address: tuple):
+        load = self.loads.get(server_address)
+        if load is not None and load.reservations:
+            load.reservations.popleft()
+            load.active_games += 1
+            self._push(load)
+
+    def stale(self, timeout: float) -> list[GameServerLoad]:
+        now = time.monotonic()
+        return [load for load in self.loads.values() if load.healthy and now - load.last_report_at > timeout]
+
+    def _push(self, load: GameServerLoad):
+        load.version += 1
+        heapq.heappush(self.heap, (load.score, load.version, load.server_address))
+        if len(self.heap) > 4 * len(self.loads) + 64:
+            self.heap = [(x.score, x.version, x.server_address) for x in self.loads.values()]
+            heapq.heapify(self.heap)
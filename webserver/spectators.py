@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import socket
+import sys
+
+import utils
+from metrics import SPECTATORS, SPECTATOR_FRAMES
+from transport.codec import CODECS, JSON_CODEC
+from transport.multiplex import StreamClient
+from transport.protocol import Frame
+from transport.tcp_client import BaseTCPClient, BaseMessage, SocketClosedException, encode_frame
+from webserver.chatroom import ChatroomRepository
+from webserver.connection_pool import GameServerConnectionPool
+
+logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+FEED_USERNAME = "spectators"
+FAN_OUT_CHUNK = 128
+WATCHER_QUEUE_LIMIT = 16 * 1024
+WATCHER_SEND_BUFFER = 32 * 1024
+CATCH_UP_TIMEOUT = 30
+
+
+class Watcher:
+    __slots__ = ("tcp_client", "lagging", "done")
+
+    def __init__(self, tcp_client: BaseTCPClient, done: asyncio.Future):
+        self.tcp_client = tcp_client
+        self.lagging = False
+        self.done = done
+
+
+class SpectatorFeed:
+    def __init__(self, game_id: str, server_address: tuple, codec=JSON_CODEC):
+        self.game_id = game_id
+        self.server_address = server_address
+        self.codec = codec
+        self.loop = asyncio.get_event_loop()
+        self.watchers: dict[BaseTCPClient, Watcher] = dict()
+        self.latest: bytes | None = None
+        self.final = False
+        self.changed = asyncio.Event()
+        self.upstream: StreamClient | None = None
+        self.tasks: list[asyncio.Task] = []
+
+    def start(self, connection_pool: GameServerConnectionPool):
+        self.tasks = [self.loop.create_task(self._read_upstream(connection_pool)),
+                      self.loop.create_task(self._fan_out())]
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.upstream is not None:
+            self.upstream.close()
+
+    def add_watcher(self, tcp_client: BaseTCPClient) -> Watcher:
+        watcher = Watcher(tcp_client, self.loop.create_future())
+        self.watchers[tcp_client] = watcher
+        if self.latest is not None:
+            self._deliver(watcher, self.latest, self.final)
+        return watcher
+
+    def remove_watcher(self, tcp_client: BaseTCPClient):
+        self.watchers.pop(tcp_client, None)
+
+    async def _read_upstream(self, connection_pool: GameServerConnectionPool):
+        try:
+            self.upstream = await connection_pool.open_stream(self.server_address)
+            watch_message = {
+                "type": "watch_game",
+                "username": FEED_USERNAME,
+                "game_id": self.game_id,
+                "codecs": [self.codec.name]
+            }
+            await self.upstream.send(BaseMessage(watch_message))
+            while not self.final:
+                self._publish(await self.upstream.receive_frame())
+            self.upstream.close()
+        except (SocketClosedException, OSError):
+            if not self.final:
+                logger.warning(f"lost the spectator feed of game {self.game_id} on {self.server_address}")
+                self.latest = BaseMessage({"type": "server_crashed"}).encode(self.codec)
+                self.final = True
+                self.changed.set()
+
+    def _publish(self, frame: Frame):
+        finished = frame.json_header.get("game-status") == "finished" or \
+            frame.message_type in ("game_not_found", "game_closed")
+        codec = CODECS[frame.json_header.get("content-type", JSON_CODEC.name)]
+        # one client frame per update, without the stream header, shared by every watcher's write queue
+        self.latest = encode_frame(bytes(frame.content), codec, finished)
+        self.final = finished
+        self.changed.set()
+
+    async def _fan_out(self):
+        while True:
+            await self.changed.wait()
+            self.changed.clear()
+            data, final = self.latest, self.final
+            watchers = list(self.watchers.values())
+            sent = 0
+            for start in range(0, len(watchers), FAN_OUT_CHUNK):
+                if start:
+                    # let the players' frames through between chunks of a large audience
+                    await asyncio.sleep(0)
+                for watcher in watchers[start:start + FAN_OUT_CHUNK]:
+                    if self.watchers.get(watcher.tcp_client) is watcher:
+                        sent += self._deliver(watcher, data, final)
+            SPECTATOR_FRAMES.labels("sent").inc(sent)
+            SPECTATOR_FRAMES.labels("skipped").inc(len(watchers) - sent)
+            if final:
+                return
+
+    def _deliver(self, watcher: Watcher, data: bytes, final: bool) -> bool:
+        if watcher.lagging:
+            return False
+        write_queue = watcher.tcp_client.write_queue
+        if write_queue is None:
+            return False
+        if write_queue.queued_bytes > WATCHER_QUEUE_LIMIT:
+            watcher.lagging = True
+            self.loop.create_task(self._catch_up(watcher))
+            return False
+        if not write_queue.try_write(data, True):
+            return False
+        if final and not watcher.done.done():
+            watcher.done.set_result(None)
+        return True
+
+    async def _catch_up(self, watcher: Watcher):
+        try:
+            async with asyncio.timeout(CATCH_UP_TIMEOUT):
+                await watcher.tcp_client.write_queue.wait_until_below(WATCHER_QUEUE_LIMIT)
+        except TimeoutError:
+            logger.info(f"closing a spectator of game {self.game_id} that stopped reading")
+            watcher.tcp_client.close()
+            return
+        if self.watchers.get(watcher.tcp_client) is watcher:
+            watcher.lagging = False
+            self._deliver(watcher, self.latest, self.final)
+
+
+class SpectatorRepository:
+    def __init__(self, chatroom_repo: ChatroomRepository):
+        self.chatroom_repo = chatroom_repo
+        self.feeds: dict[tuple[str, str], SpectatorFeed] = dict()
+
+    async def watch(self, tcp_client: BaseTCPClient, game_id: str | None):
+        key = (game_id, tcp_client.codec.name)
+        feed = self.feeds.get(key)
+        if feed is None:
+            server_address = self.chatroom_repo.servers_by_game_id.get(game_id)
+            if server_address is None:
+                not_found_message = {
+                    "type": "game_not_found",
+                    "game_id": game_id or ""
+                }
+                await tcp_client.send(BaseMessage(not_found_message))
+                return
+            feed = SpectatorFeed(game_id, server_address, tcp_client.codec)
+            self.feeds[key] = feed
+            feed.start(self.chatroom_repo.connection_pool)
+
+        # an autotuned send buffer would let a stalled watcher sit megabytes behind before it is skipped ahead
+        send_buffer = tcp_client.socket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        tcp_client.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, WATCHER_SEND_BUFFER)
+        watcher = feed.add_watcher(tcp_client)
+        SPECTATORS.inc()
+        try:
+            await utils.wait_until_first_completed([watcher.done,
+                                                    asyncio.create_task(self._wait_for_stop(tcp_client))])
+        finally:
+            SPECTATORS.dec()
+            feed.remove_watcher(tcp_client)
+            self._restore_send_buffer(tcp_client, send_buffer)
+            if not feed.watchers and self.feeds.get(key) is feed:
+                del self.feeds[key]
+                feed.close()
+
+    @staticmethod
+    def _restore_send_buffer(tcp_client: BaseTCPClient, send_buffer: int):
+        # the connection goes back to the main menu and may play next, so it gets its old buffer size back;
+        # linux reports twice the size it was given and doubles whatever it is set to again. Only the size comes
+        # back: once SO_SNDBUF has been set linux locks the buffer and never autotunes this connection again,
+        # so a player who watched a game keeps a fixed buffer of the size autotuning had reached by then
+        if sys.platform.startswith("linux"):
+            send_buffer //= 2
+        try:
+            tcp_client.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer)
+        except OSError:
+            pass
+
+    @staticmethod
+    async def _wait_for_stop(tcp_client: BaseTCPClient):
+        while True:
+            message = await tcp_client.receive()
+            if message.content['type'] == 'stop_watching':
+                return
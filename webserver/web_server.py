@@ -1,15 +1,22 @@
 import asyncio
 import logging
 
-from transport.tcp_client import BaseTCPClient
+from timer_wheel import TimerWheel
+from transport.codec import negotiate_codec
+from transport.tcp_client import BaseTCPClient, BaseMessage
 from transport.tcp_server import BaseTCPServer
 from webserver.chatroom import ChatroomRepository
 from webserver.client_handler import ClientHandlerState, ClientHandler
 from webserver.gameserver_handler import GameServerHandler, GameServerHandlerState
+from webserver.spectators import SpectatorRepository
 
 logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+HEARTBEAT_TIMEOUT = 6
+IDLE_TIMEOUT = 300
+CLIENT_BACKLOG = 512
+
 
 class GameServerRepository:
     def __init__(self, host, port, chatroom_repo: ChatroomRepository):
@@ -21,13 +28,22 @@ class GameServerRepository:
     async def accept_gameserver(self):
         logger.info(
             f'start of SocketServer-accept with host={self.tcp_server.host} and port={self.tcp_server.port}')
+        self.loop.create_task(self.monitor_heartbeats())
 
         while True:
             tcp_client: BaseTCPClient = await self.tcp_server.accept()
             logger.info('A new GameServer socket accepted')
             handshake_message = await tcp_client.receive()
             server_address = (handshake_message.content["host"], handshake_message.content["port"])
-            logger.info(f'The new GameServer is located at {server_address}')
+            worker_id = handshake_message.content.get("worker_id")
+            logger.info(f'The new GameServer is located at {server_address}' +
+                        (f' (worker {worker_id})' if worker_id is not None else ''))
+            tcp_client.codec = negotiate_codec(handshake_message.content.get("codecs"))
+            handshake_reply = {
+                "type": "handshake",
+                "codec": tcp_client.codec.name
+            }
+            await tcp_client.send(BaseMessage(handshake_reply))
             gameserver_handler = GameServerHandler(tcp_client, server_address, self.chatroom_repo)
             self.gameserver_handlers.append(gameserver_handler)
             self.loop.create_task(gameserver_handler.handle_gameserver())
@@ -36,12 +52,26 @@ class GameServerRepository:
         self.gameserver_handlers = [x for x in self.gameserver_handlers if x.state == GameServerHandlerState.CONNECTED]
         return len(self.gameserver_handlers)
 
+    def describe_gameservers(self) -> list[str]:
+        loads = self.chatroom_repo.load_balancer.loads.values()
+        return [load.describe() for load in sorted(loads, key=lambda x: x.score)]
+
+    async def monitor_heartbeats(self, timeout: float = HEARTBEAT_TIMEOUT):
+        while True:
+            await asyncio.sleep(timeout / 2)
+            for load in self.chatroom_repo.load_balancer.stale(timeout):
+                logger.warning(f"gameserver {load.server_address} missed its heartbeats, marking it unhealthy")
+                self.chatroom_repo.mark_unhealthy(load.server_address)
+
 
 class ClientRepository:
-    def __init__(self, host, port, chatroom_repo: ChatroomRepository):
-        self.tcp_server = BaseTCPServer(host, port, backlog=5)
+    def __init__(self, host, port, chatroom_repo: ChatroomRepository, idle_timeout: float = IDLE_TIMEOUT):
+        self.tcp_server = BaseTCPServer(host, port, backlog=CLIENT_BACKLOG)
         self.chatroom_repo = chatroom_repo
         self.loop = asyncio.get_event_loop()
+        self.timers = TimerWheel(loop=self.loop)
+        self.idle_timeout = idle_timeout
+        self.spectator_repo = SpectatorRepository(chatroom_repo)
         self.client_handlers = []
 
     async def accept_client(self):
@@ -51,7 +81,8 @@ class ClientRepository:
         while True:
             tcp_client: BaseTCPClient = await self.tcp_server.accept()
             logger.debug("A new user socket accepted.")
-            client_socket_handler = ClientHandler(tcp_client, self.chatroom_repo)
+            client_socket_handler = ClientHandler(tcp_client, self.chatroom_repo, self.timers, self.idle_timeout,
+                                                  self.spectator_repo)
             self.client_handlers.append(client_socket_handler)
             self.loop.create_task(client_socket_handler.handle_client(tcp_client))
 
@@ -1,9 +1,11 @@
+import argparse
 import asyncio
 import logging
 
+import metrics
 from utils import async_input
 from webserver.chatroom import ChatroomRepository
-from webserver.web_server import ClientRepository, GameServerRepository
+from webserver.web_server import ClientRepository, GameServerRepository, IDLE_TIMEOUT
 
 logging.basicConfig(format='%(asctime)s %(lineno)d %(levelname)s:%(message)s', level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -17,18 +19,45 @@ async def control_console(gameserver_repo: GameServerRepository,
                           client_repo: ClientRepository):
     while True:
         print("WebServer Console".center(40, '*'))
-        line = await async_input("available commands:\n/users\n/servers\n")
+        line = await async_input("available commands:\n/users\n/servers\n/stats\n")
         if line == '/users':
             print("number of connected clients: ", client_repo.get_number_of_connected_clients())
         elif line == '/servers':
             print("number of running servers: ", gameserver_repo.get_number_of_connected_gameservers())
+            for description in gameserver_repo.describe_gameservers():
+                print(description)
+        elif line == '/stats':
+            for description in metrics.REGISTRY.describe():
+                print(description)
 
 
-async def start_webserver():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tic-toc-toe webserver")
+    parser.add_argument("--gameserver-port", type=int, default=WEBSERVER_GAMESERVER_REPO_PORT,
+                        help="port game servers connect to")
+    parser.add_argument("--client-port", type=int, default=WEBSERVER_CLIENT_REPO_PORT,
+                        help="port players connect to")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics over HTTP on this port; off when omitted")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="close player connections that send nothing between games for this many seconds "
+                             "(0 keeps them open)")
+    return parser.parse_args()
+
+
+async def start_webserver(gameserver_port: int = WEBSERVER_GAMESERVER_REPO_PORT,
+                          client_port: int = WEBSERVER_CLIENT_REPO_PORT, metrics_port: int | None = None,
+                          idle_timeout: float = IDLE_TIMEOUT):
     logger.info('start of start_webserver')
     chatroom_repo = ChatroomRepository()
-    gameserver_repo = GameServerRepository(WEBSERVER_HOST, WEBSERVER_GAMESERVER_REPO_PORT, chatroom_repo)
-    client_repo = ClientRepository(WEBSERVER_HOST, WEBSERVER_CLIENT_REPO_PORT, chatroom_repo)
+    gameserver_repo = GameServerRepository(WEBSERVER_HOST, gameserver_port, chatroom_repo)
+    client_repo = ClientRepository(WEBSERVER_HOST, client_port, chatroom_repo, idle_timeout)
+    if metrics_port is not None:
+        try:
+            await metrics.start_metrics_server(WEBSERVER_HOST, metrics_port)
+        except OSError as exc:
+            # metrics are an extra, a port taken by another exporter must not keep the game from starting
+            logger.error(f"could not serve metrics on port {metrics_port}: {exc}")
     await asyncio.gather(*[
         asyncio.create_task(gameserver_repo.accept_gameserver()),
         asyncio.create_task(client_repo.accept_client()),
@@ -38,4 +67,5 @@ async def start_webserver():
 
 
 if __name__ == '__main__':
-    asyncio.run(start_webserver())
+    args = parse_args()
+    asyncio.run(start_webserver(args.gameserver_port, args.client_port, args.metrics_port, args.idle_timeout))